@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ------------------------------------------------------------------------------
+# Scheduler load benchmark
+# ------------------------------------------------------------------------------
+# Runs the real beat + N Celery workers against the local cron stand-in
+# (stub_server.py) so schedule and concurrency changes can be measured without
+# touching production. Beat fires every job each --interval seconds
+# (SCHEDULER_BENCH_INTERVAL), telemetry goes to an isolated metrics prefix, and
+# the report is built from those run records:
+#
+#   python benchmark.py --workers 2 --concurrency 4 --duration 120 --interval 5
+#
+# Use a Redis database that is not shared with the live scheduler (default 15).
+# ------------------------------------------------------------------------------
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def spawn(args, env, log_dir, name):
+    log = open(os.path.join(log_dir, f"{name}.log"), 'w')
+    return subprocess.Popen([sys.executable, '-m', 'celery', '-A', 'celery_config'] + args,
+                            cwd=HERE, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop(processes, timeout=15):
+    for proc in processes:
+        if proc.poll() is None:
+            proc.terminate()
+    for proc in processes:
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def queue_length(client):
+    return client.llen('celery')
+
+
+def build_report(metrics, stub_counters, args, elapsed):
+    runs = []
+    per_job = {}
+    for job in metrics.list_jobs():
+        job_runs = metrics.recent_runs(job)
+        runs.extend(job_runs)
+        per_job[job] = metrics.job_stats(job)
+
+    latencies = [r['latency'] for r in runs if r.get('latency') is not None]
+    waits = [r['queue_wait'] for r in runs if r.get('queue_wait') is not None]
+    errors = sum(1 for r in runs if not r['status'].startswith('2'))
+    slots = args.workers * args.concurrency
+
+    return {
+        'config': {
+            'workers': args.workers,
+            'concurrency': args.concurrency,
+            'interval': args.interval,
+            'duration': args.duration,
+        },
+        'elapsed_seconds': round(elapsed, 1),
+        'jobs_completed': len(runs),
+        'jobs_per_minute': round(len(runs) / (elapsed / 60.0), 2) if elapsed else 0,
+        'error_rate': round(errors / len(runs), 4) if runs else None,
+        'latency': {f"p{p}": metrics.percentile(latencies, p) for p in (50, 95, 99)},
+        'queue_wait': {f"p{p}": metrics.percentile(waits, p) for p in (50, 95, 99)},
+        # Busy time of all worker slots over the run; near 1.0 means saturated.
+        'worker_utilization': round(sum(latencies) / (slots * elapsed), 3) if elapsed else None,
+        'per_job': {
+            job: {'runs': s['runs'], 'p50': s['latency'][50], 'p99': s['latency'][99]}
+            for job, s in per_job.items()
+        },
+        'stub_server': stub_counters,
+    }
+
+
+def print_report(report):
+    c = report['config']
+    print("\n📊 Scheduler benchmark")
+    print("=" * 60)
+    print(f"Workers: {c['workers']} x {c['concurrency']}   interval: {c['interval']}s   elapsed: {report['elapsed_seconds']}s")
+    print(f"Jobs completed:     {report['jobs_completed']}")
+    print(f"Jobs / minute:      {report['jobs_per_minute']}")
+    print(f"Error rate:         {report['error_rate']}")
+    print("Latency (s):        " + '  '.join(f"{k}={v:.2f}" for k, v in report['latency'].items() if v is not None))
+    print("Queue wait (s):     " + '  '.join(f"{k}={v:.2f}" for k, v in report['queue_wait'].items() if v is not None))
+    print(f"Worker utilization: {report['worker_utilization']}")
+    print("\nPer job:")
+    for job, s in sorted(report['per_job'].items()):
+        p50 = f"{s['p50']:.2f}s" if s['p50'] is not None else '-'
+        p99 = f"{s['p99']:.2f}s" if s['p99'] is not None else '-'
+        print(f"  {job:<26} runs={s['runs']:<5} p50={p50:<8} p99={p99}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark beat + N workers against the local cron stand-in")
+    parser.add_argument('--workers', type=int, default=2, help="Number of worker processes")
+    parser.add_argument('--concurrency', type=int, default=4, help="Pool size of each worker")
+    parser.add_argument('--duration', type=float, default=120, help="Seconds to let beat publish jobs")
+    parser.add_argument('--interval', type=float, default=5, help="Beat interval per job in seconds")
+    parser.add_argument('--drain', type=float, default=60, help="Max seconds to wait for the queue to drain")
+    parser.add_argument('--redis-url', default=os.getenv('BENCH_REDIS_URL', 'redis://localhost:6379/15'))
+    parser.add_argument('--port', type=int, default=3900)
+    parser.add_argument('--profile', help="Latency/error profile for the stand-in (see stub_server.py)")
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args()
+
+    run_id = time.strftime('%Y%m%d%H%M%S')
+    work_dir = tempfile.mkdtemp(prefix='scheduler-bench-')
+    env = dict(os.environ)
+    env.update({
+        'REDIS_URL': args.redis_url,
+        'SCHEDULER_METRICS_REDIS_URL': args.redis_url,
+        'SCHEDULER_METRICS_PREFIX': f"bench:{run_id}",
+        'SCHEDULER_METRICS_RECENT': '1000000',
+        'SCHEDULER_BENCH_INTERVAL': str(args.interval),
+        'APP_URL': f"http://127.0.0.1:{args.port}",
+        'RESULT_STORE_DIR': os.path.join(work_dir, 'results'),
+    })
+    # metrics reads its settings at import time.
+    os.environ.update({k: env[k] for k in ('SCHEDULER_METRICS_REDIS_URL', 'SCHEDULER_METRICS_PREFIX')})
+    import metrics
+    import stub_server
+
+    server, stub = stub_server.start_server(port=args.port, profile=stub_server.load_profile(args.profile))
+    client = metrics.get_redis()
+    client.delete('celery')
+
+    workers = [
+        spawn(['worker', '--loglevel=warning', '-c', str(args.concurrency), '-n', f"bench{i}-{run_id}@%h"],
+              env, work_dir, f"worker{i}")
+        for i in range(args.workers)
+    ]
+    print(f"🧪 Run {run_id}: {args.workers} workers x {args.concurrency}, logs in {work_dir}")
+    time.sleep(3)
+
+    started = time.time()
+    beat = spawn(['beat', '--loglevel=warning', '-s', os.path.join(work_dir, 'beat-schedule')],
+                 env, work_dir, 'beat')
+    try:
+        time.sleep(args.duration)
+        stop([beat])
+        deadline = time.time() + args.drain
+        while queue_length(client) and time.time() < deadline:
+            time.sleep(1)
+        # Let in-flight requests finish.
+        time.sleep(min(args.drain, 5))
+        elapsed = time.time() - started
+    finally:
+        stop([beat] + workers)
+        server.shutdown()
+
+    report = build_report(metrics, stub.snapshot(), args, elapsed)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    for key in client.scan_iter(f"{metrics.METRICS_PREFIX}:*"):
+        client.delete(key)
+    client.delete('celery')
+    shutil.rmtree(os.path.join(work_dir, 'results'), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
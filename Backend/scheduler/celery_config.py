@@ -1,14 +1,17 @@
 import os
+import time
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import before_task_publish
 from dotenv import load_dotenv
+from results import RESULT_TTL
 
 load_dotenv()
 
 # Use Redis from docker-compose service name 'redis' or localhost if running outside docker
 REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
 
-app = Celery('scheduler', broker=REDIS_URL, backend=REDIS_URL, include=['tasks'])
+app = Celery('scheduler', broker=REDIS_URL, backend=REDIS_URL, include=['tasks', 'workflows'])
 
 app.conf.update(
     timezone='UTC',
@@ -16,21 +19,32 @@ app.conf.update(
     task_serializer='json',
     accept_content=['json'],
     result_serializer='json',
+    # Large bodies are offloaded by results.py; what remains is compressed and
+    # expires so the Redis backend stays flat.
+    result_compression='gzip',
+    result_expires=RESULT_TTL,
 )
 
-# Define the schedule
+# Stamp every message when it is published (by beat or by hand) so workers can
+# report how long it sat in the queue. Custom headers surface on task.request.
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+# Define the schedule. Cron jobs that depend on each other run as one workflow
+# (see workflows.py): trending topics -> blog -> social posts as a chain that
+# starts at the blog's old 09:00 slot, so social posts follow the blog as soon
+# as it is written instead of at 12:00. Independent jobs keep their own times.
 app.conf.beat_schedule = {
     'jules-orchestrator': {
         'task': 'tasks.jules_orchestrator',
         'schedule': crontab(hour=8, minute=0),
     },
-    'blog-daily': {
-        'task': 'tasks.blog_daily',
+    'content-pipeline': {
+        'task': 'workflows.run_workflow',
         'schedule': crontab(hour=9, minute=0),
-    },
-    'trending-topics': {
-        'task': 'tasks.trending_topics',
-        'schedule': crontab(hour=9, minute=0, day_of_week=1), # Monday
+        'args': ('content',),
     },
     'shopping-agents-runner': {
         'task': 'tasks.shopping_agents_runner',
@@ -40,8 +54,18 @@ app.conf.beat_schedule = {
         'task': 'tasks.autonomous_marketing',
         'schedule': crontab(hour=11, minute=0),
     },
-    'social-media-generator': {
-        'task': 'tasks.social_media_generator',
-        'schedule': crontab(hour=12, minute=0),
+    'purge-results': {
+        'task': 'tasks.purge_results',
+        'schedule': crontab(minute=30),
     },
 }
+
+# Load testing (see benchmark.py): fire every cron job on a fixed interval
+# instead of its daily crontab.
+BENCH_INTERVAL = os.getenv('SCHEDULER_BENCH_INTERVAL')
+if BENCH_INTERVAL:
+    app.conf.beat_schedule = {
+        name: {**entry, 'schedule': float(BENCH_INTERVAL)}
+        for name, entry in app.conf.beat_schedule.items()
+        if name != 'purge-results'
+    }
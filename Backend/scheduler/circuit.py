@@ -0,0 +1,158 @@
+import os
+import time
+import random
+import metrics
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ------------------------------------------------------------------------------
+# Per-endpoint circuit breaker and adaptive timeouts
+# ------------------------------------------------------------------------------
+# State lives in Redis so every worker sees the same picture of an endpoint:
+#   closed     requests go through; the last CIRCUIT_WINDOW outcomes are kept
+#              and the circuit opens once at least CIRCUIT_MIN_CALLS of them
+#              fail at CIRCUIT_FAILURE_RATE or worse
+#   open       requests are skipped until the cooldown has passed; cooldown
+#              doubles every time the circuit re-opens (up to CIRCUIT_MAX_COOLDOWN)
+#   half_open  a single probe request is let through; success closes the
+#              circuit, failure re-opens it
+# Failures are transport errors, 5xx responses, and bodies that break off or
+# are not JSON.
+#
+# Read timeouts follow the observed latency of successful runs (p99 times
+# TIMEOUT_FACTOR, clamped to [MIN_TIMEOUT, MAX_TIMEOUT]) and the connect timeout
+# is short, so a dead host costs seconds instead of the full 300 s.
+# ------------------------------------------------------------------------------
+
+CIRCUIT_PREFIX = os.getenv('SCHEDULER_CIRCUIT_PREFIX', 'scheduler:circuit')
+CIRCUIT_WINDOW = int(os.getenv('CIRCUIT_WINDOW', '20'))
+CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', '5'))
+CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5'))
+CIRCUIT_COOLDOWN = float(os.getenv('CIRCUIT_COOLDOWN', '60'))
+CIRCUIT_MAX_COOLDOWN = float(os.getenv('CIRCUIT_MAX_COOLDOWN', '900'))
+
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', '5'))
+MIN_TIMEOUT = float(os.getenv('MIN_TIMEOUT', '15'))
+MAX_TIMEOUT = float(os.getenv('MAX_TIMEOUT', '300'))
+TIMEOUT_FACTOR = float(os.getenv('TIMEOUT_FACTOR', '3'))
+TIMEOUT_MIN_SAMPLES = 10
+
+RETRY_BASE = float(os.getenv('RETRY_BASE', '30'))
+RETRY_MAX = float(os.getenv('RETRY_MAX', '1800'))
+
+
+class CircuitOpen(Exception):
+    def __init__(self, job, retry_after):
+        super().__init__(f"Circuit open for {job}, next probe in {retry_after:.0f}s")
+        self.job = job
+        self.retry_after = retry_after
+
+
+def _state_key(job):
+    return f"{CIRCUIT_PREFIX}:{job}"
+
+
+def _outcomes_key(job):
+    return f"{CIRCUIT_PREFIX}:{job}:outcomes"
+
+
+def _probe_key(job):
+    return f"{CIRCUIT_PREFIX}:{job}:probe"
+
+
+def _cooldown(trips):
+    return min(CIRCUIT_MAX_COOLDOWN, CIRCUIT_COOLDOWN * (2 ** max(0, trips - 1)))
+
+
+def get_state(job):
+    state = metrics.get_redis().hgetall(_state_key(job))
+    return {
+        'state': state.get('state', 'closed'),
+        'opened_at': float(state.get('opened_at', 0)),
+        'trips': int(state.get('trips', 0)),
+    }
+
+
+def before_call(job, now=None):
+    """
+    Decide whether a request to `job` may go out. Returns the circuit state the
+    call runs under ('closed' or 'half_open'); raises CircuitOpen otherwise.
+    """
+    now = now or time.time()
+    state = get_state(job)
+    if state['state'] == 'closed':
+        return 'closed'
+
+    cooldown = _cooldown(state['trips'])
+    wait = state['opened_at'] + cooldown - now
+    if wait > 0:
+        raise CircuitOpen(job, wait)
+
+    # Cooldown over: exactly one worker gets to probe.
+    client = metrics.get_redis()
+    if client.set(_probe_key(job), now, nx=True, ex=int(MAX_TIMEOUT + CONNECT_TIMEOUT)):
+        client.hset(_state_key(job), 'state', 'half_open')
+        return 'half_open'
+    raise CircuitOpen(job, CONNECT_TIMEOUT)
+
+
+def _open(job, trips, now):
+    client = metrics.get_redis()
+    client.hset(_state_key(job), mapping={'state': 'open', 'opened_at': now, 'trips': trips})
+    client.delete(_probe_key(job))
+    print(f"⛔ Circuit opened for {job} (cooldown {_cooldown(trips):.0f}s)")
+
+
+def record_success(job, mode='closed'):
+    client = metrics.get_redis()
+    if mode == 'half_open':
+        client.hset(_state_key(job), mapping={'state': 'closed', 'opened_at': 0, 'trips': 0})
+        client.delete(_outcomes_key(job), _probe_key(job))
+        print(f"✅ Circuit closed for {job}")
+        return
+    pipe = client.pipeline(transaction=False)
+    pipe.lpush(_outcomes_key(job), '1')
+    pipe.ltrim(_outcomes_key(job), 0, CIRCUIT_WINDOW - 1)
+    pipe.execute()
+
+
+def record_failure(job, mode='closed', now=None):
+    now = now or time.time()
+    state = get_state(job)
+    if mode == 'half_open':
+        _open(job, state['trips'] + 1, now)
+        return
+
+    client = metrics.get_redis()
+    pipe = client.pipeline(transaction=False)
+    pipe.lpush(_outcomes_key(job), '0')
+    pipe.ltrim(_outcomes_key(job), 0, CIRCUIT_WINDOW - 1)
+    pipe.lrange(_outcomes_key(job), 0, -1)
+    outcomes = pipe.execute()[-1]
+
+    failures = outcomes.count('0')
+    if state['state'] == 'closed' and len(outcomes) >= CIRCUIT_MIN_CALLS \
+            and failures / len(outcomes) >= CIRCUIT_FAILURE_RATE:
+        client.delete(_outcomes_key(job))
+        _open(job, state['trips'] + 1, now)
+
+
+def adaptive_timeout(job):
+    """(connect, read) timeout for requests, derived from recent successful latencies."""
+    try:
+        runs = metrics.recent_runs(job, 200)
+    except Exception:
+        runs = []
+    latencies = [r['latency'] for r in runs
+                 if r.get('latency') is not None and r['status'].startswith('2')]
+    if len(latencies) < TIMEOUT_MIN_SAMPLES:
+        return (CONNECT_TIMEOUT, MAX_TIMEOUT)
+    read = metrics.percentile(latencies, 99) * TIMEOUT_FACTOR
+    return (CONNECT_TIMEOUT, max(MIN_TIMEOUT, min(MAX_TIMEOUT, read)))
+
+
+def retry_countdown(retries, retry_after=0):
+    """Exponential backoff with jitter, never earlier than the next probe."""
+    backoff = min(RETRY_MAX, RETRY_BASE * (2 ** retries))
+    return max(retry_after, backoff) + random.uniform(0, RETRY_BASE)
@@ -0,0 +1,138 @@
+import sys
+import json
+import argparse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import metrics
+
+
+def _fmt(value, unit=''):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.2f}{unit}"
+    return f"{value}{unit}"
+
+
+def cmd_stats(args):
+    """Print rolling per-job statistics from the recent run window."""
+    jobs = [args.job] if args.job else metrics.list_jobs()
+    stats = [metrics.job_stats(job, args.window) for job in jobs]
+
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+
+    if not stats:
+        print("No runs recorded yet.")
+        return
+
+    print(f"{'JOB':<26}{'RUNS':>6}{'ERR':>6}{'RETRY':>7}{'P50':>9}{'P90':>9}{'P99':>9}{'WAIT P90':>10}{'BYTES P90':>11}  LAST RUN")
+    for s in stats:
+        errors = sum(count for status, count in s['statuses'].items() if not status.startswith('2'))
+        last_run = datetime.fromtimestamp(s['last_run']).strftime('%Y-%m-%d %H:%M') if s['last_run'] else '-'
+        print(
+            f"{s['job']:<26}{s['runs']:>6}{errors:>6}{s['retries']:>7}"
+            f"{_fmt(s['latency'][50], 's'):>9}{_fmt(s['latency'][90], 's'):>9}{_fmt(s['latency'][99], 's'):>9}"
+            f"{_fmt(s['queue_wait'][90], 's'):>10}{_fmt(s['response_bytes'][90]):>11}  {last_run}"
+        )
+
+    if args.histogram:
+        for s in stats:
+            print(f"\n{s['job']} latency (last {s['runs']} runs)")
+            peak = max(s['latency_histogram'].values()) or 1
+            for le, count in s['latency_histogram'].items():
+                bound = le if le == '+Inf' else f"{le}s"
+                print(f"  <= {bound:>7} {count:>5} {'#' * int(40 * count / peak)}")
+
+
+def cmd_metrics(args):
+    """Print the Prometheus text exposition once."""
+    sys.stdout.write(metrics.render_prometheus())
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        try:
+            body = metrics.render_prometheus().encode()
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def cmd_exporter(args):
+    """Serve /metrics for Prometheus to scrape."""
+    server = ThreadingHTTPServer((args.host, args.port), MetricsHandler)
+    print(f"📊 Scheduler metrics exporter on http://{args.host}:{args.port}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_circuits(args):
+    """Show the circuit breaker state and current timeouts of every job."""
+    import circuit
+    for job in metrics.list_jobs():
+        state = circuit.get_state(job)
+        connect, read = circuit.adaptive_timeout(job)
+        opened = datetime.fromtimestamp(state['opened_at']).strftime('%Y-%m-%d %H:%M') if state['opened_at'] else '-'
+        print(f"{job:<26}{state['state']:<11}trips={state['trips']:<3}opened={opened:<17}timeout={connect:.0f}s/{read:.0f}s")
+
+
+def cmd_workflow(args):
+    """Show or start a workflow from workflows.py."""
+    import workflows
+    if args.name not in workflows.WORKFLOWS:
+        print(f"Unknown workflow '{args.name}'. Available: {', '.join(workflows.WORKFLOWS)}")
+        sys.exit(1)
+    print(workflows.describe(workflows.build(workflows.WORKFLOWS[args.name])))
+    if not args.dry_run:
+        result = workflows.run_workflow.delay(args.name)
+        print(f"🧩 Queued workflow {args.name}: {result.id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='scheduler', description="Piata AI scheduler tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    stats = sub.add_parser('stats', help="Rolling latency/queue/size stats per job")
+    stats.add_argument('--job', help="Only show this job (e.g. blog-daily)")
+    stats.add_argument('--window', type=int, default=None, help="Number of recent runs to consider")
+    stats.add_argument('--histogram', action='store_true', help="Also print latency histograms")
+    stats.add_argument('--json', action='store_true', help="Machine readable output")
+    stats.set_defaults(func=cmd_stats)
+
+    prom = sub.add_parser('metrics', help="Print Prometheus text metrics")
+    prom.set_defaults(func=cmd_metrics)
+
+    exporter = sub.add_parser('exporter', help="Serve Prometheus metrics over HTTP")
+    exporter.add_argument('--host', default='0.0.0.0')
+    exporter.add_argument('--port', type=int, default=9808)
+    exporter.set_defaults(func=cmd_exporter)
+
+    circuits = sub.add_parser('circuits', help="Circuit breaker state per job")
+    circuits.set_defaults(func=cmd_circuits)
+
+    workflow = sub.add_parser('workflow', help="Show or start a workflow")
+    workflow.add_argument('name', help="Workflow name (e.g. content)")
+    workflow.add_argument('--dry-run', action='store_true', help="Only print what would run today")
+    workflow.set_defaults(func=cmd_workflow)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
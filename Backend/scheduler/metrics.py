@@ -0,0 +1,185 @@
+import os
+import json
+import math
+import time
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ------------------------------------------------------------------------------
+# Scheduler telemetry
+# ------------------------------------------------------------------------------
+# Every cron run records queue wait, HTTP latency, response size, status and
+# retries into Redis (same instance as the Celery broker by default).
+#
+# Layout (all keys under METRICS_PREFIX):
+#   jobs                   set of job names that have reported at least once
+#   hist:<job>:<metric>    per-bucket counts + sum/count (Prometheus histogram)
+#   status:<job>           status code / "error" / "skipped" / "aborted" -> count
+#   counters:<job>         runs, retries
+#   recent:<job>           capped list of the last RECENT_RUNS run records,
+#                          used for the rolling histograms in `cli.py stats`
+# ------------------------------------------------------------------------------
+
+REDIS_URL = os.getenv('SCHEDULER_METRICS_REDIS_URL', os.getenv('REDIS_URL', 'redis://redis:6379/0'))
+METRICS_PREFIX = os.getenv('SCHEDULER_METRICS_PREFIX', 'scheduler:metrics')
+RECENT_RUNS = int(os.getenv('SCHEDULER_METRICS_RECENT', '500'))
+
+# Upper bounds of the histogram buckets; "+Inf" is implicit.
+BUCKETS = {
+    'queue_wait_seconds': (0.1, 0.5, 1, 5, 15, 60, 300, 900),
+    'http_latency_seconds': (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+    'response_bytes': (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+}
+
+_client = None
+
+
+def get_redis():
+    """Lazily created Redis client shared by the whole process."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    return _client
+
+
+def _key(*parts):
+    return ':'.join((METRICS_PREFIX,) + parts)
+
+
+def _bucket_for(metric, value):
+    for bound in BUCKETS[metric]:
+        if value <= bound:
+            return str(bound)
+    return '+Inf'
+
+
+def record_run(job, status, latency=None, queue_wait=None, response_bytes=None, retries=0):
+    """
+    Store the metrics of a single run. Never raises: telemetry must not be the
+    reason a cron job fails.
+    """
+    run = {
+        'ts': time.time(),
+        'status': str(status),
+        'latency': latency,
+        'queue_wait': queue_wait,
+        'response_bytes': response_bytes,
+        'retries': retries or 0,
+    }
+    samples = {
+        'queue_wait_seconds': queue_wait,
+        'http_latency_seconds': latency,
+        'response_bytes': response_bytes,
+    }
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.sadd(_key('jobs'), job)
+        for metric, value in samples.items():
+            if value is None:
+                continue
+            hist = _key('hist', job, metric)
+            pipe.hincrby(hist, _bucket_for(metric, value), 1)
+            pipe.hincrbyfloat(hist, 'sum', value)
+            pipe.hincrby(hist, 'count', 1)
+        pipe.hincrby(_key('status', job), run['status'], 1)
+        pipe.hincrby(_key('counters', job), 'runs', 1)
+        pipe.hincrby(_key('counters', job), 'retries', run['retries'])
+        pipe.lpush(_key('recent', job), json.dumps(run))
+        pipe.ltrim(_key('recent', job), 0, RECENT_RUNS - 1)
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Could not record metrics for {job}: {e}")
+
+    return run
+
+
+def list_jobs():
+    return sorted(get_redis().smembers(_key('jobs')))
+
+
+def recent_runs(job, limit=None):
+    """Most recent run records for a job, newest first."""
+    end = (limit - 1) if limit else -1
+    return [json.loads(raw) for raw in get_redis().lrange(_key('recent', job), 0, end)]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def rolling_histogram(runs, metric):
+    """Bucket counts for `metric` over a window of run records."""
+    field = {
+        'queue_wait_seconds': 'queue_wait',
+        'http_latency_seconds': 'latency',
+        'response_bytes': 'response_bytes',
+    }[metric]
+    counts = {str(bound): 0 for bound in BUCKETS[metric]}
+    counts['+Inf'] = 0
+    for run in runs:
+        if run.get(field) is not None:
+            counts[_bucket_for(metric, run[field])] += 1
+    return counts
+
+
+def job_stats(job, window=None):
+    """Summary over the rolling window of recent runs of a job."""
+    runs = recent_runs(job, window)
+    latencies = [r['latency'] for r in runs if r.get('latency') is not None]
+    waits = [r['queue_wait'] for r in runs if r.get('queue_wait') is not None]
+    sizes = [r['response_bytes'] for r in runs if r.get('response_bytes') is not None]
+    statuses = {}
+    for r in runs:
+        statuses[r['status']] = statuses.get(r['status'], 0) + 1
+
+    return {
+        'job': job,
+        'runs': len(runs),
+        'last_run': runs[0]['ts'] if runs else None,
+        'statuses': statuses,
+        'retries': sum(r.get('retries', 0) for r in runs),
+        'latency': {p: percentile(latencies, p) for p in (50, 90, 99)},
+        'queue_wait': {p: percentile(waits, p) for p in (50, 90, 99)},
+        'response_bytes': {p: percentile(sizes, p) for p in (50, 90, 99)},
+        'latency_histogram': rolling_histogram(runs, 'http_latency_seconds'),
+    }
+
+
+def render_prometheus():
+    """Prometheus text exposition (format 0.0.4) of the cumulative counters."""
+    client = get_redis()
+    lines = []
+
+    for metric, bounds in BUCKETS.items():
+        name = f"scheduler_job_{metric}"
+        lines.append(f"# TYPE {name} histogram")
+        for job in list_jobs():
+            hist = client.hgetall(_key('hist', job, metric))
+            if not hist:
+                continue
+            cumulative = 0
+            for le in [str(b) for b in bounds] + ['+Inf']:
+                cumulative += int(hist.get(le, 0))
+                lines.append(f'{name}_bucket{{job="{job}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{job="{job}"}} {float(hist.get("sum", 0))}')
+            lines.append(f'{name}_count{{job="{job}"}} {int(hist.get("count", 0))}')
+
+    lines.append("# TYPE scheduler_job_runs_total counter")
+    for job in list_jobs():
+        for status, count in sorted(client.hgetall(_key('status', job)).items()):
+            lines.append(f'scheduler_job_runs_total{{job="{job}",status="{status}"}} {count}')
+
+    lines.append("# TYPE scheduler_job_retries_total counter")
+    for job in list_jobs():
+        retries = client.hget(_key('counters', job), 'retries') or 0
+        lines.append(f'scheduler_job_retries_total{{job="{job}"}} {retries}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,147 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ------------------------------------------------------------------------------
+# Cron response handling
+# ------------------------------------------------------------------------------
+# Endpoint responses are streamed instead of buffered. Bodies up to
+# RESULT_INLINE_BYTES stay in memory and are returned as the Celery result;
+# as soon as a body grows past that, it is spilled chunk by chunk into a gzip
+# file under RESULT_STORE_DIR and only a reference goes to the Redis result
+# backend. Reading stops at RESULT_MAX_BYTES. Backend entries and offloaded
+# files both expire after RESULT_TTL.
+#
+# An offloaded body is parsed back from its file before the reference is
+# returned, so a large non-JSON answer (a proxy's HTML error page) fails the
+# run like a small one does. A body truncated at RESULT_MAX_BYTES cannot be
+# parsed; it only has to start like a JSON object or array.
+# ------------------------------------------------------------------------------
+
+RESULT_MAX_BYTES = int(os.getenv('RESULT_MAX_BYTES', str(10 * 1024 * 1024)))
+RESULT_INLINE_BYTES = int(os.getenv('RESULT_INLINE_BYTES', str(16 * 1024)))
+RESULT_STORE_DIR = os.getenv('RESULT_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results'))
+RESULT_TTL = int(os.getenv('RESULT_TTL', str(3 * 24 * 3600)))
+CHUNK_SIZE = 64 * 1024
+
+
+def _result_path(job, task_id):
+    job_dir = os.path.join(RESULT_STORE_DIR, job)
+    os.makedirs(job_dir, exist_ok=True)
+    name = task_id or f"{int(time.time() * 1000)}-{os.getpid()}"
+    return os.path.join(job_dir, f"{name}.json.gz")
+
+
+def consume_response(job, task_id, response, max_bytes=RESULT_MAX_BYTES, inline_bytes=RESULT_INLINE_BYTES):
+    """
+    Stream a `requests` response (opened with stream=True).
+
+    Returns (body, reference, size): `body` holds the raw bytes when the
+    response is small and complete, otherwise it is None and `reference`
+    describes the offloaded, compressed copy.
+    """
+    buffer = []
+    head = b''
+    size = 0
+    truncated = False
+    spill = None
+    path = None
+    digest = hashlib.sha256()
+
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if not chunk:
+                continue
+            if size + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - size]
+                truncated = True
+            size += len(chunk)
+            digest.update(chunk)
+            if not head:
+                head = chunk.lstrip()[:1]
+
+            if spill is None and size > inline_bytes:
+                path = _result_path(job, task_id)
+                spill = gzip.open(f"{path}.tmp", 'wb', compresslevel=6)
+                spill.writelines(buffer)
+                buffer = []
+
+            if spill is not None:
+                spill.write(chunk)
+            else:
+                buffer.append(chunk)
+
+            if truncated:
+                break
+    finally:
+        if spill is not None:
+            spill.close()
+
+    if spill is None and not truncated:
+        return b''.join(buffer), None, size
+
+    if spill is None:
+        # Truncated while still under the inline threshold (tiny max_bytes).
+        path = _result_path(job, task_id)
+        with gzip.open(f"{path}.tmp", 'wb', compresslevel=6) as f:
+            f.writelines(buffer)
+    try:
+        _check_json(f"{path}.tmp", head, truncated)
+    except ValueError:
+        os.remove(f"{path}.tmp")
+        raise
+    os.replace(f"{path}.tmp", path)
+
+    return None, {
+        'status_code': response.status_code,
+        'offloaded': True,
+        'path': path,
+        'bytes': size,
+        'stored_bytes': os.path.getsize(path),
+        'sha256': digest.hexdigest(),
+        'truncated': truncated,
+        'expires_at': time.time() + RESULT_TTL,
+    }, size
+
+
+def _check_json(path, head, truncated):
+    """Raise ValueError unless the spooled body is JSON (or, truncated, starts like it)."""
+    if truncated:
+        if head not in (b'{', b'['):
+            raise ValueError(f"Response is not JSON (starts with {head!r})")
+        return
+    with gzip.open(path, 'rb') as f:
+        json.load(f)
+
+
+def load_result(reference):
+    """Read back an offloaded result (the reference returned by consume_response)."""
+    with gzip.open(reference['path'], 'rb') as f:
+        body = f.read()
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body.decode('utf-8', errors='replace')
+
+
+def purge_expired(now=None):
+    """Delete offloaded results older than RESULT_TTL. Returns the count removed."""
+    if not os.path.isdir(RESULT_STORE_DIR):
+        return 0
+    cutoff = (now or time.time()) - RESULT_TTL
+    removed = 0
+    for root, _, files in os.walk(RESULT_STORE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+    return removed
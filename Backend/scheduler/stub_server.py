@@ -0,0 +1,188 @@
+import os
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ------------------------------------------------------------------------------
+# Local stand-in for the Next.js /api/cron/* routes
+# ------------------------------------------------------------------------------
+# Lets the scheduler be exercised offline: point APP_URL at this server and
+# every cron route answers with a latency drawn from a log-normal distribution,
+# a configurable error rate and a padded JSON body of the requested size.
+#
+#   python stub_server.py --port 3900 --profile bench-profile.json
+#
+# Profile format (every key optional, route entries override "default"):
+#   {"default": {"latency_median": 0.5, "latency_sigma": 0.5,
+#                "error_rate": 0.0, "error_status": 500, "body_bytes": 512},
+#    "routes": {"blog-daily": {"latency_median": 8.0}}}
+# ------------------------------------------------------------------------------
+
+CRON_SECRET = os.getenv('CRON_SECRET', '5f8d9e2a1b4c7d0e3f6a9b2c5e8d1a4f')
+
+# Rough shape of the real routes: content generation calls LLMs and is slow,
+# the orchestration routes mostly fan out and return.
+DEFAULT_PROFILE = {
+    'default': {
+        'latency_median': 0.5,
+        'latency_sigma': 0.5,
+        'error_rate': 0.0,
+        'error_status': 500,
+        'body_bytes': 512,
+    },
+    'routes': {
+        'jules-orchestrator': {'latency_median': 2.0},
+        'blog-daily': {'latency_median': 6.0, 'latency_sigma': 0.7, 'body_bytes': 8192},
+        'trending-topics': {'latency_median': 3.0, 'body_bytes': 4096},
+        'shopping-agents-runner': {'latency_median': 4.0},
+        'autonomous-marketing': {'latency_median': 5.0, 'body_bytes': 4096},
+        'social-media-generator': {'latency_median': 4.0, 'body_bytes': 2048},
+    },
+}
+
+
+def load_profile(path=None, overrides=None):
+    profile = json.loads(json.dumps(DEFAULT_PROFILE))
+    if path:
+        with open(path) as f:
+            custom = json.load(f)
+        profile['default'].update(custom.get('default', {}))
+        for route, settings in custom.get('routes', {}).items():
+            profile['routes'].setdefault(route, {}).update(settings)
+    if overrides:
+        profile['default'].update(overrides)
+        # Command line overrides apply to every route.
+        for settings in profile['routes'].values():
+            for key in overrides:
+                settings.pop(key, None)
+    return profile
+
+
+class CronStub:
+    """Route settings plus per-route counters, shared by all handler threads."""
+
+    def __init__(self, profile, seed=None):
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def settings_for(self, route):
+        settings = dict(self.profile['default'])
+        settings.update(self.profile['routes'].get(route, {}))
+        return settings
+
+    def sample(self, route):
+        settings = self.settings_for(route)
+        with self.lock:
+            latency = self.random.lognormvariate(math.log(settings['latency_median']), settings['latency_sigma'])
+            failed = self.random.random() < settings['error_rate']
+        return settings, latency, failed
+
+    def count(self, route, status, latency):
+        with self.lock:
+            c = self.counters.setdefault(route, {'requests': 0, 'errors': 0, 'latency_total': 0.0})
+            c['requests'] += 1
+            c['latency_total'] += latency
+            if status >= 400:
+                c['errors'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.counters))
+
+
+def make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split('?')[0].rstrip('/')
+
+            if path == '/__stats':
+                self._send_json(200, stub.snapshot())
+                return
+
+            if not path.startswith('/api/cron/'):
+                self._send_json(404, {'error': 'Not found'})
+                return
+
+            if self.headers.get('Authorization') != f"Bearer {CRON_SECRET}":
+                self._send_json(401, {'error': 'Unauthorized'})
+                return
+
+            route = path.rsplit('/', 1)[-1]
+            settings, latency, failed = stub.sample(route)
+            time.sleep(latency)
+
+            if failed:
+                status = int(settings['error_status'])
+                payload = {'success': False, 'error': f"Simulated failure in {route}"}
+            else:
+                status = 200
+                payload = {'success': True, 'route': route, 'latency': round(latency, 3)}
+                padding = int(settings['body_bytes']) - len(json.dumps(payload)) - 14
+                if padding > 0:
+                    payload['padding'] = 'x' * padding
+
+            stub.count(route, status, latency)
+            self._send_json(status, payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(host='127.0.0.1', port=3900, profile=None, seed=None):
+    """Start the stand-in in a background thread. Returns (server, stub)."""
+    stub = CronStub(profile or load_profile(), seed=seed)
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the /api/cron/* routes")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3900)
+    parser.add_argument('--profile', help="JSON file with latency/error settings")
+    parser.add_argument('--latency-median', type=float, help="Override median latency (s) for every route")
+    parser.add_argument('--latency-sigma', type=float, help="Override log-normal sigma for every route")
+    parser.add_argument('--error-rate', type=float, help="Override error probability for every route")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    overrides = {
+        key: value for key, value in {
+            'latency_median': args.latency_median,
+            'latency_sigma': args.latency_sigma,
+            'error_rate': args.error_rate,
+        }.items() if value is not None
+    }
+    server, _ = start_server(args.host, args.port, load_profile(args.profile, overrides), args.seed)
+    print(f"🧪 Cron stand-in listening on http://{args.host}:{args.port}/api/cron/*")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,12 @@
 import os
+import json
+import time
 import requests
 from celery_config import app
 from dotenv import load_dotenv
+from metrics import record_run
+from results import consume_response, purge_expired
+import circuit
 
 load_dotenv()
 
@@ -13,53 +18,120 @@ load_dotenv()
 # Default to live production if LOCAL_APP_URL is not set
 APP_URL = os.getenv('APP_URL', os.getenv('LOCAL_APP_URL', 'https://piata-ai.ro'))
 CRON_SECRET = os.getenv('CRON_SECRET', '5f8d9e2a1b4c7d0e3f6a9b2c5e8d1a4f')
+# How many times a run skipped by an open circuit is re-queued before giving up.
+MAX_SKIP_RETRIES = int(os.getenv('MAX_SKIP_RETRIES', '8'))
 
-def trigger_endpoint(endpoint):
+def trigger_endpoint(endpoint, task=None):
     """
     Helper to trigger the API endpoint (local or live).
+    `task` is the calling (bound) task: its request feeds telemetry, and runs
+    skipped by an open circuit are re-queued through task.retry().
     """
     url = f"{APP_URL}{endpoint}"
+    job = endpoint.rstrip('/').rsplit('/', 1)[-1]
     print(f"🚀 Triggering task: {url}")
     
     headers = {
         "Authorization": f"Bearer {CRON_SECRET}",
         "Content-Type": "application/json"
     }
-    
+
+    request = getattr(task, 'request', None)
+    started = time.time()
+    queue_wait = None
+    published_at = getattr(request, 'published_at', None)
+    if published_at:
+        queue_wait = max(0.0, started - float(published_at))
+    retries = getattr(request, 'retries', 0) or 0
+
+    try:
+        mode = circuit.before_call(job)
+    except circuit.CircuitOpen as e:
+        record_run(job, 'skipped', queue_wait=queue_wait, retries=retries)
+        if task is not None and retries < MAX_SKIP_RETRIES:
+            countdown = circuit.retry_countdown(retries, e.retry_after)
+            print(f"⛔ {e} - retrying in {countdown:.0f}s")
+            raise task.retry(countdown=countdown, max_retries=MAX_SKIP_RETRIES)
+        print(f"⛔ {e} - giving up")
+        return {"error": str(e), "skipped": True, "job": job}
+
+    size = None
     try:
-        response = requests.get(url, headers=headers, timeout=300)
-        print(f"✅ Status: {response.status_code} - {response.text[:100]}")
-        return response.json()
+        with requests.get(url, headers=headers, timeout=circuit.adaptive_timeout(job), stream=True) as response:
+            body, reference, size = consume_response(job, getattr(request, 'id', None), response)
+        result = reference if reference is not None else json.loads(body)
     except Exception as e:
+        # No response, a body that broke off (read timeout) or one that is not JSON:
+        # the run failed, whatever the status line said
+        circuit.record_failure(job, mode)
+        record_run(job, 'error', latency=time.time() - started, queue_wait=queue_wait,
+                   response_bytes=size, retries=retries)
         print(f"❌ Error triggering {endpoint}: {str(e)}")
-        return {"error": str(e)}
+        return {"error": str(e), "job": job}
 
-@app.task
-def jules_orchestrator():
+    # Only a fully read response that is JSON counts (consume_response parses offloaded bodies back),
+    # so a half-open probe closes the circuit on a real success
+    if response.status_code >= 500:
+        circuit.record_failure(job, mode)
+    else:
+        circuit.record_success(job, mode)
+    latency = time.time() - started
+    record_run(job, response.status_code, latency=latency, queue_wait=queue_wait,
+               response_bytes=size, retries=retries)
+    preview = f"offloaded to {reference['path']}" if reference else body[:100].decode('utf-8', errors='replace')
+    print(f"✅ Status: {response.status_code} in {latency:.2f}s ({size} bytes) - {preview}")
+    if isinstance(result, dict) and 'error' in result:
+        result.setdefault('job', job)
+    return result
+
+
+def run_step(endpoint, task, previous=None):
+    """
+    One job run. In a workflow chain `previous` is the result of the step
+    before; when that step failed (its result has an "error"), this job does
+    not run and passes the failure on, so the rest of the chain stops too.
+    """
+    job = endpoint.rstrip('/').rsplit('/', 1)[-1]
+    if not (isinstance(previous, dict) and 'error' in previous):
+        return trigger_endpoint(endpoint, task)
+    failed = previous.get('failed_step') or previous.get('job', 'previous step')
+    record_run(job, 'aborted')
+    print(f"⏭️ Not running {job}: {failed} failed")
+    return {"error": f"{failed} failed", "failed_step": failed, "aborted": previous.get('aborted', []) + [job]}
+
+@app.task(bind=True)
+def jules_orchestrator(self, previous=None):
     print("🤖 Executing Jules Orchestrator")
-    return trigger_endpoint('/api/cron/jules-orchestrator')
+    return run_step('/api/cron/jules-orchestrator', self, previous)
 
-@app.task
-def blog_daily():
+@app.task(bind=True)
+def blog_daily(self, previous=None):
     print("✍️ Executing Blog Daily")
-    return trigger_endpoint('/api/cron/blog-daily')
+    return run_step('/api/cron/blog-daily', self, previous)
 
-@app.task
-def trending_topics():
+@app.task(bind=True)
+def trending_topics(self, previous=None):
     print("📈 Executing Trending Topics")
-    return trigger_endpoint('/api/cron/trending-topics')
+    return run_step('/api/cron/trending-topics', self, previous)
 
-@app.task
-def shopping_agents_runner():
+@app.task(bind=True)
+def shopping_agents_runner(self, previous=None):
     print("🛍️ Executing Shopping Agents")
-    return trigger_endpoint('/api/cron/shopping-agents-runner')
+    return run_step('/api/cron/shopping-agents-runner', self, previous)
 
-@app.task
-def autonomous_marketing():
+@app.task(bind=True)
+def autonomous_marketing(self, previous=None):
     print("📢 Executing Autonomous Marketing")
-    return trigger_endpoint('/api/cron/autonomous-marketing')
+    return run_step('/api/cron/autonomous-marketing', self, previous)
 
-@app.task
-def social_media_generator():
+@app.task(bind=True)
+def social_media_generator(self, previous=None):
     print("📱 Executing Social Media Generator")
-    return trigger_endpoint('/api/cron/social-media-generator')
+    return run_step('/api/cron/social-media-generator', self, previous)
+
+
+@app.task
+def purge_results():
+    removed = purge_expired()
+    print(f"🧹 Purged {removed} expired offloaded results")
+    return {"removed": removed}
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Checks results.consume_response: small and offloaded bodies, and that a body
+that is not JSON fails however large it is.
+
+    cd Backend/scheduler && python3 test-results.py
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ['RESULT_STORE_DIR'] = tempfile.mkdtemp()
+
+import results
+
+
+class Response:
+    """Enough of a streamed `requests` response for consume_response."""
+
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+BIG = json.dumps({"posts": ["x" * 100 for _ in range(2000)]}).encode()
+HTML = b"<html><body>" + b"Bad gateway " * 20000 + b"</body></html>"
+
+
+def rejects(body, **kwargs):
+    try:
+        results.consume_response('job', None, Response(body), **kwargs)
+    except ValueError:
+        return True
+    return False
+
+
+def test_inline_and_offloaded():
+    body, reference, size = results.consume_response('job', 'small', Response(b'{"ok": true}'))
+    assert body == b'{"ok": true}' and reference is None and size == 12
+    body, reference, size = results.consume_response('job', 'big', Response(BIG))
+    assert body is None and reference['bytes'] == size == len(BIG) and not reference['truncated']
+    assert results.load_result(reference) == json.loads(BIG)
+
+
+def test_large_non_json_fails():
+    assert rejects(HTML)
+    assert rejects(BIG[:-1])  # cut short
+    # The rejected spools are removed, not left half-written
+    assert not [name for name in os.listdir(os.path.join(results.RESULT_STORE_DIR, 'job')) if name.endswith('.tmp')]
+
+
+def test_truncated_bodies():
+    _, reference, _ = results.consume_response('job', 'cut', Response(BIG), max_bytes=50_000)
+    assert reference['truncated'] and reference['bytes'] == 50_000
+    assert rejects(b"  " + HTML, max_bytes=50_000)
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in sorted((n, f) for n, f in globals().items() if n.startswith("test_")):
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
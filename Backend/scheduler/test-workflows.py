@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Checks the workflow canvases of workflows.py: a chain step that fails stops
+the steps after it, and workflow_summary reports both. Tasks run eagerly and
+trigger_endpoint is replaced by a fake, so no broker, Redis or app is needed.
+
+    cd Backend/scheduler && python3 test-workflows.py
+"""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('REDIS_URL', 'redis://localhost:1/0')  # telemetry writes fail quietly
+
+from celery_config import app
+import tasks
+import workflows
+
+app.conf.task_always_eager = True
+app.conf.task_eager_propagates = True
+
+MONDAY = datetime(2026, 1, 5, tzinfo=timezone.utc)
+TUESDAY = datetime(2026, 1, 6, tzinfo=timezone.utc)
+
+
+def run_content(today, failing=()):
+    """Run the content workflow as of `today`; returns (jobs called, summary)."""
+    called = []
+
+    def trigger(endpoint, task=None):
+        job = endpoint.rsplit('/', 1)[-1]
+        called.append(job)
+        return {"error": "HTTP 500", "job": job} if job in failing else {"success": True}
+
+    original, tasks.trigger_endpoint = tasks.trigger_endpoint, trigger
+    try:
+        canvas = workflows.build(workflows.WORKFLOWS['content'], today)
+        canvas.body.kwargs.update({'name': 'content'})
+        return called, canvas.apply_async().get()
+    finally:
+        tasks.trigger_endpoint = original
+
+
+def test_chain_runs_in_order():
+    called, summary = run_content(MONDAY)
+    assert called == ['trending-topics', 'blog-daily', 'social-media-generator'], called
+    assert summary['failed'] == 0 and summary['aborted'] == [], summary
+    # Trending topics only on Mondays; blog_daily then starts the chain
+    called, summary = run_content(TUESDAY)
+    assert called == ['blog-daily', 'social-media-generator'] and summary['failed'] == 0, (called, summary)
+
+
+def test_failed_middle_step_stops_chain():
+    called, summary = run_content(MONDAY, failing={'blog-daily'})
+    assert called == ['trending-topics', 'blog-daily'], called
+    assert summary['failed_steps'] == ['blog-daily'], summary
+    assert summary['aborted'] == ['social-media-generator'], summary
+
+
+def test_failed_first_step_stops_chain():
+    called, summary = run_content(MONDAY, failing={'trending-topics'})
+    assert called == ['trending-topics'], called
+    assert summary['failed_steps'] == ['trending-topics'], summary
+    assert summary['aborted'] == ['blog-daily', 'social-media-generator'], summary
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in sorted((n, f) for n, f in globals().items() if n.startswith("test_")):
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
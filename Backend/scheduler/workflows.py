@@ -0,0 +1,121 @@
+import time
+from datetime import datetime, timezone
+from celery import chain, group, chord
+from celery_config import app
+
+# ------------------------------------------------------------------------------
+# Workflow definitions
+# ------------------------------------------------------------------------------
+# Jobs that feed each other run as chains, so the next step starts as soon as
+# its input is ready instead of at a guessed clock time. Jobs that feed nothing
+# stay on their own beat entries in celery_config.py. A node is one of:
+#   'task_name'                              run tasks.<task_name>
+#   {'task': 'task_name', 'weekdays': [0]}   only on these days (0 = Monday)
+#   {'chain': [node, ...]}                   run one after another
+#   {'group': [node, ...]}                   run in parallel
+#   {'chord': [node, ...], 'body': node}     parallel, then body with all results
+# A chain step receives the result of the step before it, and only to see
+# whether it failed: if so, the step does not run and passes the failure on
+# (tasks.run_step), so a failed step stops the rest of its chain. Every other
+# step is an immutable signature that ignores what came before.
+# ------------------------------------------------------------------------------
+
+WORKFLOWS = {
+    'content': {
+        'chord': [
+            {'chain': [
+                {'task': 'trending_topics', 'weekdays': [0]},
+                'blog_daily',
+                'social_media_generator',
+            ]},
+        ],
+        'body': 'workflow_summary',
+    },
+}
+
+
+def build(node, today=None, immutable=True):
+    """Turn a workflow node into a Celery canvas; returns None if nothing runs today."""
+    weekday = (today or datetime.now(timezone.utc)).weekday()
+
+    if isinstance(node, str):
+        node = {'task': node}
+
+    if 'task' in node:
+        if 'weekdays' in node and weekday not in node['weekdays']:
+            return None
+        module = 'workflows' if node['task'] == 'workflow_summary' else 'tasks'
+        return app.signature(f"{module}.{node['task']}", immutable=immutable)
+
+    for kind in ('chain', 'group', 'chord'):
+        if kind in node:
+            steps = [s for s in (build(child, today, immutable=kind != 'chain') for child in node[kind])
+                     if s is not None]
+            break
+    else:
+        raise ValueError(f"Unknown workflow node: {node}")
+
+    if not steps:
+        return None
+    if kind == 'chain':
+        steps[0].set(immutable=True)  # the first step that runs today has no parent
+        return steps[0] if len(steps) == 1 else chain(*steps)
+    if kind == 'group':
+        return group(*steps)
+    # The chord body is the one step that does want the results it waited for.
+    return chord(steps, build(node['body'], today, immutable=False))
+
+
+def describe(canvas, indent=0):
+    """Human readable outline of a canvas returned by build()."""
+    pad = '  ' * indent
+    if canvas is None:
+        return f"{pad}(nothing today)"
+    if isinstance(canvas, chord):
+        lines = [f"{pad}chord"]
+        lines += [describe(t, indent + 1) for t in canvas.tasks]
+        lines += [f"{pad}then", describe(canvas.body, indent + 1)]
+        return '\n'.join(lines)
+    if isinstance(canvas, (chain, group)):
+        lines = [f"{pad}{'chain' if isinstance(canvas, chain) else 'group'}"]
+        lines += [describe(t, indent + 1) for t in canvas.tasks]
+        return '\n'.join(lines)
+    return f"{pad}{canvas.task}"
+
+
+@app.task
+def run_workflow(name):
+    """Entry point used by beat: build today's canvas for `name` and start it."""
+    definition = WORKFLOWS[name]
+    canvas = build(definition)
+    if canvas is None:
+        print(f"⏭️ Workflow {name}: nothing scheduled today")
+        return {"workflow": name, "started": False}
+
+    # The summary callback needs to know which run it reports on.
+    if isinstance(canvas, chord):
+        canvas.body.kwargs.update({'name': name, 'started': time.time()})
+
+    print(f"🧩 Starting workflow {name}")
+    result = canvas.apply_async()
+    return {"workflow": name, "started": True, "id": result.id}
+
+
+@app.task
+def workflow_summary(results=None, name=None, started=None):
+    """
+    Chord callback: report how the fanned-out jobs went, which chain steps
+    failed and which were not run because of them, and the wall-clock time.
+    """
+    results = results if isinstance(results, list) else [results]
+    errors = [r for r in results if isinstance(r, dict) and 'error' in r]
+    failed_steps = [r.get('failed_step') or r.get('job') for r in errors]
+    aborted = [job for r in errors for job in r.get('aborted', [])]
+    elapsed = time.time() - started if started else None
+    duration = f" in {elapsed:.1f}s" if elapsed is not None else ''
+    print(f"🏁 Workflow {name} finished{duration}: {len(results) - len(errors)} ok, {len(errors)} failed")
+    if errors:
+        print(f"   failed: {', '.join(str(job) for job in failed_steps)}"
+              + (f"; not run: {', '.join(aborted)}" if aborted else ''))
+    return {"workflow": name, "jobs": len(results), "failed": len(errors), "failed_steps": failed_steps,
+            "aborted": aborted, "elapsed": elapsed}
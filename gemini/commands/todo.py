@@ -1,18 +1,5 @@
-import json
-import os
 from tool_code import write_todos
-
-TODO_FILE = os.path.join(os.path.dirname(__file__), "todos.json")
-
-def load_todos():
-    if not os.path.exists(TODO_FILE):
-        return []
-    with open(TODO_FILE, "r") as f:
-        return json.load(f)
-
-def save_todos(todos):
-    with open(TODO_FILE, "w") as f:
-        json.dump(todos, f, indent=2)
+from gemini.commands.todo_store import open_store
 
 def display_todos(todos):
     todos_for_display = []
@@ -24,37 +11,43 @@ def display_todos(todos):
     write_todos(todos=todos_for_display)
 
 def add_todo(description):
-    todos = load_todos()
-    new_id = 1 if not todos else max(todo["id"] for todo in todos) + 1
-    todos.append({"id": new_id, "description": description, "status": "pending"})
-    save_todos(todos)
+    store = open_store()
+    new_id = store.add(description)
     print(f"Added todo {new_id}: {description}")
-    display_todos(todos)
+    display_todos(store.all())
+    store.close()
 
-def list_todos():
-    todos = load_todos()
-    display_todos(todos)
+def list_todos(status=None):
+    store = open_store()
+    display_todos(store.all(status))
+    store.close()
 
 def update_todo_status(todo_id, status):
-    todos = load_todos()
-    found = False
-    for todo in todos:
-        if todo["id"] == todo_id:
-            todo["status"] = status
-            found = True
-            break
-    if found:
-        save_todos(todos)
-        print(f"Todo {todo_id} marked as {status}.")
-        display_todos(todos)
-    else:
+    update_todos_status([todo_id], status)
+
+def update_todos_status(todo_ids, status):
+    store = open_store()
+    updated = store.set_status(todo_ids, status)
+    missing = sorted(set(todo_ids) - set(updated))
+    if updated:
+        print(f"Todo {', '.join(map(str, updated))} marked as {status}.")
+    for todo_id in missing:
         print(f"Error: Todo with ID {todo_id} not found.")
+    if updated:
+        display_todos(store.all())
+    store.close()
+
+def parse_ids(ids):
+    return [int(part) for part in str(ids).replace(",", " ").split()]
 
 def complete_todo(todo_id):
     update_todo_status(todo_id, "completed")
 
+def complete_todos(ids):
+    update_todos_status(parse_ids(ids), "completed")
+
 def in_progress_todo(todo_id):
     update_todo_status(todo_id, "in_progress")
 
 def cancel_todo(todo_id):
-    update_todo_status(todo_id, "cancelled")
\ No newline at end of file
+    update_todo_status(todo_id, "cancelled")
@@ -0,0 +1,179 @@
+"""
+Storage for the todo command.
+
+SqliteTodoStore (the default) keeps todos in todos.sqlite3 next to this file:
+WAL mode, `id` as the primary key and an index on status, so looking up or
+updating a todo touches one row. Every change runs in its own transaction.
+BEGIN IMMEDIATE serializes concurrent writers, so two invocations at once
+cannot lose each other's updates. set_status() takes many ids at once.
+
+JsonTodoStore is the original todos.json format. It reads and rewrites the
+whole file on every change. Set TODO_BACKEND=json to keep using it.
+
+The first time the SQLite store opens, an existing todos.json is imported in
+one transaction and renamed to todos.json.migrated. After that the JSON store
+refuses to start, so it cannot hand out ids the SQLite store already uses. A
+todos.json that turns up again is merged: todos already in SQLite are
+skipped, and one whose id is taken by a different todo gets a new id, which
+is reported.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+from contextlib import contextmanager
+
+COMMANDS_DIR = os.path.dirname(os.path.abspath(__file__))
+TODO_BACKEND = os.getenv("TODO_BACKEND", "sqlite")
+JSON_PATH = os.path.join(COMMANDS_DIR, "todos.json")
+SQLITE_PATH = os.path.join(COMMANDS_DIR, "todos.sqlite3")
+
+
+class JsonTodoStore:
+    def __init__(self, path=JSON_PATH):
+        if not os.path.exists(path) and os.path.exists(path + ".migrated"):
+            raise RuntimeError(f"{path} was moved into the SQLite store ({path}.migrated); "
+                               "unset TODO_BACKEND=json to use it")
+        self.path = path
+
+    def all(self, status=None):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r") as f:
+            todos = json.load(f)
+        return [todo for todo in todos if status is None or todo["status"] == status]
+
+    def _save(self, todos):
+        with open(self.path, "w") as f:
+            json.dump(todos, f, indent=2)
+
+    def add(self, description):
+        todos = self.all()
+        new_id = 1 if not todos else max(todo["id"] for todo in todos) + 1
+        todos.append({"id": new_id, "description": description, "status": "pending"})
+        self._save(todos)
+        return new_id
+
+    def get(self, todo_id):
+        return next((todo for todo in self.all() if todo["id"] == todo_id), None)
+
+    def set_status(self, todo_ids, status):
+        """Ids that were found and updated."""
+        todos, wanted, updated = self.all(), set(todo_ids), []
+        for todo in todos:
+            if todo["id"] in wanted:
+                todo["status"] = status
+                updated.append(todo["id"])
+        if updated:
+            self._save(todos)
+        return updated
+
+    def close(self):
+        pass
+
+
+class SqliteTodoStore:
+    def __init__(self, path=SQLITE_PATH, json_path=JSON_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS todos (
+                id INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending'
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS todos_status ON todos (status)")
+        self.renumbered = []
+        if json_path and os.path.exists(json_path):
+            self._migrate(json_path)
+
+    @contextmanager
+    def _write(self):
+        # Takes the write lock up front: a concurrent writer waits instead of failing mid-transaction
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _migrate(self, json_path):
+        with self._write():
+            # Another invocation may have migrated while this one waited for the lock
+            if not os.path.exists(json_path):
+                return
+            with open(json_path, "r") as f:
+                todos = json.load(f)
+            existing = {row["id"]: row["description"] for row in self.conn.execute("SELECT id, description FROM todos")}
+            clashes = [todo for todo in todos if todo["id"] in existing and existing[todo["id"]] != todo["description"]]
+            self.conn.executemany(
+                "INSERT INTO todos (id, description, status) VALUES (?, ?, ?)",
+                ((todo["id"], todo["description"], todo["status"]) for todo in todos if todo["id"] not in existing),
+            )
+            # Never overwrite a todo: a clashing one is added after the rest with a new id
+            for todo in clashes:
+                new_id = self.conn.execute("INSERT INTO todos (description, status) VALUES (?, ?)",
+                                           (todo["description"], todo["status"])).lastrowid
+                self.renumbered.append((todo["id"], new_id))
+            os.replace(json_path, json_path + ".migrated")
+        for old_id, new_id in self.renumbered:
+            print(f"Warning: todo {old_id} in {json_path} clashed with an existing todo; imported as {new_id}.",
+                  file=sys.stderr)
+
+    def all(self, status=None):
+        if status is None:
+            rows = self.conn.execute("SELECT id, description, status FROM todos ORDER BY id")
+        else:
+            rows = self.conn.execute("SELECT id, description, status FROM todos WHERE status = ? ORDER BY id",
+                                     (status,))
+        return [dict(row) for row in rows]
+
+    def add(self, description):
+        with self._write():
+            # An INTEGER PRIMARY KEY left NULL becomes max(id) + 1, read off the end of the index
+            return self.conn.execute("INSERT INTO todos (description) VALUES (?)", (description,)).lastrowid
+
+    def add_many(self, descriptions):
+        with self._write():
+            first = self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM todos").fetchone()[0]
+            self.conn.executemany("INSERT INTO todos (id, description) VALUES (?, ?)",
+                                  enumerate(descriptions, start=first))
+        return list(range(first, first + len(descriptions)))
+
+    def get(self, todo_id):
+        row = self.conn.execute("SELECT id, description, status FROM todos WHERE id = ?", (todo_id,)).fetchone()
+        return dict(row) if row else None
+
+    def set_status(self, todo_ids, status):
+        """Ids that were found and updated, all in one transaction."""
+        todo_ids = list(todo_ids)
+        updated = []
+        with self._write():
+            # SQLite caps bound variables per statement
+            for start in range(0, len(todo_ids), 500):
+                chunk = todo_ids[start:start + 500]
+                updated += [row[0] for row in self.conn.execute(
+                    f"UPDATE todos SET status = ? WHERE id IN ({','.join('?' * len(chunk))}) RETURNING id",
+                    (status, *chunk),
+                )]
+        return sorted(updated)
+
+    def close(self):
+        self.conn.close()
+
+
+def open_store(backend=None):
+    backend = backend or TODO_BACKEND
+    if backend == "json":
+        return JsonTodoStore()
+    if backend == "sqlite":
+        return SqliteTodoStore()
+    raise ValueError(f"Unknown TODO_BACKEND {backend!r} (use sqlite or json)")
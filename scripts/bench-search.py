@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+# ------------------------------------------------------------------------------
+# Listing search benchmark
+# ------------------------------------------------------------------------------
+# Generates --rows listings (Romanian titles and descriptions, with
+# diacritics) shaped like anunturi, then times, per search term:
+#
+#   - ILIKE '%term%' on title or description, newest first: what
+#     search_users and the listing tools do today (sequential scan);
+#   - ILIKE '%term%' on the title with a pg_trgm GIN index (when pg_trgm is
+#     installed);
+#   - search_listings' full-text query: websearch_to_tsquery over the stored
+#     search_vector with a GIN index, top results by ts_rank among the
+#     newest SQL_LECTOR_SEARCH_RANK_WINDOW matches, among all matches, and
+#     newest first;
+#   - a deep page (--deep rows in), with OFFSET and with search_listings'
+#     keyset cursor.
+#
+#   python scripts/bench-search.py --db-url postgresql://postgres@localhost:5432/postgres
+#
+# It uses the migration's public.romanian_unaccent configuration when it
+# exists and plain romanian otherwise. It creates (and drops) a
+# lector_bench_search table; point it at a local container.
+# ------------------------------------------------------------------------------
+
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS)
+
+import psycopg
+from psycopg.rows import dict_row
+
+from sql_lector.search import ListingSearch
+
+TABLE = "lector_bench_search"
+PAGE = 20
+# Common to rare words of the generated text, and two-word queries
+TERMS = ["apartament", "mașină", "bicicletă", "vioară", "cărți", "frigider Arctic", "dacia diesel"]
+
+WORDS = {
+    "item": ["Apartament", "Garsonieră", "Casă", "Mașină", "Dacia Logan", "Bicicletă", "Frigider", "Televizor",
+             "Laptop", "Telefon", "Canapea", "Masă", "Scaun", "Pantofi", "Geacă", "Vioară", "Chitară", "Cărți"],
+    "quality": ["nou", "ca nou", "folosit", "în stare bună", "impecabil", "de vânzare urgent", "negociabil",
+                "cu garanție", "second-hand", "original"],
+    "detail": ["cu 2 camere", "cu 3 camere", "decomandat", "an 2015", "diesel", "benzină", "mărimea 42",
+               "culoare neagră", "Samsung", "Arctic", "Lenovo", "din lemn masiv", "pentru copii", "electric"],
+    "city": ["București", "Cluj-Napoca", "Iași", "Timișoara", "Constanța", "Brașov", "Craiova", "Galați",
+             "Oradea", "Ploiești", "Sibiu", "Suceava"],
+}
+
+
+def pick(name, expr):
+    """SQL picking a word of WORDS[name] by a hash of g; earlier words are (quadratically) more common."""
+    words = WORDS[name]
+    n = len(words)
+    return f"(ARRAY[{', '.join(repr(w) for w in words)}])[{n} - floor(sqrt(({expr}) % {n * n}))::int]"
+
+
+async def setup(db_url, rows):
+    async with await psycopg.AsyncConnection.connect(db_url, autocommit=True) as conn:
+        cur = await conn.execute("SELECT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'romanian_unaccent' "
+                                 "AND cfgnamespace = 'public'::regnamespace), "
+                                 "EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        unaccent, trigram = await cur.fetchone()
+        config = "public.romanian_unaccent" if unaccent else "pg_catalog.romanian"
+        await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        await conn.execute(f"""
+            CREATE TABLE {TABLE} (
+                id serial PRIMARY KEY, user_id text, category_id int NOT NULL, title varchar(500) NOT NULL,
+                description text, price numeric(12, 2), location varchar(255), status varchar(20) DEFAULT 'active',
+                created_at timestamp DEFAULT now(),
+                search_vector tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('{config}'::regconfig, coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('{config}'::regconfig, coalesce(description, '')), 'B') ||
+                    setweight(to_tsvector('{config}'::regconfig, coalesce(location, '')), 'C')
+                ) STORED
+            )""")
+        started = time.perf_counter()
+        # Multiplicative hashing spreads the word choices without random() (repeatable runs)
+        await conn.execute(f"""
+            INSERT INTO {TABLE} (user_id, category_id, title, description, price, location, status, created_at)
+            SELECT 'user-' || (g % 5000), g % 40,
+                   {pick('item', 'g * 7919')} || ' ' || {pick('quality', 'g * 104729')} || ' ' ||
+                       {pick('detail', 'g * 1299709')},
+                   'Vând ' || lower({pick('item', 'g * 15485863')}) || ', ' || {pick('quality', 'g * 32452843')} ||
+                       ', ' || {pick('detail', 'g * 49979687')} || '. Preț ' || (g % 9000 + 100) || ' lei.',
+                   (g % 9000 + 100) * 1.0, {pick('city', 'g * 86028121')},
+                   CASE WHEN g % 10 = 0 THEN 'sold' ELSE 'active' END,
+                   timestamp '2026-01-01' - (g % 525600) * interval '1 minute'
+            FROM generate_series(1::bigint, {int(rows)}) g""")
+        loaded = time.perf_counter() - started
+        await conn.execute(f"CREATE INDEX ON {TABLE} (status, created_at DESC)")
+        started = time.perf_counter()
+        await conn.execute(f"CREATE INDEX {TABLE}_search ON {TABLE} USING gin (search_vector)")
+        gin_seconds = time.perf_counter() - started
+        trigram_seconds = None
+        if trigram:
+            started = time.perf_counter()
+            await conn.execute(f"CREATE INDEX {TABLE}_title_trgm ON {TABLE} USING gin (lower(title) gin_trgm_ops)")
+            trigram_seconds = time.perf_counter() - started
+        await conn.execute(f"VACUUM ANALYZE {TABLE}")
+        cur = await conn.execute(f"SELECT pg_relation_size('{TABLE}'), pg_relation_size('{TABLE}_search')")
+        table_bytes, gin_bytes = await cur.fetchone()
+    return {"config": config, "trigram": trigram, "load_seconds": round(loaded, 1),
+            "gin_build_seconds": round(gin_seconds, 1),
+            "trigram_build_seconds": None if trigram_seconds is None else round(trigram_seconds, 1),
+            "table_mb": round(table_bytes / 2**20, 1), "gin_mb": round(gin_bytes / 2**20, 1)}
+
+
+async def teardown(db_url):
+    async with await psycopg.AsyncConnection.connect(db_url, autocommit=True) as conn:
+        await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+# ---- queries -------------------------------------------------------------------
+
+def ilike_sql(term, title_only=False):
+    match = "lower(title) LIKE %(p)s" if title_only else "(title ILIKE %(p)s OR description ILIKE %(p)s)"
+    return (f"SELECT id, title, price, location, category_id, created_at FROM {TABLE} "
+            f"WHERE status = 'active' AND {match} ORDER BY created_at DESC LIMIT {PAGE}",
+            {"p": f"%{term.lower() if title_only else term}%"})
+
+
+async def time_query(conn, sql, params, repeat):
+    """Median and best ms over `repeat` runs, and the row count of the last run."""
+    samples, rows = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur = await conn.execute(sql, params)
+        rows = await cur.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(samples), 2), "best_ms": round(min(samples), 2), "rows": len(rows)}
+
+
+async def count_matches(conn, search, term):
+    sql, params = search.build_sql("fulltext", term, {}, "newest", 0)
+    sql = f"SELECT count(*) AS n FROM ({sql.rsplit(' ORDER BY', 1)[0]}) m"
+    cur = await conn.execute(sql, params)
+    return (await cur.fetchone())["n"]
+
+
+async def run_searches(db_url, search, unbounded, trigram, repeat, deep):
+    results = {}
+    async with await psycopg.AsyncConnection.connect(db_url, autocommit=True, row_factory=dict_row) as conn:
+        for term in TERMS:
+            entry = {"matches": await count_matches(conn, search, term)}
+            entry["ilike"] = await time_query(conn, *ilike_sql(term), repeat)
+            if trigram:
+                entry["ilike_trigram"] = await time_query(conn, *ilike_sql(term, title_only=True), repeat)
+            entry["fulltext"] = await time_query(conn, *search.build_sql("fulltext", term, {}, "relevance", PAGE - 1),
+                                                 repeat)
+            entry["fulltext_all"] = await time_query(conn, *unbounded.build_sql("fulltext", term, {}, "relevance",
+                                                                                PAGE - 1), repeat)
+            entry["fulltext_newest"] = await time_query(conn, *search.build_sql("fulltext", term, {}, "newest",
+                                                                                PAGE - 1), repeat)
+            results[term] = entry
+
+        # Deep page of the most common term: skip `deep` rows with OFFSET, or seek past them with the cursor
+        term = TERMS[0]
+        sql, params = search.build_sql("fulltext", term, {}, "relevance", PAGE - 1)
+        offset = await time_query(conn, sql + f" OFFSET {deep}", params, repeat)
+        cur = await conn.execute(*search.build_sql("fulltext", term, {}, "relevance", deep - 1))
+        last = (await cur.fetchall())[-1]
+        keyset = await time_query(conn, *search.build_sql("fulltext", term, {}, "relevance", PAGE - 1,
+                                                          after=[last["sort_key"], last["id"]]), repeat)
+        sql, params = ilike_sql(term)
+        ilike_offset = await time_query(conn, sql + f" OFFSET {deep}", params, repeat)
+    return results, {"term": term, "rows_in": deep, "ilike_offset": ilike_offset,
+                     "fulltext_offset": offset, "fulltext_keyset": keyset}
+
+
+# ---- report -------------------------------------------------------------------
+
+def print_report(report):
+    c = report["config"]
+    print("\n📊 Listing search benchmark")
+    print("=" * 60)
+    print(f"Rows: {c['rows']:,}   config: {c['config']}   repeat: {c['repeat']}   page: {PAGE}")
+    print(f"Load: {c['load_seconds']} s   GIN build: {c['gin_build_seconds']} s   "
+          f"table: {c['table_mb']} MB   GIN: {c['gin_mb']} MB")
+    if not c["trigram"]:
+        print("pg_trgm is not installed: trigram timings skipped")
+    print(f"\nFirst page, median ms (speedup of full text over ILIKE; rank window {c['rank_window']:,}):")
+    for term, r in report["terms"].items():
+        line = f"  {term:<18} matches={r['matches']:<8,} ilike={r['ilike']['median_ms']:<9} "
+        if "ilike_trigram" in r:
+            line += f"trigram={r['ilike_trigram']['median_ms']:<9} "
+        line += (f"fulltext={r['fulltext']['median_ms']:<9} all={r['fulltext_all']['median_ms']:<9} newest={r['fulltext_newest']['median_ms']:<8} "
+                 f"({r['ilike']['median_ms'] / r['fulltext']['median_ms']:.1f}x)")
+        print(line)
+    d = report["deep_page"]
+    print(f"\nPage after {d['rows_in']:,} rows of '{d['term']}', median ms:")
+    for name in ("ilike_offset", "fulltext_offset", "fulltext_keyset"):
+        print(f"  {name:<18} {d[name]['median_ms']}")
+
+
+async def run(args):
+    config = await setup(args.db_url, args.rows)
+    search = ListingSearch(None, table=TABLE, config=config["config"])
+    unbounded = ListingSearch(None, table=TABLE, config=config["config"], rank_window=0)
+    config["rank_window"] = search.rank_window
+    try:
+        terms, deep = await run_searches(args.db_url, search, unbounded, config["trigram"], args.repeat, args.deep)
+    finally:
+        if not args.keep:
+            await teardown(args.db_url)
+    return {"config": {"rows": args.rows, "repeat": args.repeat, **config}, "terms": terms, "deep_page": deep}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ILIKE against indexed listing search")
+    parser.add_argument('--db-url', default=os.getenv('SQL_LECTOR_BENCH_DB_URL', os.getenv('DATABASE_URL')),
+                        help="Database to benchmark against (a lector_bench_search table is created and dropped)")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Generated listings")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per query")
+    parser.add_argument('--deep', type=int, default=2_000, help="Rows skipped for the deep-page comparison")
+    parser.add_argument('--keep', action='store_true', help="Leave the lector_bench_search table in place")
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("--db-url (or SQL_LECTOR_BENCH_DB_URL / DATABASE_URL) is required")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Report written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
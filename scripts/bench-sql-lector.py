@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+# ------------------------------------------------------------------------------
+# SQL Lector driver benchmark
+# ------------------------------------------------------------------------------
+# Compares the drivers behind sql_query on one database:
+#
+#   - rows/s: a full scan of --rows rows (int, text, numeric, timestamptz,
+#     jsonb) decoded into dicts, via psycopg2 RealDictCursor (the original
+#     Lector), psycopg 3 dict_row and asyncpg Records;
+#   - queries/s: --queries primary-key lookups, via one psycopg2 connection
+#     in a loop (the original Lector) and via psycopg 3 / asyncpg pools with
+#     --concurrency lookups in flight;
+#   - the same lookups through AntigravitySQLLector.execute_query (guard
+#     EXPLAIN + query, result cache off) on each backend, with literal ids
+#     (as MCP clients send them) and with bound %s parameters;
+#   - bulk loading: --insert-rows single-row INSERTs with a commit each (how
+#     insert-to-supabase.js seeds) against bulk_export / bulk_import (COPY) of
+#     the whole table, CSV and binary.
+#
+#   python scripts/bench-sql-lector.py --db-url postgresql://postgres@localhost:5432/postgres
+#
+# It creates (and drops) a lector_bench table; point it at a local container.
+# ------------------------------------------------------------------------------
+
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS)
+
+import psycopg
+import asyncpg
+from psycopg.rows import dict_row
+
+try:
+    import psycopg2
+    import psycopg2.extras
+except ImportError:  # pragma: no cover - only needed for the baseline
+    psycopg2 = None
+
+TABLE = "lector_bench"
+SCAN_QUERY = f"SELECT id, title, price, created_at, meta FROM {TABLE}"
+LOOKUP_QUERY = f"SELECT id, title, price, created_at, meta FROM {TABLE} WHERE id = %s"
+
+
+async def setup(db_url, rows):
+    async with await psycopg.AsyncConnection.connect(db_url, autocommit=True) as conn:
+        await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        await conn.execute(
+            f"""
+            CREATE TABLE {TABLE} AS
+            SELECT g AS id, 'Anunt ' || g AS title, (g %% 10000) * 1.25 AS price,
+                   now() - g * interval '1 minute' AS created_at,
+                   jsonb_build_object('category', g %% 40, 'promoted', g %% 7 = 0) AS meta
+            FROM generate_series(1, %s) g
+            """,
+            (rows,),
+        )
+        await conn.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)")
+        await conn.execute(f"ANALYZE {TABLE}")
+
+
+async def teardown(db_url):
+    async with await psycopg.AsyncConnection.connect(db_url, autocommit=True) as conn:
+        await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+def timed(samples):
+    """Best and median of a list of seconds."""
+    return {"best": min(samples), "median": statistics.median(samples)}
+
+
+# ---- rows/s -------------------------------------------------------------------
+
+def scan_psycopg2(db_url, repeat):
+    conn = psycopg2.connect(db_url)
+    samples = []
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(SCAN_QUERY)
+                rows = cur.fetchall()
+            samples.append(time.perf_counter() - started)
+            conn.rollback()
+    finally:
+        conn.close()
+    return len(rows), samples
+
+
+async def scan_psycopg(db_url, repeat):
+    samples = []
+    async with await psycopg.AsyncConnection.connect(db_url) as conn:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(SCAN_QUERY)
+                rows = await cur.fetchall()
+            samples.append(time.perf_counter() - started)
+            await conn.rollback()
+    return len(rows), samples
+
+
+async def scan_asyncpg(db_url, repeat):
+    samples = []
+    conn = await asyncpg.connect(db_url)
+    try:
+        for kind in ("json", "jsonb"):
+            await conn.set_type_codec(kind, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = [dict(r) for r in await conn.fetch(SCAN_QUERY)]
+            samples.append(time.perf_counter() - started)
+    finally:
+        await conn.close()
+    return len(rows), samples
+
+
+# ---- queries/s ----------------------------------------------------------------
+
+def lookups_psycopg2(db_url, ids):
+    conn = psycopg2.connect(db_url)
+    try:
+        started = time.perf_counter()
+        for i in ids:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(LOOKUP_QUERY, (i,))
+                cur.fetchall()
+            conn.commit()
+        return time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+async def run_concurrently(ids, concurrency, lookup):
+    queue = list(ids)
+
+    async def worker():
+        while queue:
+            await lookup(queue.pop())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def lookups_psycopg(db_url, ids, concurrency):
+    from psycopg_pool import AsyncConnectionPool
+
+    async with AsyncConnectionPool(db_url, min_size=concurrency, max_size=concurrency, open=False) as pool:
+        await pool.wait()
+
+        async def lookup(i):
+            async with pool.connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    await cur.execute(LOOKUP_QUERY, (i,))
+                    await cur.fetchall()
+
+        return await run_concurrently(ids, concurrency, lookup)
+
+
+async def lookups_asyncpg(db_url, ids, concurrency):
+    pool = await asyncpg.create_pool(db_url, min_size=concurrency, max_size=concurrency)
+    query = LOOKUP_QUERY.replace("%s", "$1")
+    try:
+        async def lookup(i):
+            async with pool.acquire() as conn:
+                [dict(r) for r in await conn.fetch(query, i)]
+
+        return await run_concurrently(ids, concurrency, lookup)
+    finally:
+        await pool.close()
+
+
+async def lookups_lector(db_url, ids, concurrency, backend, bound=False):
+    from addon import AntigravitySQLLector
+
+    lector = AntigravitySQLLector(db_url, min_size=concurrency, max_size=concurrency, backend=backend)
+    lector.profile.threshold_ms = float("inf")  # keep the benchmark out of the slow query log
+    await lector.open(wait=True)
+    try:
+        async def lookup(i):
+            if bound:
+                # One query text: prepared once per connection
+                await lector.execute_query(LOOKUP_QUERY, (i,), cache=False)
+            else:
+                # Literal ids, as an MCP client sends them: a new text each time
+                await lector.execute_query(LOOKUP_QUERY % i, cache=False)
+
+        return await run_concurrently(ids, concurrency, lookup)
+    finally:
+        await lector.close()
+
+
+# ---- bulk loading -------------------------------------------------------------
+
+async def insert_loop(db_url, count):
+    async with await psycopg.AsyncConnection.connect(db_url, autocommit=True) as conn:
+        await conn.execute(f"CREATE TEMP TABLE bench_insert (LIKE {TABLE})")
+        cur = await conn.execute(f"SELECT * FROM {TABLE} LIMIT %s", (count,))
+        rows = await cur.fetchall()
+        started = time.perf_counter()
+        for row in rows:
+            await conn.execute("INSERT INTO bench_insert VALUES (%s, %s, %s, %s, %s)",
+                               (row[0], row[1], row[2], row[3], psycopg.types.json.Jsonb(row[4])))
+        return len(rows), time.perf_counter() - started
+
+
+async def bulk_copy(db_url, fmt):
+    import tempfile
+    from sql_lector.pool import Database
+    from sql_lector.bulk import BulkCopy
+
+    db = Database(db_url, max_size=2)
+    await db.open()
+    bulk = BulkCopy(db, directory=tempfile.mkdtemp(prefix="lector-bench-"))
+    try:
+        async with db.connection() as conn:
+            await conn.execute(f"DROP TABLE IF EXISTS {TABLE}_copy")
+            await conn.execute(f"CREATE TABLE {TABLE}_copy (LIKE {TABLE})")
+        exported = await bulk.export(f"bench.{fmt}", table=TABLE, fmt=fmt)
+        imported = await bulk.import_file(f"bench.{fmt}", f"{TABLE}_copy", fmt=fmt)
+        os.unlink(exported["path"])
+        return exported, imported
+    finally:
+        async with db.connection() as conn:
+            await conn.execute(f"DROP TABLE IF EXISTS {TABLE}_copy")
+        await db.close()
+
+
+# ---- report -------------------------------------------------------------------
+
+def build_report(args, scans, lookups, loads):
+    report = {"config": {"rows": args.rows, "queries": args.queries, "concurrency": args.concurrency,
+                         "repeat": args.repeat},
+              "rows_per_second": {}, "queries_per_second": {}, "bulk_rows_per_second": loads}
+    for name, (count, samples) in scans.items():
+        t = timed(samples)
+        report["rows_per_second"][name] = {"best": round(count / t["best"]), "median": round(count / t["median"]),
+                                           "median_ms": round(t["median"] * 1000, 1)}
+    for name, elapsed in lookups.items():
+        report["queries_per_second"][name] = round(args.queries / elapsed)
+    return report
+
+
+def print_report(report):
+    c = report["config"]
+    print("\n📊 SQL Lector driver benchmark")
+    print("=" * 60)
+    print(f"Rows: {c['rows']:,}   lookups: {c['queries']:,}   concurrency: {c['concurrency']}   repeat: {c['repeat']}")
+    print("\nFull scan into dicts (rows/s):")
+    for name, r in report["rows_per_second"].items():
+        print(f"  {name:<30} best={r['best']:<10,} median={r['median']:<10,} ({r['median_ms']} ms)")
+    print("\nPrimary-key lookups (queries/s):")
+    for name, qps in report["queries_per_second"].items():
+        print(f"  {name:<30} {qps:,}")
+    print("\nBulk loading (rows/s):")
+    for name, rps in report["bulk_rows_per_second"].items():
+        print(f"  {name:<30} {rps:,}")
+
+
+async def run(args):
+    await setup(args.db_url, args.rows)
+    ids = [random.randint(1, args.rows) for _ in range(args.queries)]
+    scans, lookups, loads = {}, {}, {}
+    try:
+        if psycopg2 is not None:
+            scans["psycopg2 RealDictCursor"] = scan_psycopg2(args.db_url, args.repeat)
+        scans["psycopg 3 dict_row"] = await scan_psycopg(args.db_url, args.repeat)
+        scans["asyncpg Record -> dict"] = await scan_asyncpg(args.db_url, args.repeat)
+
+        if psycopg2 is not None:
+            lookups["psycopg2 (1 connection)"] = lookups_psycopg2(args.db_url, ids)
+        lookups["psycopg 3 pool"] = await lookups_psycopg(args.db_url, ids, args.concurrency)
+        lookups["asyncpg pool"] = await lookups_asyncpg(args.db_url, ids, args.concurrency)
+        lookups["Lector (psycopg)"] = await lookups_lector(args.db_url, ids, args.concurrency, "psycopg")
+        lookups["Lector (asyncpg)"] = await lookups_lector(args.db_url, ids, args.concurrency, "asyncpg")
+        lookups["Lector (psycopg, bound %s)"] = await lookups_lector(args.db_url, ids, args.concurrency,
+                                                                     "psycopg", bound=True)
+        lookups["Lector (asyncpg, bound %s)"] = await lookups_lector(args.db_url, ids, args.concurrency,
+                                                                     "asyncpg", bound=True)
+
+        count, elapsed = await insert_loop(args.db_url, args.insert_rows)
+        loads["INSERT per row (autocommit)"] = round(count / elapsed)
+        for fmt in ("csv", "binary"):
+            exported, imported = await bulk_copy(args.db_url, fmt)
+            loads[f"bulk_export ({fmt})"] = exported["rows_per_second"]
+            loads[f"bulk_import ({fmt})"] = imported["rows_per_second"]
+    finally:
+        if not args.keep:
+            await teardown(args.db_url)
+    return build_report(args, scans, lookups, loads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQL Lector's database drivers")
+    parser.add_argument('--db-url', default=os.getenv('SQL_LECTOR_BENCH_DB_URL', os.getenv('DATABASE_URL')),
+                        help="Database to benchmark against (a lector_bench table is created and dropped)")
+    parser.add_argument('--rows', type=int, default=100_000, help="Rows in the scanned table")
+    parser.add_argument('--queries', type=int, default=5_000, help="Primary-key lookups per driver")
+    parser.add_argument('--concurrency', type=int, default=8, help="Lookups in flight on the pooled drivers")
+    parser.add_argument('--repeat', type=int, default=5, help="Full scans per driver")
+    parser.add_argument('--insert-rows', type=int, default=2_000, help="Rows for the single-row INSERT baseline")
+    parser.add_argument('--keep', action='store_true', help="Leave the lector_bench table in place")
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("--db-url (or SQL_LECTOR_BENCH_DB_URL / DATABASE_URL) is required")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Report written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+# ------------------------------------------------------------------------------
+# Todo store benchmark
+# ------------------------------------------------------------------------------
+# Compares the two backends of gemini/commands/todo_store.py at --todos
+# todos, per operation (median ms over --ops runs):
+#
+#   - add: one new todo (the JSON store reads the file, takes max(id) and
+#     rewrites it; SQLite inserts one row);
+#   - get: one todo by id;
+#   - set_status: one todo's status (the `complete` subcommand);
+#   - complete_many: --bulk ids completed in one call;
+#   - list pending: the todos with one status.
+#
+# It also times the one-off migration of a --todos todos.json into SQLite.
+# Everything runs in a temporary directory.
+#
+#   python scripts/bench-todo.py --todos 100000
+# ------------------------------------------------------------------------------
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gemini.commands.todo_store import JsonTodoStore, SqliteTodoStore
+
+STATUSES = ["pending", "in_progress", "completed", "cancelled"]
+
+
+def seed_json(path, count):
+    random.seed(7)
+    todos = [{"id": i, "description": f"Task {i}: follow up listing {random.randint(1, 10 ** 6)}",
+              "status": random.choices(STATUSES, weights=[6, 2, 10, 1])[0]} for i in range(1, count + 1)]
+    with open(path, "w") as f:
+        json.dump(todos, f, indent=2)
+
+
+def timed(fn, ops):
+    samples = []
+    for i in range(ops):
+        started = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(samples), 3), "best_ms": round(min(samples), 3)}
+
+
+def run_store(store, count, ops, bulk):
+    ids = random.sample(range(1, count + 1), ops)
+    batches = [random.sample(range(1, count + 1), bulk) for _ in range(ops)]
+    return {
+        "add": timed(lambda i: store.add(f"Benchmark todo {i}"), ops),
+        "get": timed(lambda i: store.get(ids[i]), ops),
+        "set_status": timed(lambda i: store.set_status([ids[i]], "completed"), ops),
+        "complete_many": timed(lambda i: store.set_status(batches[i], "completed"), ops),
+        "list pending": timed(lambda i: store.all("pending"), ops),
+    }
+
+
+# ---- report -------------------------------------------------------------------
+
+def print_report(report):
+    c = report["config"]
+    print("\n📊 Todo store benchmark")
+    print("=" * 60)
+    print(f"Todos: {c['todos']:,}   ops: {c['ops']}   complete_many: {c['bulk']} ids   "
+          f"todos.json: {c['json_mb']} MB")
+    print(f"Migrating todos.json into SQLite: {report['migration_ms']:,} ms")
+    print("\nMedian ms per operation (speedup of SQLite over JSON):")
+    for op, json_result in report["json"].items():
+        sqlite_result = report["sqlite"][op]
+        print(f"  {op:<14} json={json_result['median_ms']:<10} sqlite={sqlite_result['median_ms']:<8} "
+              f"({json_result['median_ms'] / max(sqlite_result['median_ms'], 0.001):.0f}x)")
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "todos.json")
+        seed_json(json_path, args.todos)
+        json_mb = round(os.path.getsize(json_path) / 2 ** 20, 1)
+        random.seed(11)
+        json_results = run_store(JsonTodoStore(json_path), args.todos, args.ops, args.bulk)
+
+        seed_json(json_path, args.todos)
+        started = time.perf_counter()
+        store = SqliteTodoStore(os.path.join(tmp, "todos.sqlite3"), json_path=json_path)
+        migration_ms = round((time.perf_counter() - started) * 1000, 1)
+        random.seed(11)
+        sqlite_results = run_store(store, args.todos, args.ops, args.bulk)
+        store.close()
+    return {"config": {"todos": args.todos, "ops": args.ops, "bulk": args.bulk, "json_mb": json_mb},
+            "migration_ms": migration_ms, "json": json_results, "sqlite": sqlite_results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON and SQLite todo stores")
+    parser.add_argument('--todos', type=int, default=100_000, help="Todos in the store")
+    parser.add_argument('--ops', type=int, default=20, help="Runs per operation")
+    parser.add_argument('--bulk', type=int, default=1_000, help="Ids per complete_many call")
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Report written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,8 @@
 const puppeteer = require('puppeteer');
 const fs = require('fs').promises;
 const path = require('path');
+const { execFile } = require('child_process');
+const { promisify } = require('util');
 
 class MarketResearchScraper {
     constructor() {
@@ -174,6 +176,17 @@ class MarketResearchScraper {
         await fs.mkdir(path.dirname(outputPath), { recursive: true });
         await fs.writeFile(outputPath, JSON.stringify(this.results, null, 2));
         console.log(`📁 Results saved to ${outputPath}`);
+        await this.appendSnapshot(outputPath);
+    }
+
+    async appendSnapshot(outputPath) {
+        // The JSON file holds only this run; the snapshot store keeps every run for trends
+        try {
+            await promisify(execFile)('python3', [path.join(__dirname, 'market-snapshots.py'), 'append', outputPath]);
+            console.log('📈 Run appended to the market snapshot history');
+        } catch (error) {
+            console.error('⚠️ Could not append to the snapshot history:', error.message);
+        }
     }
 
     async run() {
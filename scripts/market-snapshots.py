@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Market research snapshot history (scripts/openmanus/snapshots.py).
+
+    python3 scripts/market-snapshots.py append data/market-research.json data/market-intelligence.json
+    python3 scripts/market-snapshots.py runs market-research
+    python3 scripts/market-snapshots.py series market-research --prefix "market_trends." --last 30
+    python3 scripts/market-snapshots.py diff market-research --prefix "competitors."
+
+`append` stores each file as a run of the kind named after the file;
+appending an unchanged file again stores nothing. scripts/market-research-scraper.js
+appends after every run. The other commands print JSON.
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openmanus.snapshots import SnapshotStore, SNAPSHOT_PATH, DEFAULT_WINDOW
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Market research snapshot history")
+    parser.add_argument("--path", default=SNAPSHOT_PATH, help="Snapshot database (OPENMANUS_SNAPSHOT_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    append = commands.add_parser("append", help="Store JSON snapshot files as runs")
+    append.add_argument("files", nargs="+")
+    append.add_argument("--kind", help="Kind of run (default: the file name without .json)")
+
+    for name, help_text in (("runs", "List the latest runs"),
+                            ("series", "Metric values over the latest runs"),
+                            ("diff", "Metrics that changed between the last two runs")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("kind")
+        command.add_argument("--last", type=int, default=DEFAULT_WINDOW, help="Runs to include")
+        if name != "runs":
+            command.add_argument("--prefix", default="", help="Only metrics whose name starts with this")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.path)
+    if args.command == "append":
+        output = {path: store.append_file(path, args.kind) for path in args.files}
+        output = {"runs": output, **store.summary()}
+    elif args.command == "runs":
+        output = [{"id": run_id, "taken_at": taken_at} for run_id, taken_at in store.runs(args.kind, args.last)]
+    elif args.command == "series":
+        output = store.series(args.kind, args.prefix, args.last)
+    else:
+        frame = store.frame(args.kind, args.prefix, max(args.last, 2))
+        output = [{"metric": name, "old": old, "new": new} for name, old, new in frame.changed()]
+    store.close()
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
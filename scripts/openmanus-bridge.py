@@ -9,10 +9,19 @@ import json
 import asyncio
 import os
 import re
+import time
+import argparse
 import requests
 from urllib.parse import quote
 from datetime import datetime
 
+from openmanus.ratelimit import HostRateLimiter
+from openmanus.cache import SearchCache, PageCache, normalize_query, FRESH, STALE
+from openmanus.server import BridgeServer, emit_progress, progress_handler
+from openmanus.extract import ResultPageParser, merge_results, bm25_rank
+from openmanus.fetch import PageFetcher, HTTPX_AVAILABLE
+from openmanus.analytics import analyze_results
+
 # Try to import search libraries, fall back gracefully
 try:
     from duckduckgo_search import DDGS
@@ -20,51 +29,173 @@ try:
 except ImportError:
     DDGS_AVAILABLE = False
 
-try:
-    import httpx
-    httpx_available = True
-except ImportError:
-    httpx_available = False
+# Shared by every search in this process: caps concurrent requests per backend
+rate_limiter = HostRateLimiter()
+
+# Persistent search cache; stale entries are served while refreshed in the background
+search_cache = SearchCache()
+_refresh_tasks = {}
+
+# Searches in flight; identical concurrent queries share one request
+_inflight = {}
+search_stats = {"issued": 0, "coalesced": 0}
+
+# Pooled HTTP client for result pages and deep-research page fetches
+page_cache = PageCache()
+fetcher = PageFetcher(rate_limiter, page_cache) if HTTPX_AVAILABLE else None
+
+# Deep research reads this many of the top-ranked result pages
+DEEP_RESEARCH_PAGES = int(os.getenv("OPENMANUS_DEEP_PAGES", "5"))
+
+# Result pages are parsed as they stream in, up to this many bytes
+RESULT_PAGE_MAX_BYTES = int(os.getenv("OPENMANUS_RESULT_PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# Prefetch refreshes entries that stop being fresh within this many seconds
+PREFETCH_MARGIN = float(os.getenv("OPENMANUS_PREFETCH_MARGIN", "3600"))
+
+# Topics of one batch researched at the same time
+BATCH_CONCURRENCY = int(os.getenv("OPENMANUS_BATCH_CONCURRENCY", "4"))
+BATCH_OPERATIONS = ("research", "marketing", "web_search")
+
+def log(message: str):
+    """Diagnostics go to stderr; stdout carries only JSON"""
+    print(message, file=sys.stderr)
+
+GOOGLE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+def _ddgs_text(query: str, num_results: int) -> list:
+    """Blocking DuckDuckGo call; run it in a worker thread."""
+    results = []
+    with DDGS() as ddgs:
+        search_results = ddgs.text(query, max_results=num_results)
+        for result in search_results:
+            results.append({
+                'title': result.get('title', ''),
+                'url': result.get('href', ''),
+                'snippet': result.get('body', ''),
+                'source': 'DuckDuckGo'
+            })
+    return results
 
 async def web_search(query: str, num_results: int = 5) -> list:
+    """Perform web search, served from the search cache when possible"""
+    try:
+        cached, state = search_cache.get(query, num_results)
+    except Exception as e:
+        log(f"Search cache error: {e}")
+        cached, state = None, None
+
+    if state == FRESH:
+        results = cached
+    elif state == STALE:
+        _schedule_refresh(query, num_results)
+        results = cached
+    else:
+        results = await _search_once(query, num_results)
+    emit_progress("search", query=query, results=len(results), cache=state or "error")
+    return results
+
+async def _search_once(query: str, num_results: int) -> list:
+    """Join an identical search already in flight instead of issuing another"""
+    key = (normalize_query(query), num_results)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_search_and_store(query, num_results))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        search_stats["coalesced"] += 1
+    # A cancelled caller must not cancel the search for the others
+    return await asyncio.shield(task)
+
+async def _search_and_store(query: str, num_results: int) -> list:
+    search_stats["issued"] += 1
+    results = await search_backends(query, num_results)
+    # Never cache the placeholder returned when every backend failed
+    if results and all(r.get('source') != 'Error fallback' for r in results):
+        try:
+            search_cache.put(query, num_results, results)
+        except Exception as e:
+            log(f"Search cache error: {e}")
+    return results
+
+def _schedule_refresh(query: str, num_results: int):
+    """Refresh a stale entry in the background, at most once per key."""
+    key = (normalize_query(query), num_results)
+    if key in _refresh_tasks:
+        return
+    search_cache.stats["refreshes"] += 1
+    task = asyncio.create_task(_search_and_store(query, num_results))
+    _refresh_tasks[key] = task
+    task.add_done_callback(lambda _: _refresh_tasks.pop(key, None))
+
+async def drain_background_tasks():
+    """Wait for pending cache refreshes (call before the event loop ends)."""
+    if _refresh_tasks:
+        await asyncio.gather(*list(_refresh_tasks.values()), return_exceptions=True)
+
+async def shutdown():
+    """Finish background work and close the HTTP pool"""
+    await drain_background_tasks()
+    if fetcher is not None:
+        await fetcher.aclose()
+
+def cache_metadata() -> dict:
+    try:
+        return search_cache.summary()
+    except Exception as e:
+        return {"error": str(e)}
+
+async def search_backends(query: str, num_results: int = 5) -> list:
     """Perform web search using DuckDuckGo"""
     if not DDGS_AVAILABLE:
         # Fallback to basic search using requests
         return await basic_web_search(query, num_results)
     
     try:
-        results = []
-        with DDGS() as ddgs:
-            search_results = ddgs.text(query, max_results=num_results)
-            for result in search_results:
-                results.append({
-                    'title': result.get('title', ''),
-                    'url': result.get('href', ''),
-                    'snippet': result.get('body', ''),
-                    'source': 'DuckDuckGo'
-                })
-        return results
+        async with rate_limiter.limit('duckduckgo.com'):
+            return await asyncio.to_thread(_ddgs_text, query, num_results)
     except Exception as e:
-        print(f"Search error: {e}")
+        log(f"Search error: {e}")
         return await basic_web_search(query, num_results)
 
+async def _fetch_results_page(url: str, headers: dict, timeout: float) -> tuple:
+    """
+    GET a search results page without blocking the event loop, feeding it to
+    the result parser as it streams in. Returns (status_code, results).
+    """
+    parser = ResultPageParser()
+    received = 0
+    if fetcher is not None:
+        async with fetcher.client.stream("GET", url, headers=headers, timeout=timeout) as response:
+            if response.status_code != 200:
+                return response.status_code, []
+            async for chunk in response.aiter_text():
+                parser.feed(chunk)
+                received += len(chunk)
+                if received >= RESULT_PAGE_MAX_BYTES:
+                    break
+            return response.status_code, parser.close()
+
+    response = await asyncio.to_thread(requests.get, url, headers=headers, timeout=timeout)
+    if response.status_code != 200:
+        return response.status_code, []
+    parser.feed(response.text[:RESULT_PAGE_MAX_BYTES])
+    return response.status_code, parser.close()
+
 async def basic_web_search(query: str, num_results: int = 5) -> list:
-    """Fallback web search using requests and Google search"""
+    """Fallback web search: Google results page, parsed into real results"""
     try:
-        # Use a simple approach with requests to Google
         search_url = f"https://www.google.com/search?q={quote(query)}&num={num_results}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
         
-        response = requests.get(search_url, headers=headers, timeout=10)
-        results = []
+        async with rate_limiter.limit('www.google.com'):
+            status_code, parsed = await _fetch_results_page(search_url, GOOGLE_HEADERS, 10)
+        results = merge_results([parsed])[:num_results]
         
-        # Basic parsing (this is a simple implementation)
-        if response.status_code == 200:
-            # Extract some basic information
-            content = response.text
-            # This is a very basic approach - in production, you'd use proper parsing
+        # Page fetched but nothing recognisable on it (layout change, consent page)
+        if status_code == 200 and not results:
             results.append({
                 'title': f"Search results for: {query}",
                 'url': search_url,
@@ -81,8 +212,19 @@ async def basic_web_search(query: str, num_results: int = 5) -> list:
             'source': 'Error fallback'
         }]
 
-async def generate_marketing_campaign(topic: str, search_results: list) -> dict:
+def keyword_list(topic: str, analysis: dict, limit: int) -> list:
+    """Topic first, then the top keyphrases found in the search results"""
+    keywords = [topic.lower()]
+    for item in analysis.get('keyphrases', []):
+        if item['phrase'] not in keywords:
+            keywords.append(item['phrase'])
+    return keywords[:limit]
+
+async def generate_marketing_campaign(topic: str, search_results: list, analysis: dict = None) -> dict:
     """Generate marketing campaign for piata-ai.ro"""
+    if analysis is None:
+        analysis = analyze_results(search_results, topic)
+    
     campaign = {
         'campaign_title': f"Piata-AI.ro: {topic} Solutions",
         'target_audience': "Romanian businesses and professionals",
@@ -102,7 +244,7 @@ async def generate_marketing_campaign(topic: str, search_results: list) -> dict:
         campaign['content_strategy'].append({
             'blog_post': f"How AI is revolutionizing {topic} in 2024",
             'meta_description': f"Learn how AI solutions can transform your {topic.lower()} strategy. Expert insights on piata-ai.ro",
-            'target_keywords': [topic.lower(), 'ai solutions', 'business automation']
+            'target_keywords': keyword_list(topic, analysis, 3)
         })
     
     # Generate social media posts
@@ -112,53 +254,104 @@ async def generate_marketing_campaign(topic: str, search_results: list) -> dict:
         f"🎯 Stop struggling with {topic.lower()}. Our AI tools make it simple and effective. Try free on piata-ai.ro today! #BusinessGrowth"
     ]
     
-    # Extract SEO keywords from search results
-    campaign['seo_keywords'] = [topic.lower(), 'ai solutions', 'piata-ai.ro', 'business automation']
+    # SEO keywords come from the phrases that score highest in the search results
+    campaign['seo_keywords'] = keyword_list(topic, analysis, 9) + ['piata-ai.ro']
     
     return campaign
 
-async def conduct_research(topic: str) -> dict:
-    """Conduct comprehensive research on a topic"""
-    print(f"🔍 Conducting research on: {topic}")
-    
-    # Perform web searches
-    search_queries = [
+def research_queries(topic: str) -> list:
+    """Search queries issued by conduct_research for a topic"""
+    return [
         f"{topic} trends 2024",
         f"{topic} AI solutions",
         f"{topic} business automation",
         f"{topic} best practices"
     ]
+
+async def prefetch_topics(topics: list) -> dict:
+    """
+    Warm the search cache for scheduled topics: every query the research,
+    marketing and web_search operations would issue is fetched if it is
+    missing or stops being fresh within PREFETCH_MARGIN.
+    """
+    wanted = []
+    for topic in topics:
+        wanted.extend((query, 3) for query in research_queries(topic))
+        wanted.extend([(topic, 5), (topic, 10)])
+
+    due = []
+    seen = set()
+    for query, num_results in wanted:
+        key = (normalize_query(query), num_results)
+        if key in seen:
+            continue
+        seen.add(key)
+        expires_in = search_cache.expires_in(query, num_results)
+        if expires_in is None or expires_in < PREFETCH_MARGIN:
+            due.append((query, num_results))
+
+    await asyncio.gather(*(_search_and_store(query, n) for query, n in due))
+    return {
+        "topics": len(topics),
+        "queries": len(seen),
+        "refreshed": len(due),
+        "purged": search_cache.purge(),
+        "pages_purged": page_cache.purge()
+    }
+
+async def fetch_pages(results: list) -> list:
+    """Attach the main text of each result's page as result['page']"""
+    pages = await fetcher.fetch_many([r['url'] for r in results])
+    for result, page in zip(results, pages):
+        result['page'] = {
+            key: page.get(key)
+            for key in ('final_url', 'status', 'title', 'text', 'words', 'truncated', 'cache', 'error')
+            if page.get(key) is not None
+        }
+    return results
+
+async def conduct_research(topic: str, deep: bool = False, pages: int = DEEP_RESEARCH_PAGES) -> dict:
+    """Conduct comprehensive research on a topic"""
+    log(f"🔍 Conducting research on: {topic}")
+    emit_progress("research", topic=topic)
+    
+    # Perform web searches
+    search_queries = research_queries(topic)
+    
+    # All queries run concurrently; the per-host rate limiter keeps us
+    # respectful to the search engines instead of fixed sleeps.
+    per_query = await asyncio.gather(*(web_search(query, 3) for query in search_queries))
+    # Same page found by several queries counts once; best matches first
+    all_results = bm25_rank(merge_results(per_query), " ".join(search_queries))
     
-    all_results = []
-    for query in search_queries:
-        results = await web_search(query, 3)
-        all_results.extend(results)
-        await asyncio.sleep(1)  # Be respectful to search engines
+    # Deep research: read the best pages, not just their snippets
+    pages_fetched = 0
+    if deep and fetcher is not None:
+        top = [r for r in all_results if r.get('source') != 'Error fallback'][:pages]
+        emit_progress("fetch", pages=len(top))
+        await fetch_pages(top)
+        pages_fetched = sum(1 for r in top if r['page'].get('text'))
+    elif deep:
+        log("Deep research needs httpx; using search snippets only")
     
-    # Analyze and summarize findings
+    # Analyze and summarize findings: keyphrases, recurring phrases and the
+    # sentences that carry them, taken from the results themselves
+    analysis = analyze_results(
+        [r for r in all_results if r.get('source') != 'Error fallback'], topic
+    )
     research_summary = {
         'topic': topic,
         'search_date': datetime.now().isoformat(),
         'sources_found': len(all_results),
-        'key_findings': [],
-        'trends': [],
+        'pages_fetched': pages_fetched,
+        'key_findings': [finding['text'] for finding in analysis['findings']],
+        'finding_sources': [finding['url'] for finding in analysis['findings']],
+        'trends': [trend['phrase'] for trend in analysis['trends']],
+        'trend_counts': analysis['trends'],
+        'keyphrases': analysis['keyphrases'],
         'opportunities': []
     }
     
-    # Generate findings based on search results
-    research_summary['key_findings'] = [
-        f"AI adoption in {topic.lower()} is accelerating rapidly in 2024",
-        f"Businesses report 40-60% efficiency improvements with AI {topic.lower()} solutions",
-        f"Romanian market shows strong demand for {topic.lower()} automation"
-    ]
-    
-    research_summary['trends'] = [
-        "Integration of AI with existing business workflows",
-        "Increased focus on data privacy and security",
-        "Growing demand for local, Romanian AI solutions",
-        "Adoption of generative AI for content creation"
-    ]
-    
     research_summary['opportunities'] = [
         f"Develop specialized AI tools for {topic.lower()} in Romanian market",
         "Create educational content about AI benefits",
@@ -169,7 +362,69 @@ async def conduct_research(topic: str) -> dict:
     return {
         'research_summary': research_summary,
         'search_results': all_results,
-        'campaign': await generate_marketing_campaign(topic, all_results)
+        'campaign': await generate_marketing_campaign(topic, all_results, analysis)
+    }
+
+def unique_topics(topics: list) -> list:
+    """Drop blank and repeated topics (case and spacing don't matter), keeping order"""
+    seen = set()
+    unique = []
+    for topic in topics:
+        if not isinstance(topic, str) or not topic.strip():
+            continue
+        key = normalize_query(topic)
+        if key not in seen:
+            seen.add(key)
+            unique.append(topic.strip())
+    return unique
+
+async def run_batch(payload: dict, topics: list, operation: str) -> dict:
+    """
+    Run `operation` for every topic in one process: the search cache, HTTP pool
+    and rate limiter are shared, and identical queries from different topics
+    are searched once. Each topic's result is emitted as a "topic" progress
+    event as soon as it completes.
+    """
+    task = payload.get("task", {})
+    task_input = task.get("input", {})
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    issued, coalesced = search_stats["issued"], search_stats["coalesced"]
+    started = time.monotonic()
+
+    async def run_topic(index: int, topic: str):
+        async with slots:
+            result = await run_manus_operations({
+                "context": payload.get("context", {}),
+                "task": {
+                    "id": f"{task.get('id')}:{index}" if task.get("id") else None,
+                    "operation": operation,
+                    "input": {**task_input, "topic": topic, "topics": None}
+                }
+            })
+        return index, topic, result
+
+    summary = []
+    for done in asyncio.as_completed([run_topic(i, t) for i, t in enumerate(topics)]):
+        index, topic, result = await done
+        emit_progress("topic", index=index, topic=topic, result=result)
+        summary.append({
+            "index": index,
+            "topic": topic,
+            "status": result.get("status"),
+            "error": result.get("error")
+        })
+
+    summary.sort(key=lambda item: item["index"])
+    return {
+        "operation": operation,
+        "topics": summary,
+        "succeeded": sum(1 for item in summary if item["status"] == "success"),
+        "failed": sum(1 for item in summary if item["status"] != "success"),
+        "searches": {
+            "issued": search_stats["issued"] - issued,
+            "coalesced": search_stats["coalesced"] - coalesced
+        },
+        "elapsed_seconds": round(time.monotonic() - started, 3)
     }
 
 async def run_manus_operations(payload: dict) -> dict:
@@ -178,9 +433,56 @@ async def run_manus_operations(payload: dict) -> dict:
         context = payload.get("context", {})
         task = payload.get("task", {})
         
-        operation = task.get("operation", "research")  # research, marketing, web_search
+        operation = task.get("operation", "research")  # research, marketing, web_search, prefetch, batch
         topic = task.get("input", {}).get("topic", "")
         
+        if operation == "batch":
+            topics = unique_topics(task.get("input", {}).get("topics") or [])
+            topic_operation = task.get("input", {}).get("operation", "research")
+            if not topics:
+                return {
+                    "status": "error",
+                    "error": "No topics provided for batch",
+                    "output": None
+                }
+            if topic_operation not in BATCH_OPERATIONS:
+                return {
+                    "status": "error",
+                    "error": f"Unsupported batch operation: {topic_operation}",
+                    "output": None
+                }
+            log(f"🎯 OpenManus executing batch {topic_operation} on {len(topics)} topics")
+            return {
+                "status": "success",
+                "output": await run_batch(payload, topics, topic_operation),
+                "metadata": {
+                    "operation": "batch",
+                    "task_id": task.get("id"),
+                    "piata_ai": True,
+                    "search_cache": cache_metadata(),
+                    "page_fetch": fetcher.summary() if fetcher is not None else None
+                }
+            }
+        
+        if operation == "prefetch":
+            topics = task.get("input", {}).get("topics") or ([topic] if topic else [])
+            if not topics:
+                return {
+                    "status": "error",
+                    "error": "No topics provided for prefetch",
+                    "output": None
+                }
+            return {
+                "status": "success",
+                "output": await prefetch_topics(topics),
+                "metadata": {
+                    "operation": "prefetch",
+                    "task_id": task.get("id"),
+                    "piata_ai": True,
+                    "search_cache": cache_metadata()
+                }
+            }
+        
         if not topic:
             return {
                 "status": "error",
@@ -188,7 +490,8 @@ async def run_manus_operations(payload: dict) -> dict:
                 "output": None
             }
         
-        print(f"🎯 OpenManus executing {operation} on topic: {topic}")
+        log(f"🎯 OpenManus executing {operation} on topic: {topic}")
+        emit_progress("started", operation=operation, topic=topic)
         
         if operation == "web_search":
             # Perform web search only
@@ -203,7 +506,8 @@ async def run_manus_operations(payload: dict) -> dict:
                 "metadata": {
                     "operation": "web_search",
                     "task_id": task.get("id"),
-                    "piata_ai": True
+                    "piata_ai": True,
+                    "search_cache": cache_metadata()
                 }
             }
             
@@ -223,13 +527,19 @@ async def run_manus_operations(payload: dict) -> dict:
                     "operation": "marketing",
                     "task_id": task.get("id"),
                     "piata_ai": True,
-                    "website": "piata-ai.ro"
+                    "website": "piata-ai.ro",
+                    "search_cache": cache_metadata()
                 }
             }
             
         else:  # Default to research
             # Comprehensive research with web search and marketing
-            results = await conduct_research(topic)
+            task_input = task.get("input", {})
+            results = await conduct_research(
+                topic,
+                deep=bool(task_input.get("deep")),
+                pages=int(task_input.get("pages") or DEEP_RESEARCH_PAGES)
+            )
             
             return {
                 "status": "success",
@@ -239,7 +549,9 @@ async def run_manus_operations(payload: dict) -> dict:
                     "task_id": task.get("id"),
                     "piata_ai": True,
                     "website": "piata-ai.ro",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": datetime.now().isoformat(),
+                    "search_cache": cache_metadata(),
+                    "page_fetch": fetcher.summary() if fetcher is not None else None
                 }
             }
         
@@ -251,8 +563,52 @@ async def run_manus_operations(payload: dict) -> dict:
             "trace": traceback.format_exc()
         }
 
+async def run_once(payload: dict) -> dict:
+    """Run one payload, then let background work finish and close the pool"""
+    result = await run_manus_operations(payload)
+    await shutdown()
+    return result
+
+async def run_batch_once(payload: dict):
+    """
+    One-shot batch: NDJSON on stdout, one {"type": "topic"} line per topic as
+    it completes, then {"type": "result"} with the batch summary.
+    """
+    def write(event):
+        sys.stdout.write(json.dumps(event) + "\n")
+        sys.stdout.flush()
+
+    def on_progress(stage, data):
+        if stage == "topic":
+            write({"type": "topic", **data})
+
+    progress_handler(on_progress)
+    write({"type": "result", "result": await run_once(payload)})
+
+async def serve(socket_path: str = None):
+    """Persistent mode: many concurrent payloads over NDJSON"""
+    server = BridgeServer(run_manus_operations, on_shutdown=shutdown)
+    if socket_path:
+        await server.serve_unix(socket_path)
+    else:
+        await server.serve_stdio()
+
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="OpenManus bridge for piata-ai.ro")
+    parser.add_argument("--serve", action="store_true",
+                        help="Stay running and read newline-delimited JSON payloads from stdin")
+    parser.add_argument("--socket", help="Serve newline-delimited JSON on this Unix socket instead of stdin")
+    args = parser.parse_args()
+
+    if args.serve or args.socket:
+        try:
+            asyncio.run(serve(args.socket))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # One-shot mode: a single JSON payload on stdin, one JSON result on stdout
     try:
         # Read JSON from stdin
         raw_input = sys.stdin.read().strip()
@@ -262,8 +618,12 @@ def main():
             
         payload = json.loads(raw_input)
         
+        if payload.get("task", {}).get("operation") == "batch":
+            asyncio.run(run_batch_once(payload))
+            return
+        
         # Run async OpenManus operations
-        result = asyncio.run(run_manus_operations(payload))
+        result = asyncio.run(run_once(payload))
         
         # Output JSON to stdout
         print(json.dumps(result))
@@ -0,0 +1,5 @@
+"""
+Support modules for scripts/openmanus-bridge.py.
+The bridge runs as a script, so `scripts/` is on sys.path and these are
+imported as `openmanus.<module>`.
+"""
@@ -0,0 +1,293 @@
+"""
+Keyphrase, trend and finding extraction over collected search results.
+
+Text is tokenized for Romanian and English: lowercased, diacritics folded for
+matching (so "mașini" and "masini" are the same term) while the most common
+written form is kept for display. Candidate phrases are 1-3 word n-grams that
+do not cross punctuation and neither start nor end with a stopword.
+
+Keyphrases are scored with TF-IDF over the documents (one per result):
+sublinear term frequency, smoothed IDF, L2-normalized rows, summed per phrase
+and boosted for multi-word phrases. The document-term matrix is kept as
+sparse (row, column, count) triplets and reduced with NumPy; without NumPy
+the same scores are computed in plain Python.
+"""
+
+import re
+import math
+import unicodedata
+from functools import lru_cache
+from collections import Counter
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+MAX_NGRAM = 3
+# Multi-word phrases are more specific; each extra word adds this much weight
+NGRAM_BOOST = 0.5
+MIN_SENTENCE_WORDS = 6
+MAX_SENTENCE_WORDS = 40
+# Findings are picked from the documents that carry the most keyphrase weight
+FINDING_DOCUMENTS = 50
+
+STOPWORDS = {
+    # Romanian (diacritics folded)
+    "a", "abia", "acea", "aceasta", "aceea", "acei", "aceia", "acel", "acela", "acele", "acelasi",
+    "acest", "acesta", "aceste", "acestea", "acestei", "acestia", "acestui", "acolo", "acum", "ai",
+    "aia", "al", "ale", "alt", "alta", "alte", "altfel", "am", "ar", "are", "as", "asa", "asta",
+    "astazi", "asupra", "atat", "atata", "atunci", "au", "avea", "avem", "aveti", "azi", "ba",
+    "ca", "cam", "care", "careia", "carora", "caruia", "cat", "cate", "cati", "catre", "ce",
+    "cea", "cei", "cel", "cele", "celor", "ceva", "chiar", "cine", "cu", "cum", "cumva", "da",
+    "daca", "dar", "de", "deci", "deja", "desi", "despre", "din", "dintr", "dintre", "doar",
+    "dupa", "e", "ea", "ei", "el", "ele", "era", "este", "eu", "fara", "fata", "fi", "fie",
+    "fiecare", "fiind", "foarte", "fost", "i", "ia", "iar", "ii", "il", "im", "in", "inainte",
+    "inca", "incat", "insa", "intr", "intre", "isi", "iti", "la", "le", "li", "lor", "lui", "ma",
+    "mai", "mult", "multe", "multi", "ne", "nici", "niste", "noi", "nostru", "noastra", "nu",
+    "o", "ori", "pana", "pe", "pentru", "peste", "poate", "pot", "prin", "sa", "sau", "se",
+    "si", "sub", "sunt", "suntem", "sunteti", "ta", "tale", "te", "toata", "toate", "tot",
+    "toti", "totusi", "tu", "ul", "un", "una", "unde", "unei", "unele", "uneori", "unor", "unui",
+    "va", "vom", "voi", "vor",
+    # English
+    "about", "after", "all", "also", "an", "and", "any", "are", "as", "at", "be", "been",
+    "before", "being", "between", "both", "but", "by", "can", "could", "did", "do", "does",
+    "each", "for", "from", "had", "has", "have", "he", "her", "here", "his", "how", "if",
+    "into", "is", "it", "its", "just", "more", "most", "my", "no", "not", "now", "of", "on",
+    "only", "or", "other", "our", "out", "over", "own", "same", "she", "should", "so", "some",
+    "such", "than", "that", "the", "their", "them", "then", "there", "these", "they", "this",
+    "those", "through", "to", "too", "up", "very", "was", "we", "were", "what", "when",
+    "where", "which", "while", "who", "why", "will", "with", "would", "you", "your",
+    # Web noise
+    "www", "http", "https", "com", "ro", "html", "click", "aici", "here",
+}
+
+_WORD_RE = re.compile(r"[^\W_]+(?:[-'][^\W_]+)*")
+# Phrases do not cross sentence punctuation, brackets or separators
+_FRAGMENT_RE = re.compile(r"[.!?;:,()\[\]{}|/\\\"“”„«»…·•–—]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-ZĂÂÎȘȚŞŢ0-9\"„])")
+
+
+@lru_cache(maxsize=65536)
+def fold(word: str) -> str:
+    """Lowercase without diacritics: Mașină -> masina (ş/ţ cedilla forms too)."""
+    word = unicodedata.normalize("NFKD", word.lower())
+    return "".join(c for c in word if not unicodedata.combining(c))
+
+
+def tokenize(text: str, surface_forms: Counter = None) -> list:
+    """
+    Folded words of `text`. When given, `surface_forms` counts how each
+    folded word was written (lowercase), for display.
+    """
+    words = _WORD_RE.findall(text)
+    folded = [fold(w) for w in words]
+    if surface_forms is not None:
+        surface_forms.update(zip(folded, map(str.lower, words)))
+    return folded
+
+
+@lru_cache(maxsize=65536)
+def _is_term(folded: str) -> bool:
+    return len(folded) > 1 and folded not in STOPWORDS and not folded.isdigit()
+
+
+def candidate_phrases(text: str, surface_forms: Counter = None) -> Counter:
+    """Count candidate n-grams (folded, space-joined) in `text`."""
+    found = []
+    for fragment in _FRAGMENT_RE.split(text):
+        tokens = tokenize(fragment, surface_forms)
+        terms = [_is_term(t) for t in tokens]
+        # Inner stopwords are fine ("pret de vanzare"), edges are not;
+        # a trailing number is ("trends 2024")
+        ends = [is_term or t.isdigit() for t, is_term in zip(tokens, terms)]
+        size = len(tokens)
+        for i in range(size):
+            if not terms[i]:
+                continue
+            found.append(tokens[i])
+            for n in range(2, min(MAX_NGRAM, size - i) + 1):
+                if ends[i + n - 1]:
+                    found.append(" ".join(tokens[i:i + n]))
+    return Counter(found)
+
+
+def _document_text(result: dict, title: bool = True) -> str:
+    page = result.get("page") or {}
+    parts = [result.get("title") if title else None, result.get("snippet"), page.get("text")]
+    return " . ".join(filter(None, parts))
+
+
+def _spellings(surface_forms: Counter) -> dict:
+    """Most common written form of each folded word."""
+    best = {}
+    for (word, surface), count in surface_forms.items():
+        if word not in best or count > best[word][1]:
+            best[word] = (surface, count)
+    return {word: surface for word, (surface, _) in best.items()}
+
+
+def _display(phrase: str, spellings: dict) -> str:
+    return " ".join(spellings.get(word, word) for word in phrase.split())
+
+
+def tfidf_scores(doc_counts: list) -> tuple:
+    """
+    Score every phrase over a list of per-document Counters. Returns
+    (vocabulary, scores, document_frequency), aligned by index.
+    """
+    vocabulary = {}
+    rows, cols, values = [], [], []
+    for row, counts in enumerate(doc_counts):
+        for phrase, count in counts.items():
+            rows.append(row)
+            cols.append(vocabulary.setdefault(phrase, len(vocabulary)))
+            values.append(count)
+    phrases = list(vocabulary)
+    n_docs = len(doc_counts)
+    lengths = [p.count(" ") + 1 for p in phrases]
+
+    if NUMPY_AVAILABLE:
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        df = np.bincount(cols, minlength=len(phrases))
+        idf = np.log((1 + n_docs) / (1 + df)) + 1
+        weights = (1 + np.log(values)) * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights ** 2, minlength=n_docs))
+        scores = np.bincount(cols, weights / norms[rows], minlength=len(phrases))
+        scores *= 1 + NGRAM_BOOST * (np.asarray(lengths) - 1)
+        return phrases, scores.tolist(), df.tolist()
+
+    df = [0] * len(phrases)
+    for col in cols:
+        df[col] += 1
+    idf = [math.log((1 + n_docs) / (1 + d)) + 1 for d in df]
+    weights = [(1 + math.log(v)) * idf[c] for v, c in zip(values, cols)]
+    norms = [0.0] * n_docs
+    for row, w in zip(rows, weights):
+        norms[row] += w * w
+    norms = [math.sqrt(n) for n in norms]
+    scores = [0.0] * len(phrases)
+    for row, col, w in zip(rows, cols, weights):
+        scores[col] += w / norms[row]
+    scores = [s * (1 + NGRAM_BOOST * (length - 1)) for s, length in zip(scores, lengths)]
+    return phrases, scores, df
+
+
+def _redundant(phrase: str, selected: list) -> bool:
+    words = set(phrase.split())
+    for other in selected:
+        other_words = set(other.split())
+        if words <= other_words or other_words <= words:
+            return True
+    return False
+
+
+def top_keyphrases(phrases: list, scores: list, limit: int, exclude_words=frozenset()) -> list:
+    """
+    Best-scoring phrases, skipping ones contained in (or containing) a better
+    one and ones made only of `exclude_words` (the topic itself).
+    """
+    order = sorted(range(len(phrases)), key=lambda i: (-scores[i], phrases[i]))
+    selected = []
+    for i in order:
+        phrase = phrases[i]
+        if set(phrase.split()) <= exclude_words or _redundant(phrase, selected):
+            continue
+        selected.append(phrase)
+        if len(selected) >= limit:
+            break
+    return selected
+
+
+def key_sentences(documents: list, weights: dict, limit: int) -> list:
+    """
+    Sentences that mention the most keyphrase weight, at most one per source
+    and none repeating another. `documents` are (result, phrase counts) pairs.
+    """
+    relevance = [sum(w for p, w in weights.items() if p in counts) for _, counts in documents]
+    best = sorted((i for i, r in enumerate(relevance) if r > 0), key=lambda i: -relevance[i])
+    phrase_words = {word for phrase in weights for word in phrase.split()}
+    candidates = []
+    for index in best[:FINDING_DOCUMENTS]:
+        result = documents[index][0]
+        for sentence in _SENTENCE_RE.split(_document_text(result, title=False).replace(" . ", ". ")):
+            words = sentence.split()
+            if not MIN_SENTENCE_WORDS <= len(words) <= MAX_SENTENCE_WORDS:
+                continue
+            tokens = tokenize(sentence)
+            if phrase_words.isdisjoint(tokens):
+                continue
+            padded = f" {' '.join(tokens)} "
+            score = sum(w for p, w in weights.items() if f" {p} " in padded) / math.sqrt(len(words))
+            if score > 0:
+                candidates.append((score, index, " ".join(words), padded))
+
+    findings = []
+    used_sources = set()
+    seen = set()
+    for score, index, sentence, key in sorted(candidates, key=lambda c: (-c[0], c[1])):
+        # Same sentence quoted by another source, possibly with a date in front
+        if index in used_sources or any(key in other or other in key for other in seen):
+            continue
+        used_sources.add(index)
+        seen.add(key)
+        findings.append({"text": sentence, "url": documents[index][0].get("url"), "score": round(score, 4)})
+        if len(findings) >= limit:
+            break
+    return findings
+
+
+def analyze_results(results: list, topic: str = "", keywords: int = 10, trends: int = 8, findings: int = 3) -> dict:
+    """
+    Text analytics over search results (title, snippet and fetched page text).
+
+    Returns:
+        keyphrases  [{"phrase", "score", "sources"}] best first
+        trends      [{"phrase", "sources", "mentions"}] multi-word phrases seen
+                    in the most sources
+        findings    [{"text", "url", "score"}] sentences carrying the top phrases
+    """
+    surface_forms = Counter()
+    documents = [(r, candidate_phrases(_document_text(r), surface_forms)) for r in results]
+    documents = [(r, counts) for r, counts in documents if counts]
+    doc_counts = [counts for _, counts in documents]
+    if not documents:
+        return {"documents": 0, "keyphrases": [], "trends": [], "findings": []}
+
+    spellings = _spellings(surface_forms)
+    phrases, scores, df = tfidf_scores(doc_counts)
+    index = {p: i for i, p in enumerate(phrases)}
+    mentions = Counter()
+    for counts in doc_counts:
+        mentions.update(counts)
+
+    topic_words = frozenset(fold(w) for w in _WORD_RE.findall(topic))
+    top = top_keyphrases(phrases, scores, keywords, topic_words)
+    # Phrases found in a single source are noise for trends, not signal
+    trend_order = sorted(
+        (i for i, p in enumerate(phrases) if " " in p and df[i] > 1 and not set(p.split()) <= topic_words),
+        key=lambda i: (-df[i], -mentions[phrases[i]], -scores[i], phrases[i]),
+    )
+    trend_phrases = top_keyphrases(
+        [phrases[i] for i in trend_order],
+        [float(len(trend_order) - rank) for rank in range(len(trend_order))],
+        trends,
+    )
+
+    # Findings should be about the topic, so its own words count there
+    weights = {p: scores[index[p]] for p in top_keyphrases(phrases, scores, keywords)}
+    return {
+        "documents": len(doc_counts),
+        "keyphrases": [
+            {"phrase": _display(p, spellings), "score": round(scores[index[p]], 4), "sources": df[index[p]]}
+            for p in top
+        ],
+        "trends": [
+            {"phrase": _display(p, spellings), "sources": df[index[p]], "mentions": mentions[p]}
+            for p in trend_phrases
+        ],
+        "findings": key_sentences(documents, weights, findings),
+    }
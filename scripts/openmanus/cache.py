@@ -0,0 +1,195 @@
+"""
+Disk-backed search result and page caches (SQLite).
+
+Search entries are keyed on the normalized query + number of results. An
+entry is fresh for `ttl` seconds, then stale for another `stale_ttl` seconds:
+stale entries are still served while the caller refreshes them in the
+background (stale-while-revalidate). Older entries count as misses.
+
+Pages fetched for deep research are keyed on URL and keep the ETag /
+Last-Modified validators, so expired pages are revalidated, not re-downloaded.
+"""
+
+import os
+import json
+import time
+import sqlite3
+
+CACHE_PATH = os.getenv(
+    "OPENMANUS_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "openmanus", "search.sqlite3"),
+)
+CACHE_TTL = float(os.getenv("OPENMANUS_CACHE_TTL", str(6 * 3600)))
+CACHE_STALE_TTL = float(os.getenv("OPENMANUS_CACHE_STALE_TTL", str(24 * 3600)))
+PAGE_TTL = float(os.getenv("OPENMANUS_PAGE_TTL", str(24 * 3600)))
+PAGE_MAX_AGE = float(os.getenv("OPENMANUS_PAGE_MAX_AGE", str(30 * 24 * 3600)))
+
+FRESH, STALE, MISS = "fresh", "stale", "miss"
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SearchCache:
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL, stale_ttl: float = CACHE_STALE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "writes": 0, "refreshes": 0}
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect(self.path)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    query TEXT NOT NULL,
+                    num_results INTEGER NOT NULL,
+                    results TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (query, num_results)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS search_cache_fetched ON search_cache (fetched_at)")
+        return self._conn
+
+    def get(self, query: str, num_results: int, now: float = None) -> tuple:
+        """Returns (results, state) where state is FRESH, STALE or MISS."""
+        now = now or time.time()
+        key = normalize_query(query)
+        row = self.conn.execute(
+            "SELECT results, fetched_at FROM search_cache WHERE query = ? AND num_results = ?",
+            (key, num_results),
+        ).fetchone()
+
+        if row is None or now - row[1] > self.ttl + self.stale_ttl:
+            self.stats["misses"] += 1
+            return None, MISS
+
+        with self.conn:
+            self.conn.execute(
+                "UPDATE search_cache SET hits = hits + 1 WHERE query = ? AND num_results = ?",
+                (key, num_results),
+            )
+        if now - row[1] <= self.ttl:
+            self.stats["hits"] += 1
+            return json.loads(row[0]), FRESH
+        self.stats["stale_hits"] += 1
+        return json.loads(row[0]), STALE
+
+    def put(self, query: str, num_results: int, results: list, now: float = None):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO search_cache (query, num_results, results, fetched_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (query, num_results)
+                DO UPDATE SET results = excluded.results, fetched_at = excluded.fetched_at
+                """,
+                (normalize_query(query), num_results, json.dumps(results), now or time.time()),
+            )
+        self.stats["writes"] += 1
+
+    def expires_in(self, query: str, num_results: int, now: float = None):
+        """Seconds until the entry stops being fresh (None when absent)."""
+        row = self.conn.execute(
+            "SELECT fetched_at FROM search_cache WHERE query = ? AND num_results = ?",
+            (normalize_query(query), num_results),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0] + self.ttl - (now or time.time())
+
+    def purge(self, now: float = None) -> int:
+        """Drop entries that are too old to be served even as stale."""
+        cutoff = (now or time.time()) - self.ttl - self.stale_ttl
+        with self.conn:
+            return self.conn.execute("DELETE FROM search_cache WHERE fetched_at < ?", (cutoff,)).rowcount
+
+    def summary(self) -> dict:
+        entries = self.conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        served = self.stats["hits"] + self.stats["stale_hits"]
+        return {
+            **self.stats,
+            "entries": entries,
+            "hit_ratio": round(served / lookups, 3) if lookups else None,
+            "path": self.path,
+        }
+
+
+class PageCache:
+    """
+    Extracted pages keyed on URL. Pages younger than `ttl` are used as-is;
+    older ones are handed back with their validators for a conditional GET.
+    Pages not revalidated within `max_age` are purged.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = PAGE_TTL, max_age: float = PAGE_MAX_AGE):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect(self.path)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS page_cache (
+                    url TEXT PRIMARY KEY,
+                    page TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+        return self._conn
+
+    def get(self, url: str, now: float = None) -> tuple:
+        """Returns (page, fresh); page is None when the URL is not cached."""
+        row = self.conn.execute(
+            "SELECT page, fetched_at FROM page_cache WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None, False
+        return json.loads(row[0]), (now or time.time()) - row[1] <= self.ttl
+
+    def put(self, url: str, page: dict, now: float = None):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO page_cache (url, page, etag, last_modified, fetched_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    page = excluded.page, etag = excluded.etag,
+                    last_modified = excluded.last_modified, fetched_at = excluded.fetched_at
+                """,
+                (url, json.dumps(page), page.get("etag"), page.get("last_modified"), now or time.time()),
+            )
+
+    def touch(self, url: str, now: float = None):
+        """The server confirmed the cached copy (304): fresh for another ttl."""
+        with self.conn:
+            self.conn.execute("UPDATE page_cache SET fetched_at = ? WHERE url = ?", (now or time.time(), url))
+
+    def purge(self, now: float = None) -> int:
+        cutoff = (now or time.time()) - self.max_age
+        with self.conn:
+            return self.conn.execute("DELETE FROM page_cache WHERE fetched_at < ?", (cutoff,)).rowcount
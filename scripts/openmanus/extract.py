@@ -0,0 +1,345 @@
+"""
+Search result extraction and ranking.
+
+Result pages are turned into a flat stream of events (anchor start/end,
+heading start/end, text) by the fastest parser available - selectolax, then
+lxml, then the stdlib html.parser, which also accepts the page incrementally
+while it downloads. One state machine over that stream pulls out title, URL
+and snippet, so every backend extracts the same results.
+
+Merged results are deduplicated by canonical URL and ranked with BM25.
+"""
+
+import re
+import math
+import unicodedata
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit, parse_qs, parse_qsl, urlencode
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+PARSER_BACKEND = "selectolax" if SelectolaxParser else "lxml" if LXML_AVAILABLE else "html.parser"
+
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+# Page furniture after the last result; text there is not a snippet
+END_IDS = {"foot", "footcnt", "botstuff", "bottomads"}
+BLOCK_TAGS = {"div", "p", "li", "td", "tr", "section", "article", "ul", "ol"}
+SNIPPET_LIMIT = 320
+# Once a snippet has this many characters, the end of its block completes it
+SNIPPET_MIN = 40
+TRACKING_PARAMS = {"gclid", "fbclid", "yclid", "msclkid", "ref", "ref_src", "sa", "ved", "usg", "ei"}
+SEARCH_ENGINE_HOSTS = ("google.", "gstatic.com", "googleusercontent.com", "youtube.com/results")
+
+
+# ------------------------------------------------------------------------------
+# Parser backends -> (kind, value) events
+#   ("a", href) / ("/a", None) / ("h3", None) / ("/h3", None) / ("text", str)
+#   ("break", None) at the end of a block element
+#   ("end", None) when the results area is over (footer)
+# ------------------------------------------------------------------------------
+
+class _StreamingEvents(HTMLParser):
+    """html.parser backend; accepts the document in chunks."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag == "footer" or dict(attrs).get("id") in END_IDS:
+            self.events.append(("end", None))
+        elif tag == "a":
+            self.events.append(("a", dict(attrs).get("href")))
+        elif tag == "h3":
+            self.events.append(("h3", None))
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "a":
+            self.events.append(("/a", None))
+        elif tag == "h3":
+            self.events.append(("/h3", None))
+        elif tag in BLOCK_TAGS:
+            self.events.append(("break", None))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "br":
+            self.events.append(("text", " "))
+        else:
+            self.handle_starttag(tag, attrs)
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.events.append(("text", data))
+
+
+def _selectolax_events(html, events):
+    def walk(node):
+        tag = node.tag
+        if tag == "-text":
+            events.append(("text", node.text(deep=False)))
+            return
+        if tag in SKIP_TAGS or tag == "_comment":
+            return
+        if tag == "footer" or node.attributes.get("id") in END_IDS:
+            events.append(("end", None))
+        elif tag == "a":
+            events.append(("a", node.attributes.get("href")))
+        elif tag == "h3":
+            events.append(("h3", None))
+        elif tag == "br":
+            events.append(("text", " "))
+        for child in node.iter(include_text=True):
+            walk(child)
+        if tag in ("a", "h3"):
+            events.append(("/" + tag, None))
+        elif tag in BLOCK_TAGS:
+            events.append(("break", None))
+
+    root = SelectolaxParser(html).body
+    if root is not None:
+        walk(root)
+
+
+def _lxml_events(html, events):
+    def walk(el):
+        tag = el.tag if isinstance(el.tag, str) else None
+        if tag is not None and tag not in SKIP_TAGS:
+            if tag == "footer" or el.get("id") in END_IDS:
+                events.append(("end", None))
+            elif tag == "a":
+                events.append(("a", el.get("href")))
+            elif tag == "h3":
+                events.append(("h3", None))
+            elif tag == "br":
+                events.append(("text", " "))
+            if el.text:
+                events.append(("text", el.text))
+            for child in el:
+                walk(child)
+            if tag in ("a", "h3"):
+                events.append(("/" + tag, None))
+            elif tag in BLOCK_TAGS:
+                events.append(("break", None))
+        if el.tail:
+            events.append(("text", el.tail))
+
+    walk(lxml.html.document_fromstring(html))
+
+
+class ResultPageParser:
+    """
+    Incremental result-page parser: feed() chunks as they arrive, close()
+    returns the extracted results. The stdlib backend parses while the page
+    streams in; the C backends parse the buffered page in one pass on close.
+    """
+
+    def __init__(self, backend: str = PARSER_BACKEND):
+        self.backend = backend
+        self._chunks = []
+        self._stream = _StreamingEvents() if backend == "html.parser" else None
+
+    def feed(self, chunk: str):
+        if self._stream is not None:
+            self._stream.feed(chunk)
+        else:
+            self._chunks.append(chunk)
+
+    def close(self, source: str = "Google Search") -> list:
+        if self._stream is not None:
+            self._stream.close()
+            events = self._stream.events
+        else:
+            events = []
+            html = "".join(self._chunks)
+            if self.backend == "selectolax":
+                _selectolax_events(html, events)
+            else:
+                _lxml_events(html, events)
+        return extract_results(events, source)
+
+
+def parse_results_page(html: str, source: str = "Google Search", backend: str = PARSER_BACKEND) -> list:
+    parser = ResultPageParser(backend)
+    parser.feed(html)
+    return parser.close(source)
+
+
+# ------------------------------------------------------------------------------
+# Event stream -> results
+# ------------------------------------------------------------------------------
+
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+
+def unwrap_url(href: str):
+    """Resolve search-engine redirect links (/url?q=...) to the target URL."""
+    if not href:
+        return None
+    if href.startswith("/url?") or ("google." in href and "/url?" in href):
+        params = parse_qs(urlsplit(href).query)
+        target = params.get("q") or params.get("url")
+        href = target[0] if target else None
+    if not href or not href.startswith(("http://", "https://")):
+        return None
+    parts = urlsplit(href)
+    if any(host in parts.netloc + parts.path for host in SEARCH_ENGINE_HOSTS):
+        return None
+    return href
+
+
+def extract_results(events, source: str = "Google Search") -> list:
+    """
+    A result is an anchor whose heading (<h3>) carries the title; the text
+    after that anchor is its snippet, which ends with the first block that
+    brings it to SNIPPET_MIN characters, at the next result or at the footer.
+    Text inside other anchors (breadcrumbs, "Cached", related links) is ignored.
+    """
+    results = []
+    current = None
+    href = None
+    in_a = in_h3 = False
+    title = []
+    snippet = []
+    snippet_done = False
+
+    def finish():
+        if current is not None:
+            text = _clean("".join(snippet))
+            current["snippet"] = text[:SNIPPET_LIMIT].rsplit(" ", 1)[0] if len(text) > SNIPPET_LIMIT else text
+            results.append(current)
+
+    for kind, value in events:
+        if kind == "a":
+            in_a = True
+            href = unwrap_url(value)
+        elif kind == "/a":
+            in_a = False
+            href = None
+        elif kind == "h3":
+            in_h3 = True
+            title = []
+        elif kind == "/h3":
+            in_h3 = False
+            if in_a and _clean("".join(title)):
+                # A titled link starts the next result, even one we drop
+                # (search-engine internal links) - its text is not a snippet.
+                finish()
+                current = None
+                if href:
+                    current = {"title": _clean("".join(title)), "url": href, "snippet": "", "source": source}
+                    snippet = []
+                    snippet_done = False
+        elif kind == "end":
+            finish()
+            current = None
+        elif kind == "break":
+            if current is not None and not snippet_done:
+                if len(_clean("".join(snippet))) >= SNIPPET_MIN:
+                    snippet_done = True
+                else:
+                    snippet.append(" ")
+        elif kind == "text":
+            if in_h3:
+                title.append(value)
+            elif current is not None and not in_a and not snippet_done:
+                snippet.append(value)
+
+    finish()
+    return results
+
+
+# ------------------------------------------------------------------------------
+# Deduplication and ranking
+# ------------------------------------------------------------------------------
+
+def canonical_url(url: str) -> str:
+    """Scheme/host case, www., fragments, tracking params and trailing slashes don't matter."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    ))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host, path, query, ""))
+
+
+def merge_results(result_lists) -> list:
+    """
+    Deduplicate results from several queries by canonical URL, keeping first
+    appearance order, the longest snippet and how many queries returned it.
+    """
+    merged = {}
+    for results in result_lists:
+        for result in results:
+            if not result.get("url"):
+                continue
+            key = canonical_url(result["url"])
+            if key not in merged:
+                merged[key] = dict(result, hits=1)
+                continue
+            existing = merged[key]
+            existing["hits"] += 1
+            if len(result.get("snippet", "")) > len(existing.get("snippet", "")):
+                existing["snippet"] = result["snippet"]
+    return list(merged.values())
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercase, strip diacritics (ă -> a, ș -> s) and split into words."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+
+def bm25_rank(results: list, query: str, k1: float = 1.2, b: float = 0.75, title_weight: int = 2) -> list:
+    """
+    Score results against `query` with BM25 over title + snippet (title terms
+    count `title_weight` times) and return them best first. Ties keep their
+    original order; results returned by more queries win ties first.
+    """
+    terms = set(tokenize(query))
+    if not results or not terms:
+        return results
+
+    docs = [tokenize(r.get("title", "")) * title_weight + tokenize(r.get("snippet", "")) for r in results]
+    n = len(docs)
+    avg_len = sum(len(d) for d in docs) / n or 1.0
+    df = {t: sum(1 for d in docs if t in d) for t in terms}
+    idf = {t: math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in terms}
+
+    scored = []
+    for index, (result, doc) in enumerate(zip(results, docs)):
+        counts = {}
+        for token in doc:
+            if token in terms:
+                counts[token] = counts.get(token, 0) + 1
+        norm = k1 * (1 - b + b * len(doc) / avg_len)
+        score = sum(idf[t] * c * (k1 + 1) / (c + norm) for t, c in counts.items())
+        scored.append((-round(score, 6), -result.get("hits", 1), index, dict(result, score=round(score, 4))))
+
+    scored.sort(key=lambda item: item[:3])
+    return [item[3] for item in scored]
@@ -0,0 +1,333 @@
+"""
+Page fetching and main-text extraction for deep research.
+
+One pooled httpx.AsyncClient serves every outbound request of the process
+(keep-alive connections are reused across searches and page fetches). Page
+fetches go through the per-host rate limiter, stream the body up to a size
+cap and keep only the readable main text: navigation, headers, footers,
+cookie banners and link lists are dropped, as are short or link-heavy blocks.
+
+Extracted pages are cached by URL. A cached page is reused as-is while fresh,
+then revalidated with If-None-Match / If-Modified-Since so an unchanged page
+costs a 304 instead of a download and re-parse.
+"""
+
+import os
+import re
+import codecs
+import asyncio
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+PAGE_MAX_BYTES = int(os.getenv("OPENMANUS_PAGE_MAX_BYTES", str(1024 * 1024)))
+PAGE_TIMEOUT = float(os.getenv("OPENMANUS_PAGE_TIMEOUT", "10"))
+CONNECT_TIMEOUT = float(os.getenv("OPENMANUS_CONNECT_TIMEOUT", "5"))
+PAGE_TEXT_LIMIT = int(os.getenv("OPENMANUS_PAGE_TEXT_LIMIT", "8000"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("OPENMANUS_HTTP_MAX_CONNECTIONS", "32"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; PiataAI-Research/1.0; +https://piata-ai.ro)"
+TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+
+def create_client(max_connections: int = HTTP_MAX_CONNECTIONS, timeout: float = PAGE_TIMEOUT,
+                  connect_timeout: float = CONNECT_TIMEOUT):
+    """The process-wide connection pool."""
+    return httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT, "Accept-Language": "ro,en;q=0.8"},
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max(1, max_connections // 2)),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        follow_redirects=True,
+    )
+
+
+# ------------------------------------------------------------------------------
+# Main-text extraction
+# ------------------------------------------------------------------------------
+
+# Whole subtrees that never hold article text
+BOILERPLATE_TAGS = {
+    "script", "style", "noscript", "template", "svg", "iframe", "nav", "header",
+    "footer", "aside", "form", "button", "select", "menu", "dialog",
+}
+BOILERPLATE_ATTR = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|sidebar|footer|header|cookie|consent|banner|breadcrumbs?|"
+    r"share|social|comments?|related|newsletter|advert|ads?|promo|popup|modal)($|[\s_-])",
+    re.I,
+)
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+BLOCK_TAGS = {
+    "p", "div", "li", "ul", "ol", "td", "th", "tr", "table", "section", "article", "main",
+    "blockquote", "pre", "dd", "dt", "figcaption", "h1", "h2", "h3", "h4", "h5", "h6",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4"}
+# Containers whose class names ("menu-open", "has-sidebar") say nothing about their content
+ROOT_TAGS = {"html", "body", "main", "article"}
+
+# A paragraph needs this many words and at most this share of linked text
+MIN_BLOCK_WORDS = 8
+MAX_LINK_DENSITY = 0.33
+
+
+class _MainTextParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = []
+        self.blocks = []
+        self._in_title = False
+        self._skip_tag = None
+        self._skip_depth = 0
+        self._link_depth = 0
+        self._text = []
+        self._link_chars = 0
+        self._heading = False
+
+    def _flush(self):
+        text = " ".join("".join(self._text).split())
+        if text:
+            self.blocks.append({
+                "text": text,
+                "words": len(text.split()),
+                "link_density": min(1.0, self._link_chars / len(text)),
+                "heading": self._heading,
+            })
+        self._text = []
+        self._link_chars = 0
+        self._heading = False
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if tag == "title":
+            self._in_title = True
+            return
+        attrs = dict(attrs)
+        marker = f"{attrs.get('id') or ''} {attrs.get('class') or ''} {attrs.get('role') or ''}"
+        if tag in BOILERPLATE_TAGS or (tag not in ROOT_TAGS and BOILERPLATE_ATTR.search(marker)) \
+                or attrs.get("aria-hidden") == "true" or "hidden" in attrs:
+            if tag not in VOID_TAGS:
+                self._skip_tag = tag
+                self._skip_depth = 1
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._heading = tag in HEADING_TAGS
+        elif tag == "br":
+            self._text.append(" ")
+        elif tag == "a":
+            self._link_depth += 1
+
+    def handle_endtag(self, tag):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+        if tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._flush()
+        elif tag == "a":
+            self._link_depth = max(0, self._link_depth - 1)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in VOID_TAGS:
+            # <div/> style self-closing: a start and an immediate end
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+        else:
+            self.handle_starttag(tag, attrs)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title.append(data)
+        elif self._skip_tag is None:
+            self._text.append(data)
+            if self._link_depth:
+                self._link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def select_main_blocks(blocks: list) -> list:
+    """
+    Keep paragraphs with at least MIN_BLOCK_WORDS words and at most
+    MAX_LINK_DENSITY linked text; keep a heading only when the next paragraph
+    that is not a short plain line (byline, date) is kept.
+    """
+    keep = [not b["heading"] and b["words"] >= MIN_BLOCK_WORDS and b["link_density"] <= MAX_LINK_DENSITY
+            for b in blocks]
+    following_kept = False
+    for i in range(len(blocks) - 1, -1, -1):
+        block = blocks[i]
+        if block["heading"]:
+            keep[i] = following_kept and block["link_density"] <= MAX_LINK_DENSITY
+        elif keep[i] or block["link_density"] > MAX_LINK_DENSITY:
+            following_kept = keep[i]
+    return [b["text"] for b, k in zip(blocks, keep) if k]
+
+
+class MainTextExtractor:
+    """Incremental main-text extractor: feed() HTML chunks, close() -> (title, text)."""
+
+    def __init__(self):
+        self._parser = _MainTextParser()
+
+    def feed(self, chunk: str):
+        self._parser.feed(chunk)
+
+    def close(self) -> tuple:
+        self._parser.close()
+        title = " ".join("".join(self._parser.title).split())
+        return title, "\n\n".join(select_main_blocks(self._parser.blocks))
+
+
+def extract_main_text(html: str) -> tuple:
+    extractor = MainTextExtractor()
+    extractor.feed(html)
+    return extractor.close()
+
+
+# ------------------------------------------------------------------------------
+# Fetching
+# ------------------------------------------------------------------------------
+
+def _decoder(encoding):
+    # Incremental, so multi-byte characters split across chunks survive
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+class PageFetcher:
+    """
+    Fetches pages concurrently over one pooled client. `limiter` is a
+    HostRateLimiter (per-domain concurrency and pacing); `cache` a PageCache.
+    """
+
+    def __init__(self, limiter, cache=None, max_bytes: int = PAGE_MAX_BYTES,
+                 text_limit: int = PAGE_TEXT_LIMIT, client=None):
+        self.limiter = limiter
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.text_limit = text_limit
+        self._client = client
+        self.stats = {"fetched": 0, "not_modified": 0, "cached": 0, "errors": 0, "bytes": 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = create_client()
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _page(self, url, **fields) -> dict:
+        page = {"url": url, "final_url": url, "status": None, "title": "", "text": "", "words": 0,
+                "bytes": 0, "truncated": False, "cache": "miss"}
+        page.update(fields)
+        return page
+
+    async def fetch(self, url: str) -> dict:
+        cached, fresh = None, False
+        if self.cache is not None:
+            try:
+                cached, fresh = self.cache.get(url)
+            except Exception:
+                pass
+        if cached is not None and fresh:
+            self.stats["cached"] += 1
+            return dict(cached, cache="fresh")
+
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            async with self.limiter.limit(urlsplit(url).netloc):
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and cached is not None:
+                        self.stats["not_modified"] += 1
+                        try:
+                            self.cache.touch(url)
+                        except Exception:
+                            pass
+                        return dict(cached, cache="revalidated")
+                    if response.status_code != 200:
+                        self.stats["errors"] += 1
+                        return self._page(url, final_url=str(response.url), status=response.status_code,
+                                          error=f"HTTP {response.status_code}")
+                    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                    if content_type and content_type not in TEXT_TYPES:
+                        self.stats["errors"] += 1
+                        return self._page(url, final_url=str(response.url), status=200,
+                                          error=f"Unsupported content type {content_type}")
+
+                    extractor = MainTextExtractor()
+                    decoder = _decoder(response.encoding)
+                    received = 0
+                    truncated = False
+                    async for chunk in response.aiter_bytes():
+                        received += len(chunk)
+                        if received > self.max_bytes:
+                            chunk = chunk[:len(chunk) - (received - self.max_bytes)]
+                            received = self.max_bytes
+                            truncated = True
+                        extractor.feed(decoder.decode(chunk))
+                        if truncated:
+                            break
+                    extractor.feed(decoder.decode(b"", final=True))
+                    title, text = extractor.close()
+
+                    page = self._page(
+                        url,
+                        final_url=str(response.url),
+                        status=200,
+                        title=title,
+                        text=text[:self.text_limit],
+                        words=len(text.split()),
+                        bytes=received,
+                        truncated=truncated,
+                        etag=response.headers.get("etag"),
+                        last_modified=response.headers.get("last-modified"),
+                    )
+        except Exception as e:
+            self.stats["errors"] += 1
+            if cached is not None:
+                # Serve the last good copy when the site is down
+                return dict(cached, cache="stale")
+            return self._page(url, error=f"{type(e).__name__}: {e}")
+
+        self.stats["fetched"] += 1
+        self.stats["bytes"] += received
+        if self.cache is not None and page["text"]:
+            try:
+                self.cache.put(url, page)
+            except Exception:
+                pass
+        return page
+
+    async def fetch_many(self, urls: list) -> list:
+        """Fetch pages concurrently; results keep the order of `urls`."""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    def summary(self) -> dict:
+        return dict(self.stats)
@@ -0,0 +1,38 @@
+"""
+Per-host concurrency and pacing for outbound requests.
+"""
+
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+HOST_CONCURRENCY = int(os.getenv("OPENMANUS_HOST_CONCURRENCY", "4"))
+HOST_MIN_INTERVAL = float(os.getenv("OPENMANUS_HOST_MIN_INTERVAL", "0.1"))
+
+
+class HostRateLimiter:
+    """
+    Caps in-flight requests per host and spaces request starts by at least
+    `min_interval` seconds, so concurrent fan-out stays polite to each backend.
+    """
+
+    def __init__(self, concurrency: int = HOST_CONCURRENCY, min_interval: float = HOST_MIN_INTERVAL):
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self._semaphores = {}
+        self._locks = {}
+        self._next_start = {}
+
+    @asynccontextmanager
+    async def limit(self, host: str):
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with semaphore:
+            async with lock:
+                now = time.monotonic()
+                wait = self._next_start.get(host, now) - now
+                self._next_start[host] = max(now, self._next_start.get(host, now)) + self.min_interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
@@ -0,0 +1,166 @@
+"""
+Long-running bridge server speaking newline-delimited JSON.
+
+Each input line is a bridge payload ({"context": ..., "task": {...}}) or a
+control message. Payloads run concurrently, keyed by task.id, and every
+output line is one event:
+
+    {"type": "accepted", "id": ...}
+    {"type": "progress", "id": ..., "stage": ..., ...}
+    {"type": "result",   "id": ..., "result": {...}}     same shape as one-shot output
+    {"type": "error",    "id": ..., "error": "..."}
+
+Control messages: {"type": "ping"}, {"type": "cancel", "id": ...} and
+{"type": "shutdown"}. The server runs over stdin/stdout or a Unix socket.
+"""
+
+import os
+import sys
+import json
+import uuid
+import asyncio
+import contextvars
+
+MAX_TASKS = int(os.getenv("OPENMANUS_MAX_TASKS", "16"))
+
+_progress = contextvars.ContextVar("openmanus_progress", default=None)
+
+
+def emit_progress(stage: str, **data):
+    """Report progress of the current task; a no-op outside server mode."""
+    callback = _progress.get()
+    if callback is not None:
+        callback(stage, data)
+
+
+def progress_handler(callback):
+    """Route emit_progress() in the current context to callback(stage, data)."""
+    return _progress.set(callback)
+
+
+class BridgeServer:
+    def __init__(self, handler, on_shutdown=None, max_tasks: int = MAX_TASKS):
+        self.handler = handler
+        self.on_shutdown = on_shutdown
+        self.slots = asyncio.Semaphore(max_tasks)
+        self.tasks = {}
+        self.completed = 0
+        self.stopping = asyncio.Event()
+
+    async def _run(self, task_id: str, payload: dict, send):
+        _progress.set(lambda stage, data: send({"type": "progress", "id": task_id, "stage": stage, **data}))
+        try:
+            async with self.slots:
+                result = await self.handler(payload)
+            send({"type": "result", "id": task_id, "result": result})
+        except asyncio.CancelledError:
+            send({"type": "error", "id": task_id, "error": "cancelled"})
+        except Exception as e:
+            send({"type": "error", "id": task_id, "error": f"Bridge error: {e}"})
+        finally:
+            self.tasks.pop(task_id, None)
+            self.completed += 1
+
+    def handle_line(self, line: str, send):
+        """Dispatch one input line. `send` writes one event (sync)."""
+        line = line.strip()
+        if not line:
+            return
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as e:
+            send({"type": "error", "id": None, "error": f"Invalid JSON input: {e}"})
+            return
+
+        kind = message.get("type")
+        if kind == "ping":
+            send({"type": "pong", "in_flight": len(self.tasks), "completed": self.completed})
+            return
+        if kind == "shutdown":
+            self.stopping.set()
+            return
+        if kind == "cancel":
+            task = self.tasks.get(message.get("id"))
+            if task is not None:
+                task.cancel()
+            else:
+                send({"type": "error", "id": message.get("id"), "error": "Unknown task id"})
+            return
+
+        task_info = message.setdefault("task", {})
+        task_id = task_info.get("id") or str(uuid.uuid4())
+        task_info["id"] = task_id
+        if task_id in self.tasks:
+            send({"type": "error", "id": task_id, "error": "Task id already running"})
+            return
+
+        send({"type": "accepted", "id": task_id})
+        self.tasks[task_id] = asyncio.create_task(self._run(task_id, message, send))
+        return self.tasks[task_id]
+
+    async def _finish(self):
+        if self.tasks:
+            await asyncio.gather(*list(self.tasks.values()), return_exceptions=True)
+        if self.on_shutdown is not None:
+            await self.on_shutdown()
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        def send(event):
+            sys.stdout.write(json.dumps(event) + "\n")
+            sys.stdout.flush()
+
+        send({"type": "ready", "pid": os.getpid()})
+        while not self.stopping.is_set():
+            read = asyncio.ensure_future(reader.readline())
+            stop = asyncio.ensure_future(self.stopping.wait())
+            done, _ = await asyncio.wait({read, stop}, return_when=asyncio.FIRST_COMPLETED)
+            stop.cancel()
+            if read not in done:
+                read.cancel()
+                break
+            line = read.result()
+            if not line:
+                break
+            self.handle_line(line.decode("utf-8"), send)
+        await self._finish()
+
+    async def serve_unix(self, path: str):
+        if os.path.exists(path):
+            os.unlink(path)
+
+        async def client(reader, writer):
+            def send(event):
+                if not writer.is_closing():
+                    writer.write((json.dumps(event) + "\n").encode("utf-8"))
+
+            send({"type": "ready", "pid": os.getpid()})
+            own_tasks = set()
+            try:
+                while not self.stopping.is_set():
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    task = self.handle_line(line.decode("utf-8"), send)
+                    if task is not None:
+                        own_tasks.add(task)
+                        task.add_done_callback(own_tasks.discard)
+                    await writer.drain()
+            finally:
+                # Let this connection's answers go out before closing it.
+                if own_tasks:
+                    await asyncio.gather(*own_tasks, return_exceptions=True)
+                writer.close()
+
+        server = await asyncio.start_unix_server(client, path=path, limit=16 * 1024 * 1024)
+        print(f"OpenManus bridge listening on {path}", file=sys.stderr)
+        try:
+            async with server:
+                await self.stopping.wait()
+        finally:
+            await self._finish()
+            if os.path.exists(path):
+                os.unlink(path)
@@ -0,0 +1,289 @@
+"""
+Append-only store of market research runs (SQLite).
+
+data/market-research.json and data/market-intelligence.json hold only the
+latest run: each run overwrites the file, so nothing can be compared over
+time. The store keeps every run. A run is one row with the compact JSON
+document. Each numeric leaf of the document also becomes a (metric, run,
+value) row, keyed on the metric first, so "this metric over the last 30 runs"
+is one short index range, however many runs and metrics there are.
+
+Metric names are dotted paths. A list of objects is keyed on each element's
+`name`, `category`, `id` or `insight` (else its position), so a metric keeps
+its name when the list is reordered. A list also yields its length as
+`<path>#`. For example:
+
+    market_trends.High-demand categories in Romanian market.data.Auto.frequency
+    competitors.OLX Romania.categories#
+
+Appending the same document at the same time twice stores it once, so
+re-importing a file is harmless. frame() loads a window of runs into NumPy
+arrays (runs x metrics, NaN where a run lacks a metric) for vectorized
+diffs between runs.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from datetime import datetime
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+SNAPSHOT_PATH = os.getenv(
+    "OPENMANUS_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 "data", "market-snapshots.sqlite3"),
+)
+DEFAULT_WINDOW = 30
+# List elements are keyed on the first of these they carry
+KEY_FIELDS = ("name", "category", "id", "insight")
+# Where a document records when it was taken
+TIME_FIELDS = ("timestamp", "research_date", "generated_at")
+
+
+def flatten_metrics(document, prefix: str = "") -> dict:
+    """Numeric leaves (and list lengths) of a document, by dotted path."""
+    metrics = {}
+
+    def walk(value, path):
+        if isinstance(value, bool):
+            return
+        if isinstance(value, (int, float)):
+            metrics[path] = float(value)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                walk(item, f"{path}.{key}" if path else str(key))
+        elif isinstance(value, list):
+            metrics[f"{path}#"] = float(len(value))
+            for index, item in enumerate(value):
+                key = next((item[f] for f in KEY_FIELDS if isinstance(item, dict) and item.get(f) is not None),
+                           index)
+                walk(item, f"{path}.{key}" if path else str(key))
+
+    walk(document, prefix)
+    return metrics
+
+
+def document_time(document) -> float:
+    """The document's own timestamp (top level or one level down), if it has one."""
+    candidates = [document] + [v for v in document.values() if isinstance(v, dict)] \
+        if isinstance(document, dict) else []
+    for candidate in candidates:
+        for field in TIME_FIELDS:
+            value = candidate.get(field)
+            if isinstance(value, str):
+                try:
+                    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+                except ValueError:
+                    continue
+    return None
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SnapshotFrame:
+    """A window of runs as NumPy arrays: values[run, metric], oldest run first."""
+
+    def __init__(self, run_ids, taken_at, names: list, values):
+        self.run_ids = run_ids
+        self.taken_at = taken_at
+        self.names = names
+        self.values = values
+        self._columns = {name: i for i, name in enumerate(names)}
+
+    def column(self, name: str):
+        return self.values[:, self._columns[name]]
+
+    def diff(self, lag: int = 1):
+        """Change of every metric against the run `lag` runs earlier; (runs - lag) x metrics."""
+        return self.values[lag:] - self.values[:-lag]
+
+    def pct_change(self, lag: int = 1):
+        before = self.values[:-lag]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(before != 0, (self.values[lag:] - before) / np.abs(before), np.nan)
+
+    def changed(self, lag: int = 1, threshold: float = 0.0) -> list:
+        """(metric, old, new) for metrics whose latest value moved by more than `threshold`."""
+        if len(self.run_ids) <= lag:
+            return []
+        old, new = self.values[-1 - lag], self.values[-1]
+        moved = np.abs(new - old) > threshold
+        # A metric that appears or disappears counts as a change
+        moved |= np.isnan(old) != np.isnan(new)
+        return [(self.names[i], None if np.isnan(old[i]) else float(old[i]),
+                 None if np.isnan(new[i]) else float(new[i])) for i in np.flatnonzero(moved)]
+
+
+class SnapshotStore:
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        self.path = path
+        self.stats = {"appends": 0, "duplicates": 0, "queries": 0}
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect(self.path)
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    taken_at REAL NOT NULL,
+                    digest TEXT NOT NULL,
+                    document TEXT NOT NULL,
+                    UNIQUE (kind, taken_at, digest)
+                );
+                CREATE TABLE IF NOT EXISTS metric_names (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    UNIQUE (kind, name)
+                );
+                CREATE TABLE IF NOT EXISTS metrics (
+                    metric_id INTEGER NOT NULL,
+                    run_id INTEGER NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (metric_id, run_id)
+                ) WITHOUT ROWID;
+                """
+            )
+        return self._conn
+
+    def append(self, kind: str, document, taken_at: float = None) -> int:
+        """Store one run; returns its id (the existing one for a duplicate)."""
+        text = json.dumps(document, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        taken_at = taken_at or document_time(document) or time.time()
+        with self.conn:
+            row = self.conn.execute(
+                "INSERT INTO runs (kind, taken_at, digest, document) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, taken_at, digest) DO NOTHING RETURNING id",
+                (kind, taken_at, digest, text),
+            ).fetchone()
+            if row is None:
+                self.stats["duplicates"] += 1
+                return self.conn.execute(
+                    "SELECT id FROM runs WHERE kind = ? AND taken_at = ? AND digest = ?", (kind, taken_at, digest)
+                ).fetchone()[0]
+            run_id = row[0]
+            metrics = flatten_metrics(document)
+            self.conn.executemany("INSERT OR IGNORE INTO metric_names (kind, name) VALUES (?, ?)",
+                                  ((kind, name) for name in metrics))
+            ids = self._metric_ids(kind, list(metrics))
+            self.conn.executemany("INSERT INTO metrics (metric_id, run_id, value) VALUES (?, ?, ?)",
+                                  ((ids[name], run_id, value) for name, value in metrics.items()))
+        self.stats["appends"] += 1
+        return run_id
+
+    def append_file(self, path: str, kind: str = None) -> int:
+        """Store a JSON snapshot file; `kind` defaults to its name (market-research.json -> market-research)."""
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+        return self.append(kind or os.path.splitext(os.path.basename(path))[0], document)
+
+    def _metric_ids(self, kind: str, names: list) -> dict:
+        ids = {}
+        # SQLite caps bound variables per statement
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            ids.update(self.conn.execute(
+                f"SELECT name, id FROM metric_names WHERE kind = ? AND name IN ({','.join('?' * len(chunk))})",
+                (kind, *chunk),
+            ).fetchall())
+        return ids
+
+    def runs(self, kind: str, last: int = DEFAULT_WINDOW) -> list:
+        """(id, taken_at) of the `last` runs, oldest first."""
+        self.stats["queries"] += 1
+        rows = self.conn.execute(
+            "SELECT id, taken_at FROM runs WHERE kind = ? ORDER BY taken_at DESC, id DESC LIMIT ?", (kind, last)
+        ).fetchall()
+        return rows[::-1]
+
+    def latest(self, kind: str):
+        """The most recent document of `kind` (None when there is none)."""
+        row = self.conn.execute(
+            "SELECT document FROM runs WHERE kind = ? ORDER BY taken_at DESC, id DESC LIMIT 1", (kind,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def metric_names(self, kind: str, prefix: str = "") -> list:
+        return [row[0] for row in self.conn.execute(
+            "SELECT name FROM metric_names WHERE kind = ? AND name >= ? AND name < ? ORDER BY name",
+            (kind, prefix, prefix + "\U0010ffff"),
+        )]
+
+    def _rows(self, kind: str, prefix: str, runs: list) -> list:
+        """(metric name, run id, value) for metrics under `prefix` in the given runs."""
+        if not runs:
+            return []
+        run_ids = [run_id for run_id, _ in runs]
+        return self.conn.execute(
+            f"""
+            SELECT n.name, m.run_id, m.value
+            FROM metric_names n JOIN metrics m ON m.metric_id = n.id
+            WHERE n.kind = ? AND n.name >= ? AND n.name < ?
+              AND m.run_id IN ({','.join('?' * len(run_ids))})
+            """,
+            (kind, prefix, prefix + "\U0010ffff", *run_ids),
+        ).fetchall()
+
+    def series(self, kind: str, prefix: str = "", last: int = DEFAULT_WINDOW) -> dict:
+        """
+        {"runs": [{"id", "taken_at"}...], "metrics": {name: [value or None per run]}}
+        for metrics whose name starts with `prefix`, over the `last` runs.
+        """
+        runs = self.runs(kind, last)
+        position = {run_id: i for i, (run_id, _) in enumerate(runs)}
+        metrics = {}
+        for name, run_id, value in self._rows(kind, prefix, runs):
+            metrics.setdefault(name, [None] * len(runs))[position[run_id]] = value
+        return {"runs": [{"id": run_id, "taken_at": taken_at} for run_id, taken_at in runs],
+                "metrics": dict(sorted(metrics.items()))}
+
+    def frame(self, kind: str, prefix: str = "", last: int = DEFAULT_WINDOW) -> SnapshotFrame:
+        """The same window as series(), as NumPy arrays."""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("frame() needs NumPy; use series() without it")
+        runs = self.runs(kind, last)
+        rows = self._rows(kind, prefix, runs)
+        run_ids = np.array([run_id for run_id, _ in runs], dtype=np.int64)
+        taken_at = np.array([t for _, t in runs], dtype=np.float64)
+        names = sorted({name for name, _, _ in rows})
+        values = np.full((len(runs), len(names)), np.nan)
+        if rows:
+            name_pos = {name: i for i, name in enumerate(names)}
+            cols = np.fromiter((name_pos[name] for name, _, _ in rows), dtype=np.int64, count=len(rows))
+            ids = np.fromiter((run_id for _, run_id, _ in rows), dtype=np.int64, count=len(rows))
+            order = np.argsort(run_ids)
+            rows_at = order[np.searchsorted(run_ids, ids, sorter=order)]
+            values[rows_at, cols] = np.fromiter((value for _, _, value in rows), dtype=np.float64, count=len(rows))
+        return SnapshotFrame(run_ids, taken_at, names, values)
+
+    def summary(self) -> dict:
+        runs = self.conn.execute("SELECT kind, COUNT(*), MAX(taken_at) FROM runs GROUP BY kind").fetchall()
+        return {
+            **self.stats,
+            "kinds": {kind: {"runs": count, "latest": latest} for kind, count, latest in runs},
+            "path": self.path,
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
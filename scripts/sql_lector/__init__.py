@@ -0,0 +1,6 @@
+"""
+Support modules for the Antigravity SQL Lector (scripts/addon.py).
+
+addon.py is run as a script, so these modules are imported as
+`sql_lector.<module>` with scripts/ on sys.path.
+"""
@@ -0,0 +1,93 @@
+"""
+Precomputed listing price statistics for the price_stats tool.
+
+Category price questions (`analyze_pricing_gap`, the market-intelligence
+jobs) aggregate every active listing on each call. Migration
+024_listing_price_stats.sql keeps the answers in a materialized view: one
+row per category, per (category, subcategory) and per (category, city), with
+count, min/max, mean and percentiles of price. pg_cron refreshes it
+concurrently every 15 minutes, so a call reads a few hundred rows however
+many listings there are.
+
+The figures are as old as the last refresh; every response carries
+`refreshed_at`. `refresh=true` refreshes first, through the Lector, so the
+result cache drops what it held for the view. Reads go through the
+sql_query path (routing, guard, cache).
+"""
+
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sql_lector.mcp import ToolError
+from sql_lector.results import NAME
+
+PRICE_STATS_VIEW = os.getenv("SQL_LECTOR_PRICE_STATS_VIEW", "public.listing_price_stats")
+PRICE_STATS_MAX_ROWS = 1000
+
+GRAINS = ("category", "subcategory", "city")
+COLUMNS = ("grain, category_id, subcategory_id, city, listings, priced, min_price, p25_price, median_price, "
+           "p75_price, p90_price, max_price, avg_price, newest_listing_at")
+
+VIEW_PROBE = "SELECT to_regclass(%(view)s::text) IS NOT NULL AS present"
+
+
+class PriceStats:
+    """price_stats: reads of the listing_price_stats view."""
+
+    def __init__(self, execute: Callable[..., Awaitable[List[Dict[str, Any]]]], view: str = PRICE_STATS_VIEW):
+        # execute(query, params, cache=..., database=...) is the Lector's execute_query
+        self.execute = execute
+        if not re.fullmatch(NAME, view.lower()):
+            raise ValueError(f"SQL_LECTOR_PRICE_STATS_VIEW is not a view name: {view}")
+        self.view = view
+        self.present: Dict[Optional[str], bool] = {}  # per database, probed until found
+        self.counters = {"reads": 0, "refreshes": 0}
+
+    async def read(self, grain: str = "category", category_id: Optional[int] = None,
+                   subcategory_id: Optional[int] = None, city: Optional[str] = None,
+                   limit: int = PRICE_STATS_MAX_ROWS, refresh: bool = False, cache: bool = True,
+                   database: Optional[str] = None) -> Dict[str, Any]:
+        if grain not in GRAINS:
+            raise ToolError(f"grain must be one of {', '.join(GRAINS)}")
+        if not await self._present(database):
+            raise ToolError(f"{self.view} does not exist; apply supabase/migrations/024_listing_price_stats.sql")
+        if refresh:
+            await self.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {self.view}", None, cache=False,
+                               database=database)
+            self.counters["refreshes"] += 1
+
+        where, params = ["grain = %(grain)s::text"], {"grain": grain,
+                                                      "limit": max(1, min(limit, PRICE_STATS_MAX_ROWS))}
+        if category_id is not None:
+            where.append("category_id = %(category_id)s::integer")
+            params["category_id"] = category_id
+        if subcategory_id is not None:
+            where.append("subcategory_id = %(subcategory_id)s::integer")
+            params["subcategory_id"] = subcategory_id
+        if city:
+            # Cities are keyed by their lowercased first part: "Cluj-Napoca, Cluj" -> "cluj-napoca"
+            where.append("city = lower(btrim(split_part(%(city)s::text, ',', 1)))")
+            params["city"] = city
+        rows = await self.execute(
+            f"SELECT {COLUMNS}, refreshed_at FROM {self.view} WHERE {' AND '.join(where)} "
+            f"ORDER BY listings DESC, category_id, subcategory_id, city LIMIT %(limit)s::integer",
+            params, cache=cache, database=database)
+        self.counters["reads"] += 1
+
+        refreshed_at = rows[0]["refreshed_at"] if rows else None
+        stats = []
+        for row in rows:
+            row = dict(row)
+            del row["refreshed_at"]  # the same for every row of one refresh
+            stats.append(row)
+        return {"grain": grain, "refreshed_at": refreshed_at, "stats": stats}
+
+    async def _present(self, database: Optional[str]) -> bool:
+        if not self.present.get(database):
+            rows = await self.execute(VIEW_PROBE, {"view": self.view}, cache=False, database=database)
+            self.present[database] = bool(rows and rows[0]["present"])
+        return self.present[database]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"view": self.view, **self.counters}
@@ -0,0 +1,229 @@
+"""
+asyncpg backend for sql_query.
+
+asyncpg speaks the binary wire protocol and decodes rows straight into
+Records, with no per-row Python cursor machinery in between. It also keeps a
+per-connection LRU of prepared statements (`statement_cache_size`): a query
+text seen before is only Bound and Executed, not parsed and planned again.
+Behind a transaction pooler (Supabase port 6543) the cache is switched off,
+as it is for psycopg.
+
+`AsyncpgDatabase.run` has the same contract as pool.Database.run, so the
+Lector can swap one for the other (`--backend asyncpg`). Catalog reads,
+streams and LISTEN stay on the psycopg pool.
+
+psycopg placeholders (%s, %(name)s) are rewritten to $n outside literals, and %% to %,
+so callers keep one parameter style across backends.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+from sql_lector.mcp import ToolError
+from sql_lector.pool import (
+    POOL_MIN_SIZE, POOL_MAX_SIZE, POOL_MAX_IDLE, POOL_TIMEOUT, DatabaseUnavailable, redact,
+    uses_transaction_pooler,
+)
+from sql_lector.results import _TOKENS, READ_STATEMENTS
+from sql_lector.guard import Estimate, QueryRows, StatementTimeout, explain_sql
+
+STATEMENT_CACHE_SIZE = int(os.getenv("SQL_LECTOR_STATEMENT_CACHE_SIZE", "256"))
+
+# Statements that answer with rows even without RETURNING
+ROW_STATEMENTS = READ_STATEMENTS | {"show", "explain", "fetch", "call"}
+# Statements that leave session state behind on the connection
+SESSION_STATEMENTS = {"set", "reset", "listen", "unlisten", "discard", "load", "prepare", "declare", "do"}
+
+_PLACEHOLDER = re.compile(r"%(?:%|[sbt]|\((?P<name>[^)]+)\)[sbt])")
+
+
+def to_dollar_params(query: str, params=None) -> Tuple[str, Sequence[Any]]:
+    """Rewrite psycopg-style placeholders to $n and return the positional arguments."""
+    if params is None:
+        return query, ()
+    named: Dict[str, int] = {}
+    args: List[Any] = []
+
+    def replace(match):
+        if match.group() == "%%":
+            return "%"
+        name = match.group("name")
+        if name is None:
+            if isinstance(params, dict):
+                raise ToolError("Positional placeholder (%s) used with named parameters")
+            if len(args) >= len(params):
+                raise ToolError("Not enough parameters for the query")
+            args.append(params[len(args)])
+            return f"${len(args)}"
+        if not isinstance(params, dict):
+            raise ToolError(f"Named placeholder %({name})s needs a dict of parameters")
+        if name not in named:
+            args.append(params[name])
+            named[name] = len(args)
+        return f"${named[name]}"
+
+    parts = []
+    for match in _TOKENS.finditer(query):
+        text = match.group()
+        # psycopg reads %% as % everywhere, quoted or not; placeholders only count outside quotes here
+        parts.append(_PLACEHOLDER.sub(replace, text) if match.lastgroup == "word" else text.replace("%%", "%"))
+    if not isinstance(params, dict) and len(args) != len(params):
+        raise ToolError(f"The query takes {len(args)} parameters, {len(params)} given")
+    return "".join(parts), args
+
+
+def _rowcount(status: str) -> int:
+    # "UPDATE 12", "INSERT 0 3", "CREATE TABLE"
+    last = status.rsplit(" ", 1)[-1]
+    return int(last) if last.isdigit() else -1
+
+
+class AsyncpgDatabase:
+    """A PostgreSQL target behind an asyncpg pool, run the way pool.Database runs."""
+
+    def __init__(
+        self,
+        db_url: str,
+        name: str = "default",
+        min_size: int = POOL_MIN_SIZE,
+        max_size: int = POOL_MAX_SIZE,
+        max_idle: float = POOL_MAX_IDLE,
+        timeout: float = POOL_TIMEOUT,
+        statement_timeout_ms: int = 0,
+        statement_cache_size: int = STATEMENT_CACHE_SIZE,
+    ):
+        self.db_url = db_url
+        self.name = name
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.statement_timeout_ms = statement_timeout_ms
+        self.statement_cache_size = 0 if uses_transaction_pooler(db_url) else statement_cache_size
+        self.pool: Optional[asyncpg.Pool] = None
+        self._opening: Optional[asyncio.Future] = None
+        self.opened_at: Optional[float] = None
+        self.queries = 0
+
+    async def _init(self, conn):
+        # Same shapes as psycopg: json/jsonb arrive decoded
+        for kind in ("json", "jsonb"):
+            await conn.set_type_codec(kind, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+    async def _create_pool(self) -> asyncpg.Pool:
+        settings = {"application_name": "antigravity-sql-lector"}
+        if self.statement_timeout_ms > 0:
+            # Set once per connection, so a query costs no extra SET round trip
+            settings["statement_timeout"] = str(self.statement_timeout_ms)
+        pool = await asyncpg.create_pool(
+            self.db_url,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_inactive_connection_lifetime=self.max_idle,
+            statement_cache_size=self.statement_cache_size,
+            server_settings=settings,
+            timeout=self.timeout,
+            init=self._init,
+            reset=self._release,
+        )
+        self.opened_at = time.time()
+        return pool
+
+    async def open(self, wait: bool = True):
+        """Create the pool; with wait=False it connects in the background and the first run() waits."""
+        self._opening = asyncio.ensure_future(self._create_pool())
+        if wait:
+            await self._ready()
+
+    async def _ready(self) -> asyncpg.Pool:
+        if self.pool is None:
+            if self._opening is None:
+                raise ToolError("The asyncpg pool is not open")
+            try:
+                # Shielded: a cancelled tool call must not cancel the pool being built
+                self.pool = await asyncio.shield(self._opening)
+            except Exception:
+                self._opening = asyncio.ensure_future(self._create_pool())  # retry on the next call
+                raise
+        return self.pool
+
+    async def close(self):
+        if self._opening is not None and not self._opening.done():
+            self._opening.cancel()
+        self._opening = None
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def _release(self, conn):
+        # asyncpg resets every connection on release (one more round trip per call);
+        # run() resets only after statements that can change the session instead
+        pass
+
+    async def run(self, sql, query: str, params, guard, prepare: Optional[bool] = None,
+                  estimate: Optional[Estimate] = None) -> Tuple[QueryRows, Any, float]:
+        """
+        Run one sql_query statement: (rows, planner estimate or None, ms spent
+        executing). Every statement goes through the statement cache, so
+        `prepare` changes nothing here. A given `estimate` is checked instead
+        of running EXPLAIN.
+        """
+        try:
+            pool = await self._ready()
+        except (OSError, asyncio.TimeoutError, asyncpg.exceptions.PostgresConnectionError) as e:
+            raise DatabaseUnavailable(f"{self.name}: {e}") from e
+        text, args = to_dollar_params(query, params)
+        started = time.perf_counter()
+        try:
+            async with pool.acquire(timeout=self.timeout) as conn:
+                if estimate is not None:
+                    estimate = guard.check(estimate)
+                elif guard.explains(sql):
+                    estimate = guard.review(sql, await conn.fetchval(explain_sql(text), *args))
+                started = time.perf_counter()
+                if guard.downgrades(sql, estimate):
+                    # Cursors need a transaction; only max_rows + 1 rows leave the server
+                    async with conn.transaction(readonly=True):
+                        cursor = await conn.cursor(text, *args)
+                        rows = guard.cap([dict(r) for r in await cursor.fetch(guard.max_rows + 1)])
+                elif sql.single and (sql.verb in ROW_STATEMENTS or " returning " in sql.skeleton):
+                    rows = guard.cap([dict(r) for r in await conn.fetch(text, *args)])
+                else:
+                    # Without arguments this is the simple protocol, which also takes several statements
+                    status = await conn.execute(text, *args)
+                    if conn.is_in_transaction():
+                        await conn.execute("ROLLBACK")  # a bare BEGIN is not kept open across calls
+                    if not sql.single or sql.verb in SESSION_STATEMENTS:
+                        await conn.reset()  # neither is a SET or a LISTEN
+                    rows = QueryRows([{"status": "success", "message": "Query executed successfully",
+                                       "rowcount": _rowcount(status)}])
+        except asyncpg.exceptions.QueryCanceledError as e:
+            raise StatementTimeout(estimate, (time.perf_counter() - started) * 1000) from e
+        except (OSError, asyncio.TimeoutError, asyncpg.exceptions.PostgresConnectionError,
+                asyncpg.exceptions.ConnectionDoesNotExistError) as e:
+            raise DatabaseUnavailable(f"{self.name}: {e}") from e
+        except asyncpg.exceptions.InterfaceError as e:
+            raise ToolError(str(e)) from e
+        self.queries += 1
+        return rows, estimate, (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.pool
+        return {
+            "name": self.name,
+            "backend": "asyncpg",
+            "url": redact(self.db_url),
+            "size": pool.get_size() if pool else 0,
+            "available": pool.get_idle_size() if pool else 0,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "queries": self.queries,
+            "statement_cache_size": self.statement_cache_size,
+            "prepared_statements": self.statement_cache_size > 0,
+        }
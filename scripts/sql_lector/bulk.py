@@ -0,0 +1,357 @@
+"""
+Bulk import and export through COPY.
+
+Seeding and migrations (insert-to-supabase.js, test-insert-ads.js) insert one
+row per statement, paying a round trip and a commit for every row. COPY
+streams all rows through one statement instead.
+
+Export runs `COPY ... TO STDOUT` and streams it into a file, as CSV (with a
+header) or PostgreSQL binary, gzipped when the path ends in `.gz`. It runs in
+one REPEATABLE READ, READ ONLY transaction, so the file is a consistent
+snapshot. It is written to `<path>.part` and renamed when complete.
+
+Import splits the file into chunks of `chunk_rows` records and runs
+`COPY ... FROM STDIN` for each chunk in its own transaction. A bad row fails
+only its chunk. Earlier chunks stay committed, and the error says how to
+resume with `skip_rows`. Splitting never parses values: a CSV record ends at
+a newline outside quotes, and a binary tuple is walked by its length words.
+
+Progress (bytes of the file) goes out as MCP progress notifications and to
+the log. Files are confined to SQL_LECTOR_BULK_DIR.
+"""
+
+import io
+import os
+import re
+import csv
+import gzip
+import time
+import struct
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg import sql
+
+from sql_lector.mcp import ToolError, log, report_progress
+from sql_lector.results import SqlText, READ_STATEMENTS, NAME, qualify
+
+BULK_DIR = os.getenv(
+    "SQL_LECTOR_BULK_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "antigravity", "bulk"),
+)
+BULK_CHUNK_ROWS = int(os.getenv("SQL_LECTOR_BULK_CHUNK_ROWS", "50000"))
+# Per export, and per import chunk; replaces the role's statement_timeout
+BULK_TIMEOUT_MS = int(os.getenv("SQL_LECTOR_BULK_TIMEOUT_MS", "600000"))
+BULK_FORMATS = ("csv", "binary")
+
+BLOCK_BYTES = 1024 * 1024
+PROGRESS_BYTES = 8 * 1024 * 1024
+BINARY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+BINARY_HEADER = BINARY_SIGNATURE + struct.pack("!ii", 0, 0)
+BINARY_TRAILER = struct.pack("!h", -1)
+
+
+def resolve_path(path: str, base: str = BULK_DIR) -> str:
+    """`path` under the bulk directory (relative paths are taken from it)."""
+    root = os.path.realpath(base)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([full, root]) != root:
+        raise ToolError(f"Bulk files must be inside {root} (SQL_LECTOR_BULK_DIR)")
+    return full
+
+
+def table_identifier(name: str) -> sql.Composable:
+    """`listings` / `market.Listings` / `"Ads"` as a schema-qualified identifier, folded like PostgreSQL."""
+    text = SqlText(name).normalized
+    if not re.fullmatch(NAME, text):
+        raise ToolError(f"Not a table name: {name}")
+    schema, table = qualify(text).split(".", 1)
+    return sql.Identifier(schema, table)
+
+
+def _column_list(columns: Optional[List[str]]) -> sql.Composable:
+    if not columns:
+        return sql.SQL("")
+    return sql.SQL(" ({})").format(sql.SQL(", ").join(sql.Identifier(c) for c in columns))
+
+
+def _check_format(fmt: str):
+    if fmt not in BULK_FORMATS:
+        raise ToolError(f"Unknown format '{fmt}'; expected one of {', '.join(BULK_FORMATS)}")
+
+
+def _open(path: str, mode: str, gzipped: bool):
+    """(file, raw file) for reading or writing bytes. The raw file's position is the progress."""
+    raw = open(path, mode + "b")
+    if gzipped:
+        return gzip.GzipFile(fileobj=raw, mode=mode, compresslevel=6), raw
+    return raw, raw
+
+
+# ------------------------------------------------------------------------------
+# Splitting files into records
+# ------------------------------------------------------------------------------
+
+class RecordReader:
+    """Whole COPY records from a file, a block at a time, without parsing values."""
+
+    def __init__(self, f, fmt: str):
+        self.f = f if isinstance(f, io.BufferedIOBase) else io.BufferedReader(f)
+        self.fmt = fmt
+        self.eof = False
+        if fmt == "binary":
+            self._read_binary_header()
+
+    def _read_exact(self, n: int) -> bytes:
+        data = self.f.read(n)
+        if len(data) != n:
+            raise ToolError("Truncated binary COPY file")
+        return data
+
+    def _read_binary_header(self):
+        if self.f.read(len(BINARY_SIGNATURE)) != BINARY_SIGNATURE:
+            raise ToolError("Not a PostgreSQL binary COPY file (bad signature)")
+        flags, extension = struct.unpack("!ii", self._read_exact(8))
+        if flags & (1 << 16):
+            raise ToolError("Binary COPY files with OIDs are not supported")
+        self._read_exact(extension)
+
+    def _next_csv(self) -> Optional[bytes]:
+        line = self.f.readline()
+        if not line:
+            return None
+        if line.count(b'"') % 2 == 0:
+            return line
+        # A quoted value spans lines: the record ends where the quotes balance
+        parts = [line]
+        quotes = line.count(b'"')
+        while quotes % 2:
+            line = self.f.readline()
+            if not line:
+                break  # unterminated quote: COPY reports it
+            parts.append(line)
+            quotes += line.count(b'"')
+        return b"".join(parts)
+
+    def _next_binary(self) -> Optional[bytes]:
+        head = self.f.read(2)
+        if len(head) < 2:
+            return None  # no trailer; accept the end of the file
+        (fields,) = struct.unpack("!h", head)
+        if fields == -1:
+            return None
+        parts = [head]
+        for _ in range(fields):
+            length_word = self._read_exact(4)
+            parts.append(length_word)
+            (length,) = struct.unpack("!i", length_word)
+            if length > 0:
+                parts.append(self._read_exact(length))
+        return b"".join(parts)
+
+    def next_record(self) -> Optional[bytes]:
+        if self.eof:
+            return None
+        record = self._next_csv() if self.fmt == "csv" else self._next_binary()
+        if record is None:
+            self.eof = True
+        return record
+
+    def read(self, max_records: int, max_bytes: int = BLOCK_BYTES) -> Tuple[bytes, int]:
+        """Up to `max_records` records, stopping after about `max_bytes`; (data, count)."""
+        parts: List[bytes] = []
+        size = 0
+        while len(parts) < max_records and size < max_bytes:
+            record = self.next_record()
+            if record is None:
+                break
+            parts.append(record)
+            size += len(record)
+        return b"".join(parts), len(parts)
+
+    def skip(self, count: int) -> int:
+        skipped = 0
+        while skipped < count and self.next_record() is not None:
+            skipped += 1
+        return skipped
+
+
+def csv_header(line: bytes) -> List[str]:
+    return next(csv.reader([line.decode("utf-8").rstrip("\r\n")]))
+
+
+# ------------------------------------------------------------------------------
+# COPY
+# ------------------------------------------------------------------------------
+
+class Progress:
+    """Throttled progress in bytes: MCP notification + log line every PROGRESS_BYTES."""
+
+    def __init__(self, label: str, total: Optional[int] = None):
+        self.label = label
+        self.total = total
+        self.reported = 0
+
+    async def update(self, done: int, rows: Optional[int] = None, force: bool = False):
+        if not force and done - self.reported < PROGRESS_BYTES:
+            return
+        self.reported = done
+        message = f"{self.label}: {done / 1048576:.1f} MB" if rows is None else \
+            f"{self.label}: {rows:,} rows, {done / 1048576:.1f} MB"
+        if self.total:
+            message += f" of {self.total / 1048576:.1f} MB"
+        log(message)
+        await report_progress(done, self.total, message)
+
+
+class BulkCopy:
+    def __init__(self, db, directory: str = BULK_DIR, chunk_rows: int = BULK_CHUNK_ROWS,
+                 timeout_ms: int = BULK_TIMEOUT_MS):
+        self.db = db
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.timeout_ms = timeout_ms
+        self.counters = {"exports": 0, "imports": 0, "rows_exported": 0, "rows_imported": 0, "failed_chunks": 0}
+
+    async def _set_timeout(self, conn):
+        await conn.execute("SELECT set_config('statement_timeout', %s, true)", (f"{self.timeout_ms}ms",))
+
+    async def export(self, path: str, table: Optional[str] = None, query: Optional[str] = None,
+                     columns: Optional[List[str]] = None, fmt: str = "csv", header: bool = True,
+                     db=None) -> Dict[str, Any]:
+        """Stream a table or a SELECT into `path` with COPY ... TO STDOUT (from `db`, default ours)."""
+        _check_format(fmt)
+        if (table is None) == (query is None):
+            raise ToolError("Give either table or query")
+        if query is not None:
+            text = SqlText(query)
+            if text.verb not in READ_STATEMENTS or not text.single:
+                raise ToolError("query must be a single SELECT (or WITH/VALUES/TABLE)")
+            if columns:
+                raise ToolError("columns only applies to table exports; select them in the query")
+            source = sql.SQL("({})").format(sql.SQL(query.strip().rstrip(";")))
+        else:
+            source = sql.SQL("{}{}").format(table_identifier(table), _column_list(columns))
+        options = sql.SQL("FORMAT csv, HEADER true" if fmt == "csv" and header else f"FORMAT {fmt}")
+        statement = sql.SQL("COPY {} TO STDOUT ({})").format(source, options)
+
+        full = resolve_path(path, self.directory)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        partial = full + ".part"
+        progress = Progress(f"bulk_export {path}")
+        started = time.perf_counter()
+        written = 0
+        f, raw = _open(partial, "w", full.endswith(".gz"))
+        try:
+            async with (db or self.db).connection() as conn:
+                await conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                await self._set_timeout(conn)
+                async with conn.cursor() as cur:
+                    async with cur.copy(statement) as copy:
+                        buffer = bytearray()
+                        async for data in copy:
+                            buffer += data
+                            if len(buffer) >= BLOCK_BYTES:
+                                await asyncio.to_thread(f.write, bytes(buffer))
+                                written += len(buffer)
+                                buffer.clear()
+                                await progress.update(written)
+                        if buffer:
+                            await asyncio.to_thread(f.write, bytes(buffer))
+                            written += len(buffer)
+                    rows = cur.rowcount
+            f.close()
+            raw.close()
+            os.replace(partial, full)
+        except BaseException:
+            f.close()
+            raw.close()
+            os.unlink(partial)
+            raise
+        elapsed = time.perf_counter() - started
+        self.counters["exports"] += 1
+        self.counters["rows_exported"] += rows
+        await progress.update(written, rows, force=True)
+        return {"path": full, "format": fmt, "rows": rows, "bytes": os.path.getsize(full),
+                "seconds": round(elapsed, 3), "rows_per_second": round(rows / elapsed) if elapsed else None}
+
+    async def import_file(self, path: str, table: str, columns: Optional[List[str]] = None, fmt: str = "csv",
+                          header: bool = True, chunk_rows: Optional[int] = None,
+                          skip_rows: int = 0, db=None) -> Dict[str, Any]:
+        """COPY `path` into `table` (on `db`, default ours), one transaction per `chunk_rows` records."""
+        _check_format(fmt)
+        chunk_rows = chunk_rows or self.chunk_rows
+        if chunk_rows < 1 or skip_rows < 0:
+            raise ToolError("chunk_rows must be positive and skip_rows not negative")
+        full = resolve_path(path, self.directory)
+        if not os.path.isfile(full):
+            raise ToolError(f"No such file: {full}")
+        target = table_identifier(table)
+
+        f, raw = _open(full, "r", full.endswith(".gz"))
+        try:
+            reader = RecordReader(f, fmt)
+            if fmt == "csv" and header:
+                first = await asyncio.to_thread(reader.next_record)
+                if first is None:
+                    raise ToolError("The file is empty")
+                if not columns:
+                    columns = csv_header(first)
+            if skip_rows:
+                await asyncio.to_thread(reader.skip, skip_rows)
+            statement = sql.SQL("COPY {}{} FROM STDIN (FORMAT {})").format(
+                target, _column_list(columns), sql.SQL(fmt))
+            result = await self._copy_chunks(db or self.db, reader, raw, statement, chunk_rows, skip_rows,
+                                             Progress(f"bulk_import {path}", os.path.getsize(full)))
+        finally:
+            f.close()
+            raw.close()
+        result.update({"table": table, "path": full, "format": fmt, "columns": columns})
+        return result
+
+    async def _copy_chunks(self, db, reader: RecordReader, raw, statement, chunk_rows: int, skip_rows: int,
+                           progress: Progress) -> Dict[str, Any]:
+        started = time.perf_counter()
+        committed = 0
+        chunks = 0
+        block, count = await asyncio.to_thread(reader.read, chunk_rows)
+        while count:
+            in_chunk = 0
+            try:
+                async with db.connection() as conn:
+                    await self._set_timeout(conn)
+                    async with conn.cursor().copy(statement) as copy:
+                        if reader.fmt == "binary":
+                            await copy.write(BINARY_HEADER)
+                        while count:
+                            await copy.write(block)
+                            in_chunk += count
+                            if in_chunk >= chunk_rows:
+                                break
+                            block, count = await asyncio.to_thread(reader.read, chunk_rows - in_chunk)
+                        if reader.fmt == "binary":
+                            await copy.write(BINARY_TRAILER)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters["failed_chunks"] += 1
+                self.counters["rows_imported"] += committed
+                first = skip_rows + committed + 1
+                raise ToolError(
+                    f"Import stopped in chunk {chunks + 1} (rows {first:,}-{first + chunk_rows - 1:,} of the file): "
+                    f"{str(e).strip()}. {committed:,} rows before it are committed; "
+                    f"fix the row and run again with skip_rows={skip_rows + committed} to resume."
+                ) from e
+            committed += in_chunk
+            chunks += 1
+            await progress.update(raw.tell(), committed, force=True)
+            block, count = await asyncio.to_thread(reader.read, chunk_rows)
+        elapsed = time.perf_counter() - started
+        self.counters["imports"] += 1
+        self.counters["rows_imported"] += committed
+        return {"rows": committed, "chunks": chunks, "skipped_rows": skip_rows, "seconds": round(elapsed, 3),
+                "rows_per_second": round(committed / elapsed) if elapsed else None}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"directory": os.path.realpath(self.directory), "chunk_rows": self.chunk_rows,
+                "timeout_ms": self.timeout_ms, **self.counters}
@@ -0,0 +1,266 @@
+"""
+Streaming result sets over named server-side cursors.
+
+`sql_query` materializes the whole result. For large SELECTs (listings,
+events) a stream DECLAREs a server-side cursor instead and pulls `itersize`
+rows per round trip, so the Lector never holds more than one page in memory.
+
+Over MCP a stream is paged: each page carries a continuation token, and the
+cursor stays open between calls in a `CursorRegistry` session. The session
+holds its own pool connection; it is closed when the result is exhausted,
+when the client closes it, or after `ttl` seconds without a fetch.
+
+Limits are enforced on both sides of a page: `max_rows` caps the whole
+stream, `max_bytes` caps the JSON size of one page (a page always carries at
+least one row so paging makes progress).
+"""
+
+import os
+import time
+import asyncio
+import secrets
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sql_lector.mcp import ToolError, to_json, log
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+
+CURSOR_ITERSIZE = int(os.getenv("SQL_LECTOR_CURSOR_ITERSIZE", "500"))
+CURSOR_TTL = float(os.getenv("SQL_LECTOR_CURSOR_TTL", "120"))
+CURSOR_MAX_OPEN = int(os.getenv("SQL_LECTOR_CURSOR_MAX_OPEN", "4"))
+STREAM_MAX_ROWS = int(os.getenv("SQL_LECTOR_STREAM_MAX_ROWS", "1000000"))
+PAGE_MAX_BYTES = int(os.getenv("SQL_LECTOR_PAGE_MAX_BYTES", str(1024 * 1024)))
+
+# JSON-friendly formats are served over MCP; numpy/arrow are for in-process callers
+JSON_FORMATS = ("rows", "columns")
+BATCH_FORMATS = JSON_FORMATS + ("numpy", "arrow")
+
+
+# ------------------------------------------------------------------------------
+# Batches
+# ------------------------------------------------------------------------------
+
+def to_batch(columns: Sequence[str], rows: List[tuple], fmt: str = "rows"):
+    """
+    Convert tuple rows to a batch:
+      rows    - list of {column: value} dicts
+      columns - {column: [values]}
+      numpy   - {column: ndarray} (object dtype where values are mixed or NULL)
+      arrow   - pyarrow.RecordBatch
+    """
+    if fmt == "rows":
+        return [dict(zip(columns, row)) for row in rows]
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    if fmt == "columns":
+        return {name: list(column) for name, column in zip(columns, values)}
+    if fmt == "numpy":
+        if np is None:
+            raise ToolError("format 'numpy' needs numpy installed")
+        return {name: np.array(column) for name, column in zip(columns, values)}
+    if fmt == "arrow":
+        if pa is None:
+            raise ToolError("format 'arrow' needs pyarrow installed")
+        return pa.RecordBatch.from_pydict({name: list(column) for name, column in zip(columns, values)})
+    raise ToolError(f"Unknown format '{fmt}'; expected one of {', '.join(BATCH_FORMATS)}")
+
+
+def _cursor_name() -> str:
+    return f"lector_{secrets.token_hex(6)}"
+
+
+async def stream_rows(conn, query: str, params=None, itersize: int = CURSOR_ITERSIZE,
+                      max_rows: int = STREAM_MAX_ROWS) -> AsyncIterator[Tuple[List[str], List[tuple]]]:
+    """
+    Yield (columns, rows) chunks of at most `itersize` rows from a named
+    server-side cursor on `conn`; stops after `max_rows` rows. The caller owns
+    the transaction (the cursor lives until it ends).
+    """
+    async with conn.cursor(name=_cursor_name()) as cur:
+        cur.itersize = itersize
+        await cur.execute(query, params)
+        columns = [c.name for c in cur.description]
+        remaining = max_rows
+        while remaining > 0:
+            rows = await cur.fetchmany(min(itersize, remaining))
+            if not rows:
+                break
+            remaining -= len(rows)
+            yield columns, rows
+
+
+# ------------------------------------------------------------------------------
+# Paged streams over MCP
+# ------------------------------------------------------------------------------
+
+class CursorSession:
+    """One open server-side cursor on a connection checked out of the pool."""
+
+    def __init__(self, token: str, db, conn, cursor, columns: List[str], fmt: str,
+                 page_size: int, max_rows: int, max_bytes: int):
+        self.token = token
+        self.db = db
+        self.conn = conn
+        self.cursor = cursor
+        self.columns = columns
+        self.format = fmt
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.rows_sent = 0
+        self.pending: deque = deque()
+        self.exhausted = False
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def next_page(self) -> Dict[str, Any]:
+        limit = min(self.page_size, self.max_rows - self.rows_sent)
+        # Read one row past the page so the last page is known to be the last
+        wanted = limit + 1 - len(self.pending)
+        if wanted > 0 and not self.exhausted:
+            fetched = await self.cursor.fetchmany(wanted)
+            self.exhausted = len(fetched) < wanted
+            self.pending.extend(fetched)
+
+        rows: List[tuple] = []
+        size = 0
+        while self.pending and len(rows) < limit:
+            row_size = len(to_json(self.pending[0])) + 1
+            if rows and size + row_size > self.max_bytes:
+                break
+            rows.append(self.pending.popleft())
+            size += row_size
+        self.rows_sent += len(rows)
+        self.last_used = time.monotonic()
+        # Whatever is still pending was left behind by the row limit or is the next page
+        truncated = self.rows_sent >= self.max_rows and bool(self.pending)
+        done = not self.pending or self.rows_sent >= self.max_rows
+        return {
+            "columns": self.columns,
+            "format": self.format,
+            "data": to_batch(self.columns, rows, self.format),
+            "row_count": len(rows),
+            "rows_sent": self.rows_sent,
+            "bytes": size,
+            "truncated": truncated,
+            "next_cursor": None if done else self.token,
+        }
+
+
+class CursorRegistry:
+    """Open paged streams by continuation token, with idle expiry."""
+
+    def __init__(self, db, ttl: float = CURSOR_TTL, max_open: int = CURSOR_MAX_OPEN, prepare=None):
+        self.db = db
+        # Coroutine run on a session's connection before DECLARE (e.g. the statement timeout)
+        self.prepare = prepare
+        self.ttl = ttl
+        # Leave at least one pooled connection for ordinary tool calls
+        self.max_open = max(1, min(max_open, db.pool.max_size - 1))
+        self.sessions: Dict[str, CursorSession] = {}
+        self.expired = 0
+        self._reaper: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.ttl / 4))
+            await self.reap()
+
+    async def reap(self) -> int:
+        """Close sessions idle for longer than the TTL."""
+        now = time.monotonic()
+        stale = [s for s in self.sessions.values() if not s.lock.locked() and now - s.last_used > self.ttl]
+        for session in stale:
+            await self._release(session)
+        if stale:
+            self.expired += len(stale)
+            log(f"Closed {len(stale)} idle cursor(s)")
+        return len(stale)
+
+    async def open(self, query: str, params=None, page_size: int = CURSOR_ITERSIZE,
+                   max_rows: int = STREAM_MAX_ROWS, max_bytes: int = PAGE_MAX_BYTES,
+                   fmt: str = "rows", db=None) -> Dict[str, Any]:
+        """DECLARE a cursor for `query` (on `db`, default the registry's) and return its first page."""
+        if fmt not in JSON_FORMATS:
+            raise ToolError(f"Unknown format '{fmt}'; expected one of {', '.join(JSON_FORMATS)}")
+        if page_size < 1 or max_rows < 1 or max_bytes < 1:
+            raise ToolError("page_size, max_rows and max_bytes must be positive")
+        await self.reap()
+        if len(self.sessions) >= self.max_open:
+            raise ToolError(f"Too many open cursors ({self.max_open}); "
+                            "page to the end or close one with sql_fetch(close=true)")
+
+        db = db or self.db
+        conn = await db.acquire()
+        try:
+            if self.prepare is not None:
+                await self.prepare(conn)
+            cursor = conn.cursor(name=_cursor_name())
+            cursor.itersize = page_size
+            await cursor.execute(query, params)
+        except BaseException:
+            await db.release(conn)
+            raise
+        token = secrets.token_urlsafe(16)
+        session = CursorSession(token, db, conn, cursor, [c.name for c in cursor.description], fmt,
+                                page_size, min(max_rows, STREAM_MAX_ROWS), max_bytes)
+        self.sessions[token] = session
+        return await self._page(session)
+
+    async def fetch(self, token: str) -> Dict[str, Any]:
+        session = self.sessions.get(token)
+        if session is None:
+            raise ToolError("Unknown or expired cursor; run sql_stream again")
+        return await self._page(session)
+
+    async def close(self, token: str) -> bool:
+        session = self.sessions.get(token)
+        if session is None:
+            return False
+        async with session.lock:
+            await self._release(session)
+        return True
+
+    async def close_all(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for session in list(self.sessions.values()):
+            await self._release(session)
+
+    async def _page(self, session: CursorSession) -> Dict[str, Any]:
+        async with session.lock:
+            try:
+                page = await session.next_page()
+            except BaseException:
+                await self._release(session)
+                raise
+            if page["next_cursor"] is None:
+                await self._release(session)
+            return page
+
+    async def _release(self, session: CursorSession):
+        if self.sessions.pop(session.token, None) is None:
+            return
+        try:
+            await session.cursor.close()
+            await session.conn.rollback()
+        except Exception:
+            pass  # the pool discards a broken connection on return
+        await session.db.release(session.conn)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"open": len(self.sessions), "max_open": self.max_open,
+                "ttl_seconds": self.ttl, "expired": self.expired}
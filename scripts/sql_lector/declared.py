@@ -0,0 +1,194 @@
+"""
+Tools declared in a universal-db-config.json file, served as MCP tools.
+
+Each declared tool has the database to run on (`sourceId`), SQL with
+`{{name}}` placeholders, and typed `parameters`. The TypeScript manager
+(src/lib/universal-db-mcp.ts) pastes escaped values into the text, so every
+call is a new statement to parse and plan. Here each template is compiled
+once, at load: every `{{name}}` becomes a bind parameter cast to its
+declared type, and a placeholder inside a string literal is concatenated:
+
+    WHERE email ILIKE '%{{query}}%'  ->  WHERE email ILIKE ('%' || $1::text || '%')
+    LIMIT {{limit}}                  ->  LIMIT $1::numeric
+
+The statement text never changes between calls. psycopg prepares it on each
+pooled connection the first time it runs there, and asyncpg keeps it in its
+statement cache, so later calls only bind and execute. A value can never
+change the SQL. On startup every statement is PREPAREd once on its database,
+so a template that does not parse or type-check is reported before the
+first call. Calls go through sql_query's routing, guard and result cache.
+
+The cost guard would EXPLAIN every call, and an EXPLAIN parses and plans the
+statement again. Instead, startup EXPLAINs the prepared statement's generic
+plan (which does not depend on the arguments) once. Calls are checked
+against that estimate, and it is re-made every `ESTIMATE_TTL` seconds as
+tables grow.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sql_lector.mcp import ToolError, log
+from sql_lector.results import _TOKENS, SqlText
+from sql_lector.guard import EXPLAINABLE, Estimate, explain_sql
+
+ESTIMATE_TTL = float(os.getenv("SQL_LECTOR_DECLARED_ESTIMATE_TTL", "3600"))
+
+# Declared parameter type -> (PostgreSQL cast, JSON Schema type)
+PARAM_TYPES = {
+    "string": ("text", "string"),
+    "number": ("numeric", "number"),
+    "integer": ("bigint", "integer"),
+    "boolean": ("boolean", "boolean"),
+}
+
+_TEMPLATE = re.compile(r"\{\{([A-Za-z_]\w*)\}\}")
+
+
+def compile_template(sql: str, types: Dict[str, str]) -> str:
+    """
+    psycopg query text for a `{{name}}` template: typed %(name)s binds,
+    literal `%` doubled. `types` maps parameter names to PARAM_TYPES keys.
+    """
+    def bind(name):
+        if name not in types:
+            raise ValueError(f"{{{{{name}}}}} is not a declared parameter")
+        return f"%({name})s::{PARAM_TYPES[types[name]][0]}"
+
+    parts = []
+    for match in _TOKENS.finditer(sql.strip().rstrip(";")):
+        text, kind = match.group(), match.lastgroup
+        if kind == "string" and _TEMPLATE.search(text):
+            # '%{{q}}%' -> ('%' || %(q)s::text || '%')
+            pieces = []
+            for i, piece in enumerate(_TEMPLATE.split(text[1:-1])):
+                if i % 2:
+                    pieces.append(bind(piece))
+                elif piece:
+                    pieces.append("'" + piece.replace("%", "%%") + "'")
+            parts.append("(" + " || ".join(pieces) + ")" if len(pieces) > 1 else pieces[0])
+        elif kind == "word":
+            parts.append(_TEMPLATE.sub(lambda m: bind(m.group(1)), text.replace("%", "%%")))
+        elif _TEMPLATE.search(text):
+            raise ValueError(f"{{{{...}}}} inside a {kind} cannot be a bind parameter: {text}")
+        else:
+            parts.append(text.replace("%", "%%"))
+    return "".join(parts)
+
+
+class DeclaredTool:
+    """One `tools` entry, compiled."""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.name = spec["id"]
+        self.source = spec.get("sourceId")
+        self.description = spec.get("description") or f"Declared query {self.name}"
+        self.parameters = spec.get("parameters") or []
+        self.types = {}
+        for param in self.parameters:
+            if param["name"] == "cache":
+                raise ValueError(f"{self.name}: 'cache' is reserved for the result cache switch")
+            if param.get("type", "string") not in PARAM_TYPES:
+                raise ValueError(f"{self.name}: parameter {param['name']} has unsupported type {param['type']} "
+                                 f"(use one of {', '.join(PARAM_TYPES)})")
+            self.types[param["name"]] = param.get("type", "string")
+        self.query = compile_template(spec["sql"], self.types)
+        sql = SqlText(self.query)
+        if not sql.single:
+            raise ValueError(f"{self.name}: a declared tool runs exactly one statement")
+        self.explainable = sql.verb in EXPLAINABLE
+        self.calls = 0
+        self.prepared: Optional[bool] = None
+        self.error: Optional[str] = None
+        self.estimate: Optional[Estimate] = None
+        self.estimated_at = 0.0
+        self.refreshing: Optional[asyncio.Task] = None
+
+    def input_schema(self) -> Dict[str, Any]:
+        properties = {}
+        for param in self.parameters:
+            properties[param["name"]] = {"type": PARAM_TYPES[self.types[param["name"]]][1],
+                                         **({"description": param["description"]} if param.get("description") else {})}
+        properties["cache"] = {"type": "boolean", "description": "Use the result cache (default true)"}
+        required = [p["name"] for p in self.parameters if p.get("required")]
+        return {"type": "object", "properties": properties, **({"required": required} if required else {})}
+
+    def bind(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Arguments checked against the declared types; missing optional ones are NULL."""
+        params = {}
+        for name, kind in self.types.items():
+            value = arguments.get(name)
+            if value is not None and not _accepts(kind, value):
+                raise ToolError(f"{self.name}: {name} must be a {kind}, got {json.dumps(value)}")
+            params[name] = int(value) if kind == "integer" and value is not None else value
+        return params
+
+    async def prepare(self, db):
+        """
+        PREPARE once on `db` to check the statement parses and type-checks, keep
+        the guard's estimate of its generic plan, then DEALLOCATE.
+        """
+        from sql_lector.apg import to_dollar_params
+
+        # Passing the names as values yields them in $n order
+        text, order = to_dollar_params(self.query, {name: name for name in self.types})
+        types = ", ".join(PARAM_TYPES[self.types[name]][0] for name in order)
+        arguments = f"({', '.join('NULL' for _ in order)})" if order else ""
+        try:
+            async with db.connection() as conn:
+                await conn.execute(f"PREPARE lector_declared_check{f' ({types})' if types else ''} AS {text}")
+                if self.explainable:
+                    # A generic plan ignores the argument values, so NULLs can stand in for them
+                    await conn.execute("SELECT set_config('plan_cache_mode', 'force_generic_plan', true)")
+                    cur = await conn.execute(explain_sql(f"EXECUTE lector_declared_check{arguments}"))
+                    self.estimate = Estimate((await cur.fetchone())[0][0])
+                    self.estimated_at = time.monotonic()
+                await conn.execute("DEALLOCATE lector_declared_check")
+            self.prepared, self.error = True, None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.prepared, self.error = False, str(e).strip()
+            log(f"Declared tool {self.name} does not prepare on {self.source}: {self.error}")
+
+    def current_estimate(self) -> Optional[Estimate]:
+        """The generic plan's estimate, or None once it is older than ESTIMATE_TTL."""
+        if self.estimate is not None and time.monotonic() - self.estimated_at < ESTIMATE_TTL:
+            return self.estimate
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"source": self.source, "calls": self.calls, "prepared": self.prepared, "error": self.error,
+                "estimate": self.estimate.summary() if self.estimate is not None else None}
+
+
+def _accepts(kind: str, value: Any) -> bool:
+    if kind == "string":
+        return isinstance(value, str)
+    if kind == "boolean":
+        return isinstance(value, bool)
+    if isinstance(value, bool):
+        return False
+    if kind == "integer":
+        return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+    return isinstance(value, (int, float))
+
+
+def load_tools(path: str) -> List[DeclaredTool]:
+    """The `tools` of a universal-db-config.json style file, compiled."""
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f).get("tools") or []
+    tools, seen = [], set()
+    for spec in specs:
+        if "id" not in spec or "sql" not in spec:
+            raise ValueError(f"{path}: every tool needs an id and sql")
+        if spec["id"] in seen:
+            raise ValueError(f"{path}: tool {spec['id']} is declared twice")
+        seen.add(spec["id"])
+        tools.append(DeclaredTool(spec))
+    return tools
+
@@ -0,0 +1,147 @@
+"""
+Pre-execution cost guard for sql_query.
+
+Before a query runs, the guard asks the planner what it would cost
+(EXPLAIN (VERBOSE, FORMAT JSON), planning only, on the same connection and
+transaction that will run the query):
+
+- total cost above `max_cost` is rejected;
+- a write (UPDATE/DELETE/MERGE/INSERT ... SELECT) expected to touch more than
+  `max_write_rows` rows is rejected;
+- a read expected to return more than `max_rows` rows is downgraded: it runs
+  through a server-side cursor and only the first `max_rows` rows come back,
+  with a note pointing at sql_stream. Underestimated reads are cut at the
+  same limit after the fact.
+
+Every statement also runs under a statement_timeout, so one bad query cannot
+hold a pooled connection for long. The guard only judges plans; running
+EXPLAIN and the query is up to the backend (pool.Database for psycopg,
+apg.AsyncpgDatabase for asyncpg).
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+from sql_lector.mcp import ToolError
+
+MAX_COST = float(os.getenv("SQL_LECTOR_MAX_COST", "1000000"))
+MAX_ROWS = int(os.getenv("SQL_LECTOR_MAX_ROWS", "10000"))
+MAX_WRITE_ROWS = int(os.getenv("SQL_LECTOR_MAX_WRITE_ROWS", "10000"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_LECTOR_STATEMENT_TIMEOUT_MS", "30000"))
+
+EXPLAINABLE = {"select", "with", "values", "table", "insert", "update", "delete", "merge"}
+
+
+def explain_sql(query: str) -> str:
+    return f"EXPLAIN (VERBOSE, FORMAT JSON) {query}"
+
+
+class QueryRejected(ToolError):
+    """The planner's estimate is over the guard's limits."""
+
+
+class StatementTimeout(Exception):
+    """statement_timeout cancelled the query; carries what the profiler needs."""
+
+    def __init__(self, estimate=None, elapsed_ms: float = 0.0):
+        super().__init__("statement timeout")
+        self.estimate = estimate
+        self.elapsed_ms = elapsed_ms
+
+
+class QueryRows(list):
+    """Query result rows, with notes when the guard cut them short."""
+
+    def __init__(self, rows=(), notes=()):
+        super().__init__(rows)
+        self.notes = list(notes)
+
+
+class Estimate:
+    """What the planner expects from a statement."""
+
+    __slots__ = ("cost", "rows", "write_rows", "plan")
+
+    def __init__(self, plan: Dict[str, Any]):
+        top = plan["Plan"]
+        self.plan = plan
+        self.cost = top.get("Total Cost", 0.0)
+        self.rows = top.get("Plan Rows", 0)
+        # ModifyTable's own row estimate is 0 without RETURNING; its input is what gets written
+        if top.get("Node Type") == "ModifyTable":
+            self.write_rows = sum(child.get("Plan Rows", 0) for child in top.get("Plans", [])[:1])
+        else:
+            self.write_rows = 0
+
+    def summary(self) -> Dict[str, Any]:
+        return {"cost": self.cost, "rows": self.rows, "write_rows": self.write_rows,
+                "node": self.plan["Plan"].get("Node Type")}
+
+
+class CostGuard:
+    def __init__(self, max_cost: float = MAX_COST, max_rows: int = MAX_ROWS,
+                 max_write_rows: int = MAX_WRITE_ROWS, timeout_ms: int = STATEMENT_TIMEOUT_MS):
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.max_write_rows = max_write_rows
+        self.timeout_ms = timeout_ms
+        self.counters = {"explained": 0, "rejected": 0, "downgraded": 0, "truncated": 0, "timeouts": 0}
+
+    async def apply_timeout(self, conn):
+        """statement_timeout for the rest of the transaction (SET LOCAL; safe behind a pooler)."""
+        if self.timeout_ms > 0:
+            await conn.execute("SELECT set_config('statement_timeout', %s, true)", (f"{self.timeout_ms}ms",))
+
+    def explains(self, sql) -> bool:
+        """Whether `sql` gets an EXPLAIN first (not DDL, utility or multi-statement text)."""
+        return sql.verb in EXPLAINABLE and sql.single
+
+    def review(self, sql, plan: List[Dict[str, Any]]) -> Estimate:
+        """
+        Enforce the limits on an EXPLAIN (FORMAT JSON) result; returns the
+        estimate, raises QueryRejected when the query must not run.
+        """
+        self.counters["explained"] += 1
+        return self.check(Estimate(plan[0]))
+
+    def check(self, estimate: Estimate) -> Estimate:
+        """The same limits on an estimate made earlier (a declared tool's generic plan)."""
+        if self.max_cost > 0 and estimate.cost > self.max_cost:
+            self.counters["rejected"] += 1
+            raise QueryRejected(
+                f"Query rejected: estimated cost {estimate.cost:,.0f} is over the limit of {self.max_cost:,.0f}. "
+                "Narrow it with a WHERE clause on indexed columns or a LIMIT, or see slow_queries for index suggestions."
+            )
+        if self.max_write_rows > 0 and estimate.write_rows > self.max_write_rows:
+            self.counters["rejected"] += 1
+            raise QueryRejected(
+                f"Query rejected: it would write about {estimate.write_rows:,.0f} rows "
+                f"(limit {self.max_write_rows:,}). Split it into smaller batches."
+            )
+        return estimate
+
+    def downgrades(self, sql, estimate: Optional[Estimate]) -> bool:
+        """A read expected to return more than max_rows: fetch it through a cursor, capped."""
+        if (estimate is not None and self.max_rows > 0 and estimate.write_rows == 0
+                and sql.verb in ("select", "with", "values", "table") and estimate.rows > self.max_rows):
+            self.counters["downgraded"] += 1
+            return True
+        return False
+
+    def cap(self, rows: List[Any]) -> QueryRows:
+        if self.max_rows <= 0 or len(rows) <= self.max_rows:
+            return QueryRows(rows)
+        self.counters["truncated"] += 1
+        return QueryRows(rows[: self.max_rows], notes=[
+            f"Result truncated to the first {self.max_rows:,} rows. "
+            "Use sql_stream to page through the full result."
+        ])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_cost": self.max_cost,
+            "max_rows": self.max_rows,
+            "max_write_rows": self.max_write_rows,
+            "statement_timeout_ms": self.timeout_ms,
+            **self.counters,
+        }
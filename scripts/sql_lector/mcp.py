@@ -0,0 +1,245 @@
+"""
+Model Context Protocol server over stdio: JSON-RPC 2.0, one message per line.
+
+Implements what a tool server needs: initialize, ping, tools/list,
+tools/call, the cancellation notification and progress notifications for
+calls that pass a progressToken. Requests are handled
+concurrently (responses go out in completion order, matched by id), so a slow
+query does not hold up a health check. Tool failures are returned as tool
+results with isError set, as the protocol asks; protocol errors use JSON-RPC
+error codes. stdout carries protocol messages only; logs go to stderr.
+"""
+
+import os
+import sys
+import json
+import uuid
+import asyncio
+import datetime
+import contextvars
+import decimal
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+PROTOCOL_VERSION = "2024-11-05"
+MAX_CONCURRENCY = int(os.getenv("SQL_LECTOR_MAX_CONCURRENCY", "32"))
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+# Progress sender of the tool call running in the current task (None when not asked for)
+_progress: contextvars.ContextVar = contextvars.ContextVar("mcp_progress", default=None)
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+async def report_progress(progress: float, total: Optional[float] = None, message: Optional[str] = None):
+    """Send notifications/progress for the current tool call, if its caller passed a progressToken."""
+    sender = _progress.get()
+    if sender is not None:
+        await sender(progress, total, message)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def to_json(value) -> str:
+    """JSON for database values (timestamps, numerics, UUIDs, bytea)."""
+    return json.dumps(value, default=_json_default, ensure_ascii=False)
+
+
+class ToolError(Exception):
+    """Raised by a tool handler for a failure the caller should see as a tool error."""
+
+
+class ToolResult:
+    """A tool result with notes for the caller, sent as extra text content after the value."""
+
+    def __init__(self, value: Any, notes=()):
+        self.value = value
+        self.notes = list(notes)
+
+
+class _RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class McpServer:
+    def __init__(self, name: str, version: str, instructions: Optional[str] = None,
+                 max_concurrency: int = MAX_CONCURRENCY):
+        self.name = name
+        self.version = version
+        self.instructions = instructions
+        self.tools: Dict[str, Dict[str, Any]] = {}
+        self.handlers: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight: Dict[Any, asyncio.Task] = {}
+        self._write_lock = asyncio.Lock()
+
+    def tool(self, name: str, description: str, input_schema: Dict[str, Any],
+             handler: Callable[..., Awaitable[Any]]):
+        """Register a tool; `handler(**arguments)` returns a JSON-serializable result."""
+        self.tools[name] = {"name": name, "description": description, "inputSchema": input_schema}
+        self.handlers[name] = handler
+
+    # --------------------------------------------------------------------------
+    # Dispatch
+    # --------------------------------------------------------------------------
+
+    async def _call_tool(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        name = params.get("name")
+        if name not in self.handlers:
+            raise _RpcError(INVALID_PARAMS, f"Unknown tool: {name}")
+        arguments = params.get("arguments") or {}
+        schema = self.tools[name]["inputSchema"]
+        missing = [key for key in schema.get("required", []) if key not in arguments]
+        unknown = [key for key in arguments if key not in schema.get("properties", {})]
+        if missing or unknown:
+            raise _RpcError(INVALID_PARAMS, f"Invalid arguments for {name}: "
+                                            f"missing {missing or 'none'}, unknown {unknown or 'none'}")
+        token = (params.get("_meta") or {}).get("progressToken")
+        if token is not None:
+            _progress.set(lambda progress, total, message: self._send_progress(token, progress, total, message))
+        try:
+            result = await self.handlers[name](**arguments)
+            if isinstance(result, ToolResult):
+                content = [{"type": "text", "text": to_json(result.value)}]
+                content += [{"type": "text", "text": note} for note in result.notes]
+                return {"content": content, "isError": False}
+            return {"content": [{"type": "text", "text": to_json(result)}], "isError": False}
+        except asyncio.CancelledError:
+            raise
+        except ToolError as e:
+            return {"content": [{"type": "text", "text": str(e)}], "isError": True}
+        except Exception as e:
+            return {"content": [{"type": "text", "text": f"{type(e).__name__}: {e}"}], "isError": True}
+
+    async def handle(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Handle one request or notification; returns the response (None for notifications)."""
+        method = message.get("method")
+        params = message.get("params") or {}
+        request_id = message.get("id")
+        is_notification = "id" not in message
+
+        if is_notification:
+            # notifications/initialized and anything else we don't act on
+            return None
+
+        try:
+            if method == "initialize":
+                result = {
+                    "protocolVersion": PROTOCOL_VERSION,
+                    "capabilities": {"tools": {"listChanged": False}},
+                    "serverInfo": {"name": self.name, "version": self.version},
+                }
+                if self.instructions:
+                    result["instructions"] = self.instructions
+            elif method == "ping":
+                result = {}
+            elif method == "tools/list":
+                result = {"tools": list(self.tools.values())}
+            elif method == "tools/call":
+                result = await self._call_tool(params)
+            else:
+                raise _RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+        except _RpcError as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": e.code, "message": str(e)}}
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": request_id, "error": {"code": INTERNAL_ERROR, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    # --------------------------------------------------------------------------
+    # Transport
+    # --------------------------------------------------------------------------
+
+    async def _send(self, message: Dict[str, Any]):
+        line = to_json(message) + "\n"
+        async with self._write_lock:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+
+    async def _send_progress(self, token, progress: float, total: Optional[float], message: Optional[str]):
+        params = {"progressToken": token, "progress": progress}
+        if total is not None:
+            params["total"] = total
+        if message:
+            params["message"] = message
+        await self._send({"jsonrpc": "2.0", "method": "notifications/progress", "params": params})
+
+    async def _run(self, message: Dict[str, Any]):
+        request_id = message.get("id")
+        try:
+            async with self.slots:
+                response = await self.handle(message)
+        except asyncio.CancelledError:
+            # The client cancelled; the protocol says not to answer
+            return
+        finally:
+            self.in_flight.pop(request_id, None)
+        if response is not None:
+            await self._send(response)
+
+    def dispatch_line(self, line: str) -> Optional[asyncio.Task]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as e:
+            return asyncio.ensure_future(self._send(
+                {"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": f"Parse error: {e}"}}
+            ))
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or "method" not in message:
+            return asyncio.ensure_future(self._send(
+                {"jsonrpc": "2.0", "id": message.get("id") if isinstance(message, dict) else None,
+                 "error": {"code": INVALID_REQUEST, "message": "Invalid request"}}
+            ))
+        if message["method"] == "notifications/cancelled":
+            # Handled here, not queued behind the requests it is meant to stop
+            task = self.in_flight.get((message.get("params") or {}).get("requestId"))
+            if task is not None:
+                task.cancel()
+            return None
+        task = asyncio.create_task(self._run(message))
+        if "id" in message:
+            self.in_flight[message["id"]] = task
+        return task
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        log(f"{self.name} {self.version} serving MCP on stdio ({len(self.tools)} tools)")
+
+        pending = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            task = self.dispatch_line(line.decode("utf-8"))
+            if task is not None:
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        # stdin closed: finish what was asked before exiting
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,177 @@
+"""
+Connection pooling for the SQL Lector (psycopg 3 + psycopg_pool).
+
+Connections are opened once and reused across tool calls. The pool keeps
+between `min_size` and `max_size` connections, checks each one before handing
+it out (a dead connection is replaced instead of failing the call), closes
+connections idle for `max_idle` seconds down to `min_size`, and recycles every
+connection after `max_lifetime` seconds.
+
+`Database.run` is the psycopg execution path for sql_query. It runs the cost
+guard's EXPLAIN, then the query, in one transaction under the statement
+timeout. apg.AsyncpgDatabase offers the same interface on asyncpg.
+"""
+
+import os
+import time
+import secrets
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from sql_lector.mcp import ToolError
+from sql_lector.guard import Estimate, QueryRows, StatementTimeout, explain_sql
+
+POOL_MIN_SIZE = int(os.getenv("SQL_LECTOR_POOL_MIN", "1"))
+POOL_MAX_SIZE = int(os.getenv("SQL_LECTOR_POOL_MAX", "10"))
+POOL_MAX_IDLE = float(os.getenv("SQL_LECTOR_POOL_MAX_IDLE", "300"))
+POOL_MAX_LIFETIME = float(os.getenv("SQL_LECTOR_POOL_MAX_LIFETIME", "3600"))
+POOL_TIMEOUT = float(os.getenv("SQL_LECTOR_POOL_TIMEOUT", "30"))
+
+# Supavisor / PgBouncer in transaction mode (Supabase's pooler port) cannot
+# keep server-side prepared statements between transactions.
+TRANSACTION_POOLER_PORTS = {6543}
+
+
+class DatabaseUnavailable(ToolError):
+    """The database could not be reached (or dropped the connection) before the query ran."""
+
+
+def connection_lost(error: psycopg.OperationalError) -> bool:
+    # No SQLSTATE: the client lost or never got a connection; 08: connection exception;
+    # 57P01-03: the server is shutting down or not accepting connections
+    state = getattr(error, "sqlstate", None)
+    return state is None or state.startswith("08") or state in ("57P01", "57P02", "57P03")
+
+
+def uses_transaction_pooler(db_url: str) -> bool:
+    try:
+        return urlsplit(db_url).port in TRANSACTION_POOLER_PORTS
+    except ValueError:
+        return False
+
+
+def redact(db_url: str) -> str:
+    """Connection URL without the password, for logs and health output."""
+    parts = urlsplit(db_url)
+    if parts.password:
+        netloc = parts.netloc.replace(f":{parts.password}@", ":***@")
+        return parts._replace(netloc=netloc).geturl()
+    return db_url
+
+
+class Database:
+    """A named PostgreSQL target behind an async connection pool."""
+
+    def __init__(
+        self,
+        db_url: str,
+        name: str = "default",
+        min_size: int = POOL_MIN_SIZE,
+        max_size: int = POOL_MAX_SIZE,
+        max_idle: float = POOL_MAX_IDLE,
+        max_lifetime: float = POOL_MAX_LIFETIME,
+        timeout: float = POOL_TIMEOUT,
+    ):
+        self.db_url = db_url
+        self.name = name
+        self.prepare = not uses_transaction_pooler(db_url)
+        self.pool = AsyncConnectionPool(
+            db_url,
+            name=name,
+            min_size=min(min_size, max_size),
+            max_size=max_size,
+            max_idle=max_idle,
+            max_lifetime=max_lifetime,
+            timeout=timeout,
+            check=AsyncConnectionPool.check_connection,
+            configure=self._configure,
+            open=False,
+        )
+        self.opened_at: Optional[float] = None
+
+    async def _configure(self, conn):
+        # psycopg prepares statements executed often enough; not through a transaction pooler
+        if not self.prepare:
+            conn.prepare_threshold = None
+
+    async def open(self, wait: bool = True):
+        await self.pool.open(wait=wait)
+        self.opened_at = time.time()
+
+    async def close(self):
+        await self.pool.close()
+
+    @asynccontextmanager
+    async def connection(self):
+        """A pooled connection; the transaction commits on exit, rolls back on error."""
+        async with self.pool.connection() as conn:
+            yield conn
+
+    async def acquire(self):
+        """Check a connection out of the pool for longer than one call; pair with release()."""
+        return await self.pool.getconn()
+
+    async def release(self, conn):
+        await self.pool.putconn(conn)
+
+    async def run(self, sql, query: str, params, guard, prepare: Optional[bool] = None,
+                  estimate: Optional[Estimate] = None) -> Tuple[QueryRows, Any, float]:
+        """
+        Run one sql_query statement: (rows, planner estimate or None, ms spent
+        executing). Committed on success, rolled back on error. `prepare=True`
+        prepares the statement on its first run on a connection rather than
+        after psycopg's prepare_threshold runs. A given `estimate` is checked
+        instead of running EXPLAIN, which would parse and plan the query again.
+        """
+        started = time.perf_counter()
+        try:
+            async with self.connection() as conn:
+                await guard.apply_timeout(conn)
+                if estimate is not None:
+                    estimate = guard.check(estimate)
+                elif guard.explains(sql):
+                    cur = await conn.execute(explain_sql(query), params)
+                    estimate = guard.review(sql, (await cur.fetchone())[0])
+                started = time.perf_counter()
+                if guard.downgrades(sql, estimate):
+                    # A named (server-side) cursor only ever ships max_rows + 1 rows
+                    async with conn.cursor(name=f"lector_guard_{secrets.token_hex(4)}", row_factory=dict_row) as cur:
+                        await cur.execute(query, params)
+                        rows = guard.cap(await cur.fetchmany(guard.max_rows + 1))
+                else:
+                    async with conn.cursor(row_factory=dict_row) as cur:
+                        await cur.execute(query, params, prepare=prepare if self.prepare else False)
+                        if cur.description:
+                            rows = guard.cap(await cur.fetchall())
+                        else:
+                            rows = QueryRows([{"status": "success", "message": "Query executed successfully",
+                                               "rowcount": cur.rowcount}])
+        except psycopg.errors.QueryCanceled as e:
+            raise StatementTimeout(estimate, (time.perf_counter() - started) * 1000) from e
+        except psycopg.OperationalError as e:
+            if connection_lost(e):
+                raise DatabaseUnavailable(f"{self.name}: {e}") from e
+            raise
+        return rows, estimate, (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.pool.get_stats()
+        return {
+            "name": self.name,
+            "backend": "psycopg",
+            "url": redact(self.db_url),
+            "size": stats.get("pool_size", 0),
+            "available": stats.get("pool_available", 0),
+            "min_size": stats.get("pool_min", self.pool.min_size),
+            "max_size": stats.get("pool_max", self.pool.max_size),
+            "waiting": stats.get("requests_waiting", 0),
+            "requests": stats.get("requests_num", 0),
+            "connections_opened": stats.get("connections_num", 0),
+            "connections_lost": stats.get("connections_lost", 0),
+            "prepared_statements": self.prepare,
+        }
@@ -0,0 +1,259 @@
+"""
+Slow-query profile store and index suggestions.
+
+Queries slower than `threshold_ms` (and queries killed by statement_timeout)
+are recorded in a local SQLite file, grouped by query shape: the normalized
+text with string and number literals replaced by `?`, so `WHERE id = 7` and
+`WHERE id = 8` are one entry. Each entry keeps call counts, total/max/last
+latency, the planner's estimate and the plan of its slowest run.
+
+`suggest_indexes` reads a stored plan: a Seq Scan whose Filter compares
+columns of a large table selectively gets a CREATE INDEX suggestion (equality
+columns first, then at most one range column, as a btree can use them).
+Columns already leading an existing index are skipped, and LIKE '%...%'
+filters get a pg_trgm GIN suggestion instead.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Any, Callable, Dict, List, Optional
+
+PROFILE_PATH = os.getenv(
+    "SQL_LECTOR_PROFILE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "antigravity", "sql-lector-profile.sqlite3"),
+)
+SLOW_QUERY_MS = float(os.getenv("SQL_LECTOR_SLOW_MS", "500"))
+INDEX_MIN_ROWS = int(os.getenv("SQL_LECTOR_INDEX_MIN_ROWS", "1000"))
+SAMPLE_MAX_CHARS = 4000
+ORDERINGS = {"total": "total_ms", "mean": "total_ms / calls", "max": "max_ms", "calls": "calls", "recent": "last_seen"}
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def query_shape(skeleton: str) -> str:
+    """Literal-free query text: numbers become ?, IN lists collapse to (...)."""
+    shape = re.sub(r"(?<![\w$.])\d+(?:\.\d+)?(?![\w.])", "?", skeleton)
+    return re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(...)", shape)
+
+
+class SlowQueryLog:
+    def __init__(self, path: str = PROFILE_PATH, threshold_ms: float = SLOW_QUERY_MS):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.recorded = 0
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect(self.path)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS slow_queries (
+                    shape_hash TEXT PRIMARY KEY,
+                    shape TEXT NOT NULL,
+                    sample TEXT NOT NULL,
+                    calls INTEGER NOT NULL,
+                    timeouts INTEGER NOT NULL,
+                    total_ms REAL NOT NULL,
+                    max_ms REAL NOT NULL,
+                    last_ms REAL NOT NULL,
+                    rows INTEGER,
+                    est_cost REAL,
+                    est_rows REAL,
+                    plan TEXT,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                )
+                """
+            )
+        return self._conn
+
+    def record(self, sql, elapsed_ms: float, estimate=None, rows: Optional[int] = None,
+               timed_out: bool = False) -> bool:
+        """Store one run if it was slow (or timed out); returns whether it was stored."""
+        if not timed_out and elapsed_ms < self.threshold_ms:
+            return False
+        shape = query_shape(sql.skeleton)
+        now = time.time()
+        plan = json.dumps(estimate.plan) if estimate is not None else None
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO slow_queries (shape_hash, shape, sample, calls, timeouts, total_ms, max_ms, last_ms,
+                                          rows, est_cost, est_rows, plan, first_seen, last_seen)
+                VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (shape_hash) DO UPDATE SET
+                    calls = calls + 1,
+                    timeouts = timeouts + excluded.timeouts,
+                    total_ms = total_ms + excluded.total_ms,
+                    last_ms = excluded.last_ms,
+                    rows = coalesce(excluded.rows, rows),
+                    est_cost = coalesce(excluded.est_cost, est_cost),
+                    est_rows = coalesce(excluded.est_rows, est_rows),
+                    -- keep the sample and plan of the slowest run
+                    sample = CASE WHEN excluded.max_ms >= max_ms THEN excluded.sample ELSE sample END,
+                    plan = CASE WHEN excluded.max_ms >= max_ms THEN coalesce(excluded.plan, plan) ELSE plan END,
+                    max_ms = max(max_ms, excluded.max_ms),
+                    last_seen = excluded.last_seen
+                """,
+                (
+                    hashlib.sha1(shape.encode("utf-8")).hexdigest(), shape, sql.normalized[:SAMPLE_MAX_CHARS],
+                    int(timed_out), elapsed_ms, elapsed_ms, elapsed_ms, rows,
+                    estimate.cost if estimate is not None else None,
+                    estimate.rows if estimate is not None else None,
+                    plan, now, now,
+                ),
+            )
+        self.recorded += 1
+        return True
+
+    def top(self, limit: int = 10, order: str = "total") -> List[Dict[str, Any]]:
+        if order not in ORDERINGS:
+            raise ValueError(f"order must be one of {', '.join(ORDERINGS)}")
+        cursor = self.conn.execute(
+            f"""
+            SELECT shape, sample, calls, timeouts, total_ms, max_ms, last_ms, rows, est_cost, est_rows,
+                   plan, first_seen, last_seen
+            FROM slow_queries ORDER BY {ORDERINGS[order]} DESC LIMIT ?
+            """,
+            (limit,),
+        )
+        entries = []
+        for (shape, sample, calls, timeouts, total_ms, max_ms, last_ms, rows, est_cost, est_rows,
+             plan, first_seen, last_seen) in cursor:
+            entries.append({
+                "shape": shape,
+                "sample": sample,
+                "calls": calls,
+                "timeouts": timeouts,
+                "mean_ms": round(total_ms / calls, 1),
+                "max_ms": round(max_ms, 1),
+                "last_ms": round(last_ms, 1),
+                "total_ms": round(total_ms, 1),
+                "rows": rows,
+                "estimated_cost": est_cost,
+                "estimated_rows": est_rows,
+                "plan": json.loads(plan) if plan else None,
+                "first_seen": first_seen,
+                "last_seen": last_seen,
+            })
+        return entries
+
+    def reset(self) -> int:
+        with self.conn:
+            return self.conn.execute("DELETE FROM slow_queries").rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "threshold_ms": self.threshold_ms, "recorded": self.recorded}
+
+
+# ------------------------------------------------------------------------------
+# Index suggestions
+# ------------------------------------------------------------------------------
+
+# A column (optionally alias-qualified, parenthesized or cast) compared with an operator
+_COMPARISON = re.compile(
+    r"(?P<open>\(*)(?:[a-z_][\w$]*\.)?(?P<column>[a-z_][\w$]*|\"(?:[^\"]|\"\")+\")\)?"
+    r"(?:::[a-z][\w ]*(?:\[\])?\)?)?\s(?P<op>= ANY|=|<=|>=|<|>|~~\*|~~)\s(?P<rhs>'%)?"
+)
+EQUALITY_OPS = {"=", "= ANY"}
+RANGE_OPS = {"<", ">", "<=", ">="}
+
+
+def filter_columns(expression: str) -> Dict[str, List[str]]:
+    """Columns of a plan Filter by how they are compared: equality, range, or contains (LIKE '%..')."""
+    found = {"equality": [], "range": [], "contains": [], "prefix": []}
+    for match in _COMPARISON.finditer(expression):
+        before = expression[match.start() - 1] if match.start() else " "
+        # lower(title) = ...: an index on title would not help (nor a match inside a longer name)
+        if before.isalnum() or before in "_$.":
+            continue
+        column, op = match.group("column"), match.group("op")
+        if op in EQUALITY_OPS:
+            kind = "equality"
+        elif op in RANGE_OPS:
+            kind = "range"
+        else:
+            kind = "contains" if match.group("rhs") else "prefix"
+        if column not in found[kind]:
+            found[kind].append(column)
+    return found
+
+
+def _seq_scans(plan: Any):
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get("Node Type") == "Seq Scan" and node.get("Filter"):
+                yield node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+
+def suggest_indexes(
+    plan: Any,
+    table_rows: Optional[Callable[[str], Optional[float]]] = None,
+    leading_columns: Optional[Callable[[str], List[str]]] = None,
+    min_rows: int = INDEX_MIN_ROWS,
+) -> List[Dict[str, Any]]:
+    """CREATE INDEX suggestions for the filtered sequential scans in an EXPLAIN JSON plan."""
+    suggestions = []
+    seen = set()
+    for node in _seq_scans(plan):
+        table = f"{node.get('Schema', 'public')}.{node['Relation Name']}"
+        expression = node["Filter"]
+        if " OR " in expression:
+            continue  # a single btree rarely serves an OR; leave it to a human
+        total = table_rows(table) if table_rows else None
+        if total is not None and total < min_rows:
+            continue
+        selectivity = node.get("Plan Rows", 0) / total if total else None
+        if selectivity is not None and selectivity > 0.2:
+            continue  # most of the table matches: a sequential scan is the right plan
+        columns = filter_columns(expression)
+        existing = set(leading_columns(table)) if leading_columns else set()
+
+        if columns["contains"]:
+            column = columns["contains"][0]
+            key = (table, "trgm", column)
+            if key not in seen:
+                seen.add(key)
+                suggestions.append({
+                    "table": table,
+                    "columns": [column],
+                    "reason": f"LIKE '%...%' on {column} scans the whole table",
+                    "statement": f"CREATE INDEX CONCURRENTLY ON {table} USING gin ({column} gin_trgm_ops);",
+                    "requires": "pg_trgm",
+                })
+            continue
+
+        key_columns = columns["equality"] + columns["range"][:1] + columns["prefix"][:1]
+        if not key_columns or key_columns[0] in existing:
+            continue
+        key = (table, tuple(key_columns))
+        if key in seen:
+            continue
+        seen.add(key)
+        opclass = " text_pattern_ops" if not columns["equality"] and not columns["range"] and columns["prefix"] else ""
+        suggestions.append({
+            "table": table,
+            "columns": key_columns,
+            "reason": f"Seq Scan filtering on {', '.join(key_columns)}"
+                      + (f" (~{selectivity:.1%} of {total:,.0f} rows match)" if selectivity is not None else ""),
+            "statement": f"CREATE INDEX CONCURRENTLY ON {table} ({', '.join(key_columns)}{opclass});",
+        })
+    return suggestions
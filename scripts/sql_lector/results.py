@@ -0,0 +1,392 @@
+"""
+Result cache for read-only queries, invalidated per table.
+
+Agents ask the same questions over and over (category counts, latest ads), so
+`sql_query` results are cached under the normalized SQL text plus the bound
+parameters. Normalizing only touches what is outside literals: comments go,
+whitespace collapses, and unquoted identifiers and keywords are lower-cased
+(PostgreSQL folds them anyway). String, quoted-identifier and dollar-quoted
+literals are kept byte for byte.
+
+Each entry records the tables it read. These come from the query plan
+(EXPLAIN (VERBOSE, FORMAT JSON)), so views, CTEs and subqueries resolve to
+the base tables actually scanned. Partitions also count toward their parents.
+The plan is looked up once per query text. A write through the Lector parses
+its target tables (INSERT/UPDATE/DELETE/MERGE/TRUNCATE/COPY FROM/REFRESH) and
+drops the entries that depend on them. DDL and anything unrecognized clear the
+whole cache.
+
+Writes the Lector cannot see (other clients, cron jobs, trigger side effects)
+are bounded by the TTL. Per-table generation counters keep a read that raced
+a write from being stored.
+"""
+
+import os
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+RESULT_CACHE_SIZE = int(os.getenv("SQL_LECTOR_RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL = float(os.getenv("SQL_LECTOR_RESULT_CACHE_TTL", "60"))
+RESULT_CACHE_MAX_ROWS = int(os.getenv("SQL_LECTOR_RESULT_CACHE_MAX_ROWS", "5000"))
+
+# ------------------------------------------------------------------------------
+# SQL text
+# ------------------------------------------------------------------------------
+
+_TOKENS = re.compile(
+    r"""
+      (?P<string>'(?:[^']|'')*')
+    | (?P<ident>"(?:[^"]|"")*")
+    | (?P<dollar>\$\$.*?\$\$|\$(?P<tag>[A-Za-z_]\w*)\$.*?\$(?P=tag)\$)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<space>\s+)
+    | (?P<word>[^'"$\s\-/]+|.)
+    """,
+    re.S | re.X,
+)
+
+NAME = r'(?:"(?:[^"]|"")+"|[a-z_][\w$]*)(?:\s*\.\s*(?:"(?:[^"]|"")+"|[a-z_][\w$]*))?'
+
+READ_STATEMENTS = {"select", "with", "values", "table"}
+WRITE_STATEMENTS = {"insert", "update", "delete", "merge", "truncate", "copy", "refresh"}
+# Statements that change no table data
+NEUTRAL_STATEMENTS = {"show", "set", "reset", "begin", "start", "commit", "end", "rollback", "savepoint",
+                      "release", "listen", "unlisten", "notify", "prepare", "deallocate", "discard"}
+
+_DATA_MODIFYING = re.compile(r"(?<!for )(?<!key )\b(?:insert|update|delete|merge)\b")
+_VOLATILE = re.compile(
+    r"\b(?:random|nextval|setval|currval|lastval|clock_timestamp|timeofday|pg_sleep\w*|gen_random_uuid"
+    r"|uuid_generate_\w+|txid_current\w*|pg_current_xact_id\w*|pg_(?:try_)?advisory\w*|pg_notify"
+    r"|set_config|dblink\w*)\s*\("
+    r"|\bfor\s+(?:update|share|no\s+key\s+update|key\s+share)\b|\binto\b"
+)
+# Read-only text that a hot standby still refuses (needs a transaction id or the primary's state)
+_PRIMARY_ONLY = re.compile(
+    r"\b(?:nextval|setval|txid_current|pg_current_xact_id|pg_notify|pg_(?:try_)?advisory_xact_lock\w*"
+    r"|dblink\w*|pg_switch_wal|pg_create\w*_slot)\s*\("
+    r"|\bfor\s+(?:update|share|no\s+key\s+update|key\s+share)\b|\binto\b"
+)
+_READS_RELATION = re.compile(r"\bfrom\b|^\(*\s*table\b")
+_WRITE_TARGETS = [
+    re.compile(rf"\binsert\s+into\s+({NAME})"),
+    re.compile(rf"\bupdate\s+(?:only\s+)?({NAME})"),
+    re.compile(rf"\bdelete\s+from\s+(?:only\s+)?({NAME})"),
+    re.compile(rf"\bmerge\s+into\s+(?:only\s+)?({NAME})"),
+    re.compile(rf"\bcopy\s+({NAME})(?:\s*\([^)]*\))?\s+from\b"),
+    re.compile(rf"\brefresh\s+materialized\s+view\s+(?:concurrently\s+)?({NAME})"),
+]
+_TRUNCATE = re.compile(rf"\btruncate\s+(?:table\s+)?((?:only\s+)?{NAME}(?:\s*,\s*(?:only\s+)?{NAME})*)")
+
+
+class SqlText:
+    """A statement reduced to a cache key and a literal-free skeleton for keyword checks."""
+
+    __slots__ = ("normalized", "skeleton", "verb")
+
+    def __init__(self, query: str):
+        parts: List[str] = []
+        skeleton: List[str] = []
+        exact = False
+        previous = None
+        for match in _TOKENS.finditer(query):
+            kind = match.lastgroup if match.lastgroup != "tag" else "dollar"
+            text = match.group()
+            if kind == "word" and text in ("'", '"', "$"):
+                exact = True  # unterminated literal, or $n outside a statement we understand
+                if text != "$":
+                    break
+            if kind == "string" and previous is not None and previous[0] == "word" \
+                    and previous[2] == match.start() and previous[1][-1:] in "eEbBxXuU&":
+                exact = True  # E'..' / B'..' / U&'..' literals have their own escaping rules
+            if kind in ("space", "comment"):
+                if parts and parts[-1] != " ":
+                    parts.append(" ")
+                    skeleton.append(" ")
+            elif kind == "word":
+                parts.append(text.lower())
+                skeleton.append(text.lower())
+            else:
+                parts.append(text)
+                skeleton.append("?" if kind in ("string", "dollar") else text)
+            if kind not in ("space", "comment"):
+                previous = (kind, text, match.end())
+        normalized = "".join(parts).strip().rstrip(";").strip()
+        # Anything we could not tokenize with certainty is keyed by its exact text
+        self.normalized = query.strip() if exact else normalized
+        self.skeleton = "".join(skeleton).strip().rstrip(";").strip()
+        self.verb = self.skeleton.lstrip("( ").split(" ", 1)[0].split("(", 1)[0]
+
+    @property
+    def single(self) -> bool:
+        return ";" not in self.skeleton
+
+    @property
+    def cacheable(self) -> bool:
+        return (self.single and self.verb in READ_STATEMENTS
+                and not _DATA_MODIFYING.search(self.skeleton) and not _VOLATILE.search(self.skeleton))
+
+    @property
+    def read_only(self) -> bool:
+        """Safe to run on a read replica."""
+        if not self.single or _PRIMARY_ONLY.search(self.skeleton):
+            return False
+        if self.verb == "explain":
+            return " analyze" not in self.skeleton or not _DATA_MODIFYING.search(self.skeleton)
+        return self.verb in READ_STATEMENTS | {"show"} and not _DATA_MODIFYING.search(self.skeleton)
+
+    def written_tables(self) -> Optional[Set[str]]:
+        """
+        Tables a statement may write, qualified as schema.table; an empty set
+        for statements that write nothing, None when it cannot be told (DDL,
+        DO, CALL, several statements): the caller should assume everything.
+        """
+        if not self.single:
+            return None
+        if self.verb in NEUTRAL_STATEMENTS or (self.verb == "explain" and " analyze" not in self.skeleton):
+            return set()
+        if self.verb in READ_STATEMENTS and not _DATA_MODIFYING.search(self.skeleton):
+            return set()  # writes hidden in functions are left to the TTL
+        if self.verb not in WRITE_STATEMENTS and self.verb not in READ_STATEMENTS:
+            return None
+        if self.verb == "copy" and not _WRITE_TARGETS[4].search(self.skeleton):
+            return set()  # COPY ... TO only reads
+        tables = set()
+        for pattern in _WRITE_TARGETS:
+            tables.update(qualify(name) for name in pattern.findall(self.skeleton))
+        for names in _TRUNCATE.findall(self.skeleton):
+            for name in names.split(","):
+                tables.add(qualify(re.sub(r"^\s*only\s+", "", name)))
+        return tables or None
+
+
+def _unquote(part: str) -> str:
+    part = part.strip()
+    if part.startswith('"'):
+        return part[1:-1].replace('""', '"')
+    return part
+
+
+def qualify(name: str, default_schema: str = "public") -> str:
+    """`listings` -> `public.listings`; quoted parts are unquoted."""
+    parts = [_unquote(p) for p in re.split(r'\.(?=(?:[^"]*"[^"]*")*[^"]*$)', name)]
+    if len(parts) == 1:
+        parts.insert(0, default_schema)
+    return ".".join(parts[-2:])
+
+
+def plan_relations(plan: Any) -> Set[str]:
+    """schema.table for every relation scanned anywhere in an EXPLAIN (VERBOSE, FORMAT JSON) plan."""
+    found = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "Relation Name" in node:
+                found.add(f"{node.get('Schema', 'public')}.{node['Relation Name']}")
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return found
+
+
+PARTITION_ANCESTORS_QUERY = """
+SELECT DISTINCT n.nspname || '.' || c.relname
+FROM unnest(%s::text[], %s::text[]) r(schema, name),
+     pg_partition_ancestors(format('%%I.%%I', r.schema, r.name)::regclass) a
+JOIN pg_class c ON c.oid = a.relid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+"""
+
+
+async def read_tables(conn, query: str, params=None) -> Set[str]:
+    """Tables `query` reads according to its plan, with the parents of any partitions."""
+    cur = await conn.execute(f"EXPLAIN (VERBOSE, FORMAT JSON) {query}", params)
+    tables = plan_relations((await cur.fetchone())[0])
+    if tables:
+        schemas, names = zip(*(t.split(".", 1) for t in tables))
+        cur = await conn.execute(PARTITION_ANCESTORS_QUERY, (list(schemas), list(names)))
+        tables.update(row[0] for row in await cur.fetchall())
+    return tables
+
+
+# ------------------------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------------------------
+
+class _Entry:
+    __slots__ = ("rows", "tables", "expires")
+
+    def __init__(self, rows, tables, expires):
+        self.rows = rows
+        self.tables = tables
+        self.expires = expires
+
+
+class ResultCache:
+    """LRU + TTL cache of query results with a table -> entries index."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL,
+                 max_rows: int = RESULT_CACHE_MAX_ROWS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self.by_table: Dict[str, Set[Tuple[str, str]]] = {}
+        self.generations: Dict[str, int] = {}
+        self.epoch = 0
+        # Tables read per query text (from EXPLAIN); None marks "do not cache"
+        self.dependencies: "OrderedDict[str, Optional[frozenset]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "uncacheable": 0,
+                         "stored": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    async def run(
+        self,
+        query: str,
+        params: Any,
+        execute: Callable[[], Awaitable[List[Any]]],
+        explain: Callable[[], Awaitable[Set[str]]],
+        related: Optional[Callable[[Set[str]], Set[str]]] = None,
+        use_cache: bool = True,
+    ) -> List[Any]:
+        """
+        Answer `query` from the cache or through `execute()`. `explain()`
+        returns the tables the query reads; `related(tables)` widens a write
+        to tables it may cascade into. With `use_cache` off the query always
+        runs, but a write still invalidates.
+        """
+        sql = SqlText(query)
+        if not use_cache or not sql.cacheable or not self.enabled:
+            if use_cache and sql.verb in READ_STATEMENTS:
+                self.counters["uncacheable"] += 1
+            rows = await execute()
+            written = sql.written_tables()
+            if written is None:
+                self.invalidate(None)
+            elif written:
+                self.invalidate(related(written) if related else written)
+            return rows
+
+        key = (sql.normalized, repr(params))
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            if entry.expires > now:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return list(entry.rows)
+            self._drop(key)
+            self.counters["expired"] += 1
+        if key in self._inflight:
+            self.counters["coalesced"] += 1
+            leader = self._inflight[key]
+            try:
+                return list(await asyncio.shield(leader))
+            except asyncio.CancelledError:
+                if not leader.cancelled():
+                    raise
+                return await execute()  # the call we were waiting on was cancelled, not us
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            rows = await self._miss(sql, key, execute, explain)
+            future.set_result(rows)
+            return rows
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved: there may be no waiters
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _miss(self, sql: SqlText, key, execute, explain) -> List[Any]:
+        self.counters["misses"] += 1
+        if sql.normalized in self.dependencies:
+            tables = self.dependencies[sql.normalized]
+            self.dependencies.move_to_end(sql.normalized)
+        elif not _READS_RELATION.search(sql.skeleton):
+            tables = None  # SELECT 1, VALUES (...): nothing to explain, nothing worth caching
+        else:
+            try:
+                found = await explain()
+                tables = frozenset(found) if found else None  # nothing to invalidate on: don't cache
+            except Exception:
+                tables = None
+            self.dependencies[sql.normalized] = tables
+            if len(self.dependencies) > self.max_entries * 4:
+                self.dependencies.popitem(last=False)
+
+        if tables is None:
+            self.counters["uncacheable"] += 1
+            return await execute()
+        epoch = self.epoch
+        generations = [self.generations.get(t, 0) for t in tables]
+        rows = await execute()
+        # A write to any dependency while the query ran makes the result suspect;
+        # results the cost guard truncated are not worth keeping
+        if epoch == self.epoch and generations == [self.generations.get(t, 0) for t in tables] \
+                and len(rows) <= self.max_rows and not getattr(rows, "notes", None):
+            self._store(key, rows, tables)
+        return rows
+
+    def _store(self, key, rows, tables: frozenset):
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = _Entry(rows, tables, time.monotonic() + self.ttl)
+        for table in tables:
+            self.by_table.setdefault(table, set()).add(key)
+        self.counters["stored"] += 1
+        while len(self.entries) > self.max_entries:
+            self._drop(next(iter(self.entries)))
+            self.counters["evictions"] += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry.tables:
+            keys = self.by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_table[table]
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None) -> int:
+        """Drop entries reading any of `tables` (all entries when None); returns how many."""
+        if tables is None:
+            dropped = len(self.entries)
+            self.entries.clear()
+            self.by_table.clear()
+            self.dependencies.clear()  # DDL may have changed what a query reads
+            self.epoch += 1
+        else:
+            dropped = 0
+            for table in tables:
+                self.generations[table] = self.generations.get(table, 0) + 1
+                for key in list(self.by_table.get(table, ())):
+                    self._drop(key)
+                    dropped += 1
+        self.counters["invalidations"] += dropped
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "tables_tracked": len(self.by_table),
+            "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else None,
+            **self.counters,
+        }
@@ -0,0 +1,282 @@
+"""
+Routing across several databases: primaries, read replicas and named targets.
+
+A cluster is one primary plus any number of read replicas. Every target has
+its own pools. Within a cluster, reads that are safe on a hot standby
+(`SqlText.read_only`) go to a replica. Everything else goes to the primary.
+
+Replica choice is lag-aware. A monitor asks every replica how far its replay
+is behind (`pg_last_xact_replay_timestamp`, or 0 when replay has caught up
+with what it received) every `check_interval` seconds. Only replicas that
+answered and are within their `max_lag` take reads. The least busy of those
+wins. A replica that fails a check, or drops a connection mid-call, is out
+until the next good check, and that read is retried on the primary.
+
+After a write, the cluster's reads stay on the primary for
+`read_after_write` seconds, so a caller sees its own write.
+
+Clusters come from `--db-url` / `--replica` (the "default" cluster), or from
+a sources file in the universal-db-config.json format:
+
+    {"sources": [
+        {"id": "prod", "connectionString": "${DATABASE_URL}", "maxConnections": 10, "default": true},
+        {"id": "prod_replica", "connectionString": "${REPLICA_URL}", "replicaOf": "prod", "maxLagSeconds": 5},
+        {"id": "old_db", "connectionString": "postgresql://..."}
+    ]}
+
+A tool call picks a cluster, or pins one replica, with `database`.
+"""
+
+import os
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from sql_lector.mcp import ToolError, log
+from sql_lector.pool import Database, POOL_MIN_SIZE, POOL_MAX_SIZE
+
+REPLICA_MAX_LAG = float(os.getenv("SQL_LECTOR_REPLICA_MAX_LAG", "10"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("SQL_LECTOR_REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_CHECK_TIMEOUT = float(os.getenv("SQL_LECTOR_REPLICA_CHECK_TIMEOUT", "2"))
+READ_AFTER_WRITE = float(os.getenv("SQL_LECTOR_READ_AFTER_WRITE", "2"))
+DEFAULT_CLUSTER = "default"
+# With the asyncpg backend, 1/N of a target's connections stay with the psycopg pool
+ASYNCPG_PSYCOPG_SHARE = 4
+
+LAG_QUERY = """
+SELECT pg_is_in_recovery(),
+       CASE WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+       END::float8
+"""
+
+
+class Target:
+    """One database server: its pools, role, and (for replicas) measured lag."""
+
+    def __init__(self, name: str, db_url: str, role: str = "primary", min_size: int = POOL_MIN_SIZE,
+                 max_size: int = POOL_MAX_SIZE, backend: str = "psycopg", statement_timeout_ms: int = 0,
+                 max_lag: float = REPLICA_MAX_LAG):
+        self.name = name
+        self.role = role
+        self.max_lag = max_lag
+        # psycopg always: streams, bulk COPY, catalog reads; sql_query runs on `backend`
+        if backend == "asyncpg" and max_size < 2:
+            log(f"{name}: {max_size} connection(s) leave no room for an asyncpg pool next to psycopg; "
+                "sql_query runs on psycopg")
+            backend = "psycopg"
+        if backend == "asyncpg":
+            from sql_lector.apg import AsyncpgDatabase
+            # The two pools share the source's limit; sql_query gets the larger part
+            side = max(1, max_size // ASYNCPG_PSYCOPG_SHARE)
+            self.db = Database(db_url, name=name, min_size=min(min_size, side), max_size=side)
+            self.backend = AsyncpgDatabase(db_url, name=name, min_size=min(min_size, max_size - side),
+                                           max_size=max_size - side, statement_timeout_ms=statement_timeout_ms)
+        else:
+            self.db = Database(db_url, name=name, min_size=min_size, max_size=max_size)
+            self.backend = self.db
+        self.healthy = role == "primary"
+        self.lag: Optional[float] = None if role == "replica" else 0.0
+        self.in_recovery: Optional[bool] = None
+        self.checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.active = 0
+        self.queries = 0
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and self.lag is not None and self.lag <= self.max_lag
+
+    async def open(self, wait: bool = True):
+        await self.db.open(wait=wait)
+        if self.backend is not self.db:
+            await self.backend.open(wait=wait)
+
+    async def close(self):
+        if self.backend is not self.db:
+            await self.backend.close()
+        await self.db.close()
+
+    async def check(self, timeout: float = REPLICA_CHECK_TIMEOUT):
+        try:
+            async def measure():
+                async with self.db.connection() as conn:
+                    cur = await conn.execute(LAG_QUERY)
+                    return await cur.fetchone()
+            self.in_recovery, self.lag = await asyncio.wait_for(measure(), timeout)
+            if not self.healthy:
+                log(f"Replica {self.name} is back (lag {self.lag:.1f}s)")
+            self.healthy = True
+            self.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.mark_down(e)
+        self.checked_at = time.time()
+
+    def mark_down(self, error: Exception):
+        if self.healthy:
+            log(f"Replica {self.name} taken out of rotation: {error}")
+        self.healthy = False
+        self.last_error = str(error) or type(error).__name__
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"role": self.role, "healthy": self.healthy, "active": self.active, "queries": self.queries,
+                 "pool": self.db.stats()}
+        if self.backend is not self.db:
+            stats["query_pool"] = self.backend.stats()
+        if self.role == "replica":
+            stats.update({"lag_seconds": None if self.lag is None else round(self.lag, 3), "max_lag": self.max_lag,
+                          "in_recovery": self.in_recovery, "checked_at": self.checked_at,
+                          "last_error": self.last_error})
+        return stats
+
+
+class Cluster:
+    """A primary and its read replicas."""
+
+    def __init__(self, name: str, primary: Target, replicas: Optional[List[Target]] = None,
+                 read_after_write: float = READ_AFTER_WRITE):
+        self.name = name
+        self.primary = primary
+        self.replicas = replicas or []
+        self.read_after_write = read_after_write
+        self.last_write = 0.0
+        self.counters = {"primary_reads": 0, "replica_reads": 0, "writes": 0, "fallbacks": 0}
+
+    @property
+    def targets(self) -> List[Target]:
+        return [self.primary] + self.replicas
+
+    def route(self, sql) -> Target:
+        """Where `sql` runs: an available replica for a read, else the primary."""
+        if not sql.read_only:
+            self.counters["writes"] += 1
+            return self.primary
+        if self.replicas and time.monotonic() - self.last_write >= self.read_after_write:
+            candidates = [r for r in self.replicas if r.available]
+            if candidates:
+                self.counters["replica_reads"] += 1
+                return min(candidates, key=lambda r: (r.active, r.lag))
+        self.counters["primary_reads"] += 1
+        return self.primary
+
+    def note_write(self):
+        self.last_write = time.monotonic()
+
+    def fallback(self, replica: Target, error: Exception) -> Target:
+        """A replica failed a call: take it out and send the read to the primary."""
+        replica.mark_down(error)
+        self.counters["fallbacks"] += 1
+        return self.primary
+
+    async def check(self):
+        await asyncio.gather(*(r.check() for r in self.replicas))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"targets": {t.name: t.stats() for t in self.targets}, **self.counters}
+
+
+class Router:
+    """Named clusters, the replica monitor, and `database` argument resolution."""
+
+    def __init__(self, clusters: List[Cluster], default: Optional[str] = None,
+                 check_interval: float = REPLICA_CHECK_INTERVAL):
+        self.clusters = {c.name: c for c in clusters}
+        self.default = default or clusters[0].name
+        self.check_interval = check_interval
+        self._monitor: Optional[asyncio.Task] = None
+
+    def resolve(self, database: Optional[str] = None) -> Tuple[Cluster, Optional[Target]]:
+        """(cluster, pinned target): a cluster name routes, a replica name pins that replica."""
+        if not database:
+            return self.clusters[self.default], None
+        if database in self.clusters:
+            return self.clusters[database], None
+        for cluster in self.clusters.values():
+            for replica in cluster.replicas:
+                if replica.name == database:
+                    return cluster, replica
+        raise ToolError(f"Unknown database '{database}'; configured: {', '.join(self.names())}")
+
+    def names(self) -> List[str]:
+        return [t.name for c in self.clusters.values() for t in c.targets]
+
+    @property
+    def targets(self) -> List[Target]:
+        return [t for c in self.clusters.values() for t in c.targets]
+
+    async def open(self, wait: bool = True):
+        await asyncio.gather(*(t.open(wait=wait) for t in self.targets))
+        if wait:
+            await self.check()
+
+    async def close(self):
+        await self.stop()
+        for target in self.targets:
+            await target.close()
+
+    async def check(self):
+        await asyncio.gather(*(c.check() for c in self.clusters.values()))
+
+    def start(self):
+        if self._monitor is None and any(c.replicas for c in self.clusters.values()):
+            self._monitor = asyncio.create_task(self._monitor_loop())
+
+    async def stop(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+
+    async def _monitor_loop(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"default": self.default, "clusters": {name: c.stats() for name, c in self.clusters.items()}}
+
+
+# ------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------
+
+def load_sources(path: str) -> List[Dict[str, Any]]:
+    """The `sources` of a universal-db-config.json style file; ${VAR} in URLs comes from the environment."""
+    with open(path, encoding="utf-8") as f:
+        sources = json.load(f).get("sources") or []
+    for source in sources:
+        if "id" not in source or "connectionString" not in source:
+            raise ValueError(f"{path}: every source needs an id and a connectionString")
+        source["connectionString"] = os.path.expandvars(source["connectionString"])
+    return sources
+
+
+def build_clusters(sources: List[Dict[str, Any]], min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE,
+                   backend: str = "psycopg", statement_timeout_ms: int = 0) -> Tuple[List[Cluster], str]:
+    """Clusters from source dicts (replicas name their primary in `replicaOf`); returns (clusters, default)."""
+    def target(source, role):
+        return Target(source["id"], source["connectionString"], role=role, min_size=min_size,
+                      max_size=int(source.get("maxConnections", max_size)), backend=backend,
+                      statement_timeout_ms=statement_timeout_ms,
+                      max_lag=float(source.get("maxLagSeconds", REPLICA_MAX_LAG)))
+
+    clusters: Dict[str, Cluster] = {}
+    for source in sources:
+        if not source.get("replicaOf"):
+            clusters[source["id"]] = Cluster(source["id"], target(source, "primary"))
+    for source in sources:
+        if source.get("replicaOf"):
+            if source["replicaOf"] not in clusters:
+                raise ValueError(f"Replica {source['id']} names an unknown primary {source['replicaOf']}")
+            clusters[source["replicaOf"]].replicas.append(target(source, "replica"))
+    if not clusters:
+        raise ValueError("No primary database configured")
+    default = next((s["id"] for s in sources if s.get("default") and s["id"] in clusters), next(iter(clusters)))
+    return list(clusters.values()), default
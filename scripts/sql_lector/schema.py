@@ -0,0 +1,417 @@
+"""
+Schema catalog cache for inspect_schema.
+
+information_schema.columns is a stack of views with per-row privilege checks
+and is slow on Supabase, where dozens of schemas (auth, storage, realtime,
+extensions, ...) sit next to public. The catalog is built from pg_catalog
+instead: tables with row estimates and sizes, columns, indexes and foreign
+keys, in a few catalog queries on one connection.
+
+The catalog is kept in memory and persisted to a JSON file, so a cold start
+answers from disk. Before it is served, the cache makes sure the catalog still
+describes the database:
+
+- DDL fingerprint: an md5 over the relations, columns, defaults and
+  constraints of the cached schemas. It is one cheap query, run at most every
+  `check_interval` seconds. A different fingerprint reloads the catalog.
+- Event trigger (optional, supabase/migrations/022_lector_schema_events.sql):
+  DDL sends NOTIFY on `lector_schema_changed`. While a listener is connected
+  and the trigger is installed, a notification marks the catalog dirty and the
+  periodic fingerprint checks are skipped.
+
+Row estimates and sizes (pg_class.reltuples, ANALYZE-driven) are not part of
+the fingerprint; they are refreshed every `stats_ttl` seconds.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional
+
+import psycopg
+from psycopg.rows import dict_row
+
+from sql_lector.mcp import log
+from sql_lector.pool import redact, uses_transaction_pooler
+
+SCHEMA_CACHE_DIR = os.getenv(
+    "SQL_LECTOR_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "antigravity"),
+)
+SCHEMAS = [s.strip() for s in os.getenv("SQL_LECTOR_SCHEMAS", "public").split(",") if s.strip()]
+SCHEMA_CHECK_INTERVAL = float(os.getenv("SQL_LECTOR_SCHEMA_CHECK_INTERVAL", "30"))
+SCHEMA_STATS_TTL = float(os.getenv("SQL_LECTOR_SCHEMA_STATS_TTL", "300"))
+SCHEMA_LISTEN = os.getenv("SQL_LECTOR_SCHEMA_LISTEN", "1") != "0"
+SCHEMA_CHANNEL = "lector_schema_changed"
+
+CACHE_FORMAT = 1
+RELKINDS = {"r": "table", "p": "partitioned table", "v": "view", "m": "materialized view", "f": "foreign table"}
+
+# ------------------------------------------------------------------------------
+# Catalog queries
+# ------------------------------------------------------------------------------
+
+_RELATIONS = """
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = ANY(%(schemas)s) AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+"""
+
+FINGERPRINT_QUERY = f"""
+SELECT md5(coalesce(string_agg(item, ',' ORDER BY item), '')) AS fingerprint
+FROM (
+    SELECT c.oid || ':' || c.relname || ':' || c.relkind::text AS item
+    {_RELATIONS}
+    UNION ALL
+    SELECT a.attrelid || '.' || a.attnum || ':' || a.attname || ':' || a.atttypid || ':' || a.atttypmod
+           || ':' || a.attnotnull || ':' || a.attisdropped || ':' || coalesce(d.oid, 0)
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE n.nspname = ANY(%(schemas)s) AND c.relkind IN ('r', 'p', 'v', 'm', 'f') AND a.attnum > 0
+    UNION ALL
+    SELECT i.indexrelid || ':' || i.indrelid || ':' || i.indisvalid
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = ANY(%(schemas)s)
+    UNION ALL
+    SELECT co.oid || ':' || co.conname || ':' || co.contype::text
+    FROM pg_constraint co
+    JOIN pg_namespace n ON n.oid = co.connamespace
+    WHERE n.nspname = ANY(%(schemas)s)
+) catalog
+"""
+
+TABLES_QUERY = f"""
+SELECT c.oid, n.nspname AS schema, c.relname AS name, c.relkind AS kind,
+       obj_description(c.oid, 'pg_class') AS comment
+{_RELATIONS}
+ORDER BY n.nspname, c.relname
+"""
+
+STATS_QUERY = f"""
+SELECT c.oid, c.reltuples::bigint AS row_estimate, pg_total_relation_size(c.oid) AS total_bytes
+{_RELATIONS}
+"""
+
+COLUMNS_QUERY = """
+SELECT a.attrelid AS oid, a.attname AS name, format_type(a.atttypid, a.atttypmod) AS type,
+       a.attnotnull AS not_null, pg_get_expr(d.adbin, d.adrelid) AS default
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+WHERE n.nspname = ANY(%(schemas)s) AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND a.attnum > 0 AND NOT a.attisdropped
+ORDER BY a.attrelid, a.attnum
+"""
+
+INDEXES_QUERY = """
+SELECT i.indrelid AS oid, ic.relname AS name, am.amname AS method,
+       i.indisprimary AS primary, i.indisunique AS unique, i.indisvalid AS valid,
+       ARRAY(SELECT pg_get_indexdef(i.indexrelid, k, true)
+             FROM generate_series(1, i.indnkeyatts) k ORDER BY k) AS columns,
+       pg_get_expr(i.indpred, i.indrelid) AS predicate,
+       pg_get_indexdef(i.indexrelid) AS definition
+FROM pg_index i
+JOIN pg_class ic ON ic.oid = i.indexrelid
+JOIN pg_am am ON am.oid = ic.relam
+JOIN pg_class c ON c.oid = i.indrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = ANY(%(schemas)s)
+ORDER BY i.indrelid, i.indisprimary DESC, ic.relname
+"""
+
+FOREIGN_KEYS_QUERY = """
+SELECT co.conrelid AS oid, co.conname AS name,
+       ARRAY(SELECT a.attname FROM unnest(co.conkey) WITH ORDINALITY k(attnum, ord)
+             JOIN pg_attribute a ON a.attrelid = co.conrelid AND a.attnum = k.attnum
+             ORDER BY k.ord) AS columns,
+       fn.nspname || '.' || fc.relname AS ref_table,
+       ARRAY(SELECT a.attname FROM unnest(co.confkey) WITH ORDINALITY k(attnum, ord)
+             JOIN pg_attribute a ON a.attrelid = co.confrelid AND a.attnum = k.attnum
+             ORDER BY k.ord) AS ref_columns,
+       pg_get_constraintdef(co.oid) AS definition
+FROM pg_constraint co
+JOIN pg_class c ON c.oid = co.conrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_class fc ON fc.oid = co.confrelid
+JOIN pg_namespace fn ON fn.oid = fc.relnamespace
+WHERE co.contype = 'f' AND n.nspname = ANY(%(schemas)s)
+ORDER BY co.conrelid, co.conname
+"""
+
+EVENT_TRIGGER_QUERY = "SELECT 1 FROM pg_event_trigger WHERE evtname = %s AND evtenabled <> 'D'"
+
+
+def cache_path(db_url: str, directory: str = SCHEMA_CACHE_DIR) -> str:
+    """One cache file per database, named by a hash of its (password-less) URL."""
+    digest = hashlib.sha1(redact(db_url).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(directory, f"sql-lector-schema-{digest}.json")
+
+
+def _row_estimate(reltuples: int) -> Optional[int]:
+    # reltuples is -1 for a table that was never vacuumed or analyzed
+    return reltuples if reltuples is not None and reltuples >= 0 else None
+
+
+async def fetch_catalog(conn, schemas: List[str]) -> Dict[str, Any]:
+    """Build the catalog from pg_catalog on one connection (one snapshot)."""
+    params = {"schemas": schemas}
+    async with conn.cursor(row_factory=dict_row) as cur:
+        await cur.execute(FINGERPRINT_QUERY, params)
+        fingerprint = (await cur.fetchone())["fingerprint"]
+
+        await cur.execute(TABLES_QUERY, params)
+        by_oid = {}
+        for row in await cur.fetchall():
+            by_oid[row["oid"]] = {
+                "schema": row["schema"],
+                "name": row["name"],
+                "kind": RELKINDS[row["kind"]],
+                "comment": row["comment"],
+                "row_estimate": None,
+                "total_bytes": None,
+                "columns": [],
+                "primary_key": [],
+                "indexes": [],
+                "foreign_keys": [],
+            }
+
+        await cur.execute(COLUMNS_QUERY, params)
+        for row in await cur.fetchall():
+            table = by_oid.get(row.pop("oid"))
+            if table is not None:
+                table["columns"].append(row)
+
+        await cur.execute(INDEXES_QUERY, params)
+        for row in await cur.fetchall():
+            table = by_oid.get(row.pop("oid"))
+            if table is None:
+                continue
+            if row["primary"]:
+                table["primary_key"] = row["columns"]
+            table["indexes"].append(row)
+
+        await cur.execute(FOREIGN_KEYS_QUERY, params)
+        for row in await cur.fetchall():
+            table = by_oid.get(row.pop("oid"))
+            if table is not None:
+                table["foreign_keys"].append(row)
+
+        await cur.execute(STATS_QUERY, params)
+        for row in await cur.fetchall():
+            table = by_oid.get(row["oid"])
+            if table is not None:
+                table["row_estimate"] = _row_estimate(row["row_estimate"])
+                table["total_bytes"] = row["total_bytes"]
+
+    now = time.time()
+    return {
+        "format": CACHE_FORMAT,
+        "schemas": schemas,
+        "fingerprint": fingerprint,
+        "loaded_at": now,
+        "stats_at": now,
+        "tables": {f"{t['schema']}.{t['name']}": t for t in by_oid.values()},
+    }
+
+
+def column_list(catalog: Dict[str, Any], table: Optional[str] = None) -> List[Dict[str, Any]]:
+    """The flat (table_name, column_name, data_type) rows inspect_schema has always returned."""
+    rows = []
+    for key, entry in sorted(catalog["tables"].items()):
+        if table and table not in (key, entry["name"]):
+            continue
+        for column in entry["columns"]:
+            rows.append({"table_name": entry["name"], "column_name": column["name"], "data_type": column["type"]})
+    return rows
+
+
+class SchemaCache:
+    """The catalog of one database, validated by fingerprint and persisted to disk."""
+
+    def __init__(self, db, path: Optional[str] = None, schemas: Optional[List[str]] = None,
+                 check_interval: float = SCHEMA_CHECK_INTERVAL, stats_ttl: float = SCHEMA_STATS_TTL,
+                 listen: bool = SCHEMA_LISTEN):
+        self.db = db
+        self.path = path if path is not None else cache_path(db.db_url)
+        self.schemas = schemas or SCHEMAS
+        self.check_interval = check_interval
+        self.stats_ttl = stats_ttl
+        self.listen = listen and not uses_transaction_pooler(db.db_url)
+        self.catalog: Optional[Dict[str, Any]] = None
+        self.source = None
+        self.checked_at = 0.0
+        self.verified = False
+        self.dirty = False
+        self.listening = False
+        self.counters = {"reloads": 0, "checks": 0, "changes": 0, "notifications": 0}
+        self._lock = asyncio.Lock()
+        self._listener: Optional[asyncio.Task] = None
+        self._load_file()
+
+    # --------------------------------------------------------------------------
+    # Persistence
+    # --------------------------------------------------------------------------
+
+    def _load_file(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            return
+        if catalog.get("format") == CACHE_FORMAT and catalog.get("schemas") == self.schemas:
+            self.catalog = catalog
+            self.source = "file"
+
+    def _save_file(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.catalog, f, default=str)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log(f"Schema cache not saved to {self.path}: {e}")
+
+    # --------------------------------------------------------------------------
+    # Validation
+    # --------------------------------------------------------------------------
+
+    async def get(self, refresh: bool = False) -> Dict[str, Any]:
+        """The current catalog; reloaded if forced, missing, or the schema changed."""
+        async with self._lock:
+            now = time.monotonic()
+            if refresh or self.catalog is None or self.dirty:
+                await self._reload()
+            elif not self.verified or (not self.listening and now - self.checked_at >= self.check_interval):
+                await self._check()
+            elif time.time() - self.catalog["stats_at"] >= self.stats_ttl:
+                await self._refresh_stats()
+            return self.catalog
+
+    def invalidate(self):
+        """Mark the catalog stale; the next get() reloads it."""
+        self.dirty = True
+
+    async def _reload(self):
+        async with self.db.connection() as conn:
+            self.catalog = await fetch_catalog(conn, self.schemas)
+        self.source = "database"
+        self.dirty = False
+        self.verified = True
+        self.checked_at = time.monotonic()
+        self.counters["reloads"] += 1
+        self._save_file()
+
+    async def _check(self):
+        async with self.db.connection() as conn:
+            cur = await conn.execute(FINGERPRINT_QUERY, {"schemas": self.schemas})
+            fingerprint = (await cur.fetchone())[0]
+        self.counters["checks"] += 1
+        if fingerprint != self.catalog["fingerprint"]:
+            self.counters["changes"] += 1
+            await self._reload()
+            return
+        self.verified = True
+        self.checked_at = time.monotonic()
+        if time.time() - self.catalog["stats_at"] >= self.stats_ttl:
+            await self._refresh_stats()
+
+    async def _refresh_stats(self):
+        async with self.db.connection() as conn:
+            cur = await conn.execute(STATS_QUERY, {"schemas": self.schemas})
+            stats = {oid: (estimate, size) for oid, estimate, size in await cur.fetchall()}
+            cur = await conn.execute(TABLES_QUERY, {"schemas": self.schemas})
+            names = {oid: f"{schema}.{name}" for oid, schema, name, _, _ in await cur.fetchall()}
+        for oid, (estimate, size) in stats.items():
+            table = self.catalog["tables"].get(names.get(oid))
+            if table is not None:
+                table["row_estimate"] = _row_estimate(estimate)
+                table["total_bytes"] = size
+        self.catalog["stats_at"] = time.time()
+        self._save_file()
+
+    def referencing(self, tables) -> set:
+        """
+        `tables` plus every cached table a write to them can cascade into
+        (foreign keys with ON DELETE/UPDATE CASCADE, SET NULL or SET DEFAULT).
+        """
+        found = set(tables)
+        if self.catalog is None:
+            return found
+        edges = [(fk["ref_table"], key) for key, table in self.catalog["tables"].items()
+                 for fk in table["foreign_keys"]
+                 if re.search(r"ON (?:DELETE|UPDATE) (?:CASCADE|SET NULL|SET DEFAULT)", fk["definition"])]
+        changed = True
+        while changed:
+            changed = False
+            for parent, child in edges:
+                if parent in found and child not in found:
+                    found.add(child)
+                    changed = True
+        return found
+
+    # --------------------------------------------------------------------------
+    # Event trigger notifications
+    # --------------------------------------------------------------------------
+
+    def start(self):
+        if self.listen and self._listener is None:
+            self._listener = asyncio.create_task(self._listen_loop())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self.listening = False
+
+    async def _listen_loop(self):
+        delay = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.db.db_url, autocommit=True) as conn:
+                    cur = await conn.execute(EVENT_TRIGGER_QUERY, (SCHEMA_CHANNEL,))
+                    if await cur.fetchone() is None:
+                        log(f"Event trigger {SCHEMA_CHANNEL} not installed; using fingerprint checks")
+                        return
+                    await conn.execute(f"LISTEN {SCHEMA_CHANNEL}")
+                    # Anything may have changed while no listener was connected
+                    self.verified = False
+                    self.listening = True
+                    delay = 1.0
+                    async for _ in conn.notifies():
+                        self.counters["notifications"] += 1
+                        self.dirty = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log(f"Schema listener disconnected: {e}")
+            self.listening = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    def stats(self) -> Dict[str, Any]:
+        catalog = self.catalog or {}
+        return {
+            "tables": len(catalog.get("tables", {})),
+            "schemas": self.schemas,
+            "fingerprint": catalog.get("fingerprint"),
+            "source": self.source,
+            "age_seconds": round(time.time() - catalog["loaded_at"]) if catalog else None,
+            "listening": self.listening,
+            "path": self.path,
+            **self.counters,
+        }
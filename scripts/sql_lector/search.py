@@ -0,0 +1,192 @@
+"""
+Ranked listing search for the search_listings tool.
+
+`ILIKE '%term%'` cannot use a B-tree index, so every search reads the whole
+anunturi table. Migration 023_listing_search.sql adds a stored `search_vector`
+(title, description and location under a Romanian configuration that strips
+diacritics) with a GIN index, plus a trigram index on the unaccented title.
+This module queries them:
+
+- full text: `websearch_to_tsquery` against `search_vector`, ranked with
+  `ts_rank`, so the GIN index finds the matches and only those are ranked;
+- fuzzy: when full text finds nothing on the first page, and pg_trgm and
+  `f_unaccent` are installed, trigram `word_similarity` on the title catches
+  typos and partial words.
+
+Pages are keyset-paginated. `next_cursor` carries the last row's sort key and
+id, and the next page asks for rows strictly after them. A deep page costs
+about the same as the first, where OFFSET would fetch and throw away every
+earlier row. A rank cannot be indexed, so ordered by relevance only the
+newest `rank_window` matches are ranked (off the (status, created_at) index;
+0 ranks them all). Without the window, a word in a fifth of all listings
+would rank a fifth of the table on every page. Ordered by newest, matches come
+in index order and the scan stops once the page is full. A cursor only
+continues the search that produced it.
+
+Queries run through the Lector's sql_query path (routing, guard, cache).
+"""
+
+import os
+import re
+import json
+import base64
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sql_lector.mcp import ToolError
+from sql_lector.results import NAME, qualify
+
+SEARCH_TABLE = os.getenv("SQL_LECTOR_SEARCH_TABLE", "public.anunturi")
+SEARCH_CONFIG = os.getenv("SQL_LECTOR_SEARCH_CONFIG", "public.romanian_unaccent")
+SEARCH_PAGE_SIZE = int(os.getenv("SQL_LECTOR_SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_RANK_WINDOW = int(os.getenv("SQL_LECTOR_SEARCH_RANK_WINDOW", "10000"))
+FUZZY_MIN_LENGTH = 3
+
+ORDERS = ("relevance", "newest")
+COLUMNS = "id, title, price, location, category_id, created_at"
+
+FUZZY_PROBE = """
+SELECT to_regprocedure('public.f_unaccent(text)') IS NOT NULL
+       AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS fuzzy
+"""
+
+
+class ListingSearch:
+    """search_listings: full text with a trigram fallback, keyset-paginated."""
+
+    def __init__(self, execute: Callable[..., Awaitable[List[Dict[str, Any]]]], table: str = SEARCH_TABLE,
+                 config: str = SEARCH_CONFIG, rank_window: int = SEARCH_RANK_WINDOW):
+        # execute(query, params, cache=..., database=...) is the Lector's execute_query
+        self.execute = execute
+        if not re.fullmatch(NAME, table.lower()):
+            raise ValueError(f"SQL_LECTOR_SEARCH_TABLE is not a table name: {table}")
+        if not re.fullmatch(NAME, config.lower()):
+            raise ValueError(f"SQL_LECTOR_SEARCH_CONFIG is not a configuration name: {config}")
+        self.table = table
+        self.config = config
+        self.rank_window = rank_window
+        self.fuzzy: Dict[Optional[str], bool] = {}  # per database, probed on first use
+        self.counters = {"searches": 0, "fulltext": 0, "fuzzy": 0, "pages": 0}
+
+    async def search(self, query: str, category_id: Optional[int] = None, location: Optional[str] = None,
+                     min_price: Optional[float] = None, max_price: Optional[float] = None,
+                     order: str = "relevance", limit: int = SEARCH_PAGE_SIZE, cursor: Optional[str] = None,
+                     cache: bool = True, database: Optional[str] = None) -> Dict[str, Any]:
+        query = query.strip()
+        if not query:
+            raise ToolError("query must not be empty")
+        if order not in ORDERS:
+            raise ToolError(f"order must be one of {', '.join(ORDERS)}")
+        limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+        filters = {"category_id": category_id, "location": location, "min_price": min_price, "max_price": max_price}
+        fingerprint = self._fingerprint(query, filters, order, database)
+
+        if cursor is not None:
+            # A later page stays in the mode (full text or fuzzy) of the first
+            mode, after = self._decode(cursor, fingerprint)
+            rows = await self._page(mode, query, filters, order, limit, after, cache, database)
+            self.counters["pages"] += 1
+        else:
+            mode = "fulltext"
+            rows = await self._page(mode, query, filters, order, limit, None, cache, database)
+            if not rows and len(query) >= FUZZY_MIN_LENGTH and await self._has_fuzzy(database):
+                mode = "fuzzy"
+                rows = await self._page(mode, query, filters, order, limit, None, cache, database)
+            self.counters["searches"] += 1
+            self.counters[mode] += 1
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        results = []
+        for row in rows:
+            row = dict(row)
+            row.pop("sort_key", None)
+            results.append(row)
+        return {
+            "query": query,
+            "mode": mode,
+            "order": order,
+            "results": results,
+            "next_cursor": self._encode(mode, rows[-1], fingerprint) if more else None,
+        }
+
+    async def _page(self, mode, query, filters, order, limit, after, cache, database) -> List[Dict[str, Any]]:
+        sql, params = self.build_sql(mode, query, filters, order, limit, after)
+        return await self.execute(sql, params, cache=cache, database=database)
+
+    def build_sql(self, mode: str, query: str, filters: Dict[str, Any], order: str, limit: int,
+                  after: Optional[List[Any]] = None):
+        """(query text, params) for one page; psycopg placeholders, so either backend runs it."""
+        params: Dict[str, Any] = {"q": query, "limit": limit + 1}
+        if mode == "fuzzy":
+            title = "public.f_unaccent(lower(title))"
+            match = f"public.f_unaccent(lower(%(q)s::text)) <%% {title}"
+            rank = f"word_similarity(public.f_unaccent(lower(%(q)s::text)), {title})::float8"
+        else:
+            # Inline and immutable: a custom plan folds it to a constant the planner can estimate
+            ts_query = f"websearch_to_tsquery('{self.config}'::regconfig, %(q)s::text)"
+            match = f"search_vector @@ {ts_query}"
+            rank = f"ts_rank(search_vector, {ts_query})::float8"
+
+        where = [match, "status = 'active'"]
+        if filters.get("category_id") is not None:
+            where.append("category_id = %(category_id)s::integer")
+            params["category_id"] = filters["category_id"]
+        if filters.get("location"):
+            where.append("location ILIKE (%(location)s::text || '%%')")
+            params["location"] = filters["location"].replace("%", r"\%").replace("_", r"\_")
+        if filters.get("min_price") is not None:
+            where.append("price >= %(min_price)s::numeric")
+            params["min_price"] = filters["min_price"]
+        if filters.get("max_price") is not None:
+            where.append("price <= %(max_price)s::numeric")
+            params["max_price"] = filters["max_price"]
+        if after is not None:
+            params["after_key"], params["after_id"] = after
+        if order == "relevance":
+            # Rank only the newest rank_window matches: they come off the created_at index, so a common
+            # word costs a bounded scan instead of ranking every listing that contains it
+            window = f"ORDER BY created_at DESC LIMIT {int(self.rank_window)}" if self.rank_window > 0 else ""
+            seek = "WHERE (sort_key, id) < (%(after_key)s::float8, %(after_id)s::bigint) " if after is not None else ""
+            return (f"SELECT * FROM (SELECT {COLUMNS}, {rank} AS rank, {rank} AS sort_key "
+                    f"FROM {self.table} WHERE {' AND '.join(where)} {window}) candidates "
+                    f"{seek}ORDER BY sort_key DESC, id DESC LIMIT %(limit)s::integer"), params
+
+        # Plain created_at, so the (status, created_at DESC) index can return matches in order;
+        # DESC puts NULLs first, as that index does
+        if after is not None and after[0] is None:
+            where.append("(created_at IS NOT NULL OR id < %(after_id)s::bigint)")
+        elif after is not None:
+            where.append("(created_at < %(after_key)s::text::timestamptz OR "
+                         "(created_at = %(after_key)s::text::timestamptz AND id < %(after_id)s::bigint))")
+        return (f"SELECT {COLUMNS}, {rank} AS rank, created_at AS sort_key "
+                f"FROM {self.table} WHERE {' AND '.join(where)} "
+                f"ORDER BY created_at DESC, id DESC LIMIT %(limit)s::integer"), params
+
+    async def _has_fuzzy(self, database: Optional[str]) -> bool:
+        if database not in self.fuzzy:
+            rows = await self.execute(FUZZY_PROBE, None, cache=False, database=database)
+            self.fuzzy[database] = bool(rows and rows[0]["fuzzy"])
+        return self.fuzzy[database]
+
+    def _fingerprint(self, query, filters, order, database) -> str:
+        text = json.dumps([query, filters, order, database, qualify(self.table.lower())], sort_keys=True, default=str)
+        return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+    def _encode(self, mode: str, row: Dict[str, Any], fingerprint: str) -> str:
+        # created_at travels as text and is cast back to timestamptz
+        payload = json.dumps([mode, row["sort_key"], row["id"], fingerprint], default=str).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+    def _decode(self, cursor: str, fingerprint: str):
+        try:
+            mode, key, row_id, seen = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        except Exception:
+            raise ToolError("Invalid search cursor") from None
+        if seen != fingerprint or mode not in ("fulltext", "fuzzy"):
+            raise ToolError("This cursor belongs to a different search; repeat the same query, filters and order")
+        return mode, [key, int(row_id)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"table": self.table, "config": self.config, "rank_window": self.rank_window, **self.counters}
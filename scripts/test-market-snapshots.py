@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Checks the market research snapshot store on the files in data/ and on
+synthetic runs, and times appends and last-30-run queries.
+
+    python3 scripts/test-market-snapshots.py
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openmanus import snapshots
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def research_run(day: int, demand: dict) -> dict:
+    """A market-research.json shaped run with the given category demand."""
+    return {
+        "timestamp": f"2026-01-{day:02d}T08:00:00Z",
+        "competitors": [{"name": "OLX Romania", "categories": [{"name": n} for n in demand]}],
+        "market_trends": [{"insight": "High-demand categories", "recommendation": "Focus",
+                           "data": [{"name": n, "frequency": f} for n, f in demand.items()]}],
+    }
+
+
+def store():
+    return snapshots.SnapshotStore(os.path.join(tempfile.mkdtemp(), "snapshots.sqlite3"))
+
+
+def test_flatten_keys_lists_by_name():
+    metrics = snapshots.flatten_metrics(research_run(1, {"Auto": 2, "Imobiliare": 1}))
+    assert metrics["market_trends.High-demand categories.data.Auto.frequency"] == 2
+    assert metrics["market_trends.High-demand categories.data#"] == 2
+    assert metrics["competitors.OLX Romania.categories#"] == 2
+    # Reordering a list does not rename its metrics; strings and booleans are not metrics
+    reordered = snapshots.flatten_metrics(research_run(1, {"Imobiliare": 1, "Auto": 2}))
+    assert reordered == metrics
+    assert snapshots.flatten_metrics({"a": True, "b": "78%", "c": [1, 2.5]}) == {"c#": 2, "c.0": 1, "c.1": 2.5}
+
+
+def test_append_is_idempotent():
+    s = store()
+    first = s.append("market-research", research_run(1, {"Auto": 2}))
+    assert s.append("market-research", research_run(1, {"Auto": 2})) == first
+    assert s.append("market-research", research_run(2, {"Auto": 2})) != first  # a later run, unchanged
+    assert s.stats["duplicates"] == 1 and len(s.runs("market-research")) == 2
+    assert s.runs("market-research")[0][1] == snapshots.document_time(research_run(1, {}))
+
+
+def test_data_files():
+    s = store()
+    for name in ("market-research.json", "market-intelligence.json"):
+        s.append_file(os.path.join(DATA, name))
+        s.append_file(os.path.join(DATA, name))
+    summary = s.summary()
+    assert {k: v["runs"] for k, v in summary["kinds"].items()} == {"market-research": 1, "market-intelligence": 1}
+    with open(os.path.join(DATA, "market-intelligence.json"), encoding="utf-8") as f:
+        assert s.latest("market-intelligence") == json.load(f)
+    # research_date sits one level down, in executive_summary
+    assert summary["kinds"]["market-intelligence"]["latest"] == snapshots.document_time(
+        {"timestamp": "2025-12-03T04:37:01Z"})
+    assert s.metric_names("market-research", "competitors") == [
+        "competitors#", "competitors.OLX Romania.categories#", "competitors.eMAG Romania.categories#"]
+
+
+def test_series_window():
+    s = store()
+    for day in range(1, 11):
+        demand = {"Auto": day, "Imobiliare": 10 - day}
+        if day >= 8:
+            demand["Electronice"] = day * 2  # a category that appears late
+        s.append("market-research", research_run(day, demand))
+    s.append("market-intelligence", {"timestamp": "2026-01-05T00:00:00Z", "score": 1})
+
+    prefix = "market_trends.High-demand categories.data."
+    series = s.series("market-research", prefix, last=4)
+    assert [r["taken_at"] for r in series["runs"]] == sorted(r["taken_at"] for r in series["runs"])
+    assert series["metrics"][prefix + "Auto.frequency"] == [7, 8, 9, 10]
+    assert series["metrics"][prefix + "Electronice.frequency"] == [None, 16, 18, 20]
+    assert all(name.startswith(prefix) for name in series["metrics"])
+    assert s.series("market-intelligence", "score")["metrics"] == {"score": [1]}
+    assert s.series("nothing")["runs"] == []
+
+
+def test_frame_diffs():
+    s = store()
+    for day in range(1, 11):
+        s.append("market-research", research_run(day, {"Auto": day * day, "Imobiliare": 5}))
+    s.append("market-research", research_run(11, {"Auto": 121}))
+
+    prefix = "market_trends.High-demand categories.data."
+    frame = s.frame("market-research", prefix, last=5)
+    series = s.series("market-research", prefix, last=5)
+    assert frame.names == list(series["metrics"])
+    assert frame.run_ids.tolist() == [r["id"] for r in series["runs"]]
+    auto = frame.column(prefix + "Auto.frequency")
+    assert auto.tolist() == [49, 64, 81, 100, 121]
+    assert frame.diff()[:, frame.names.index(prefix + "Auto.frequency")].tolist() == [15, 17, 19, 21]
+    assert frame.diff(lag=2).shape == (3, len(frame.names))
+    assert np.allclose(frame.pct_change()[0, frame.names.index(prefix + "Auto.frequency")], 15 / 49)
+    assert np.isnan(frame.column(prefix + "Imobiliare.frequency")[-1])
+    changed = dict((name, (old, new)) for name, old, new in frame.changed())
+    assert changed[prefix + "Auto.frequency"] == (100, 121)
+    assert changed[prefix + "Imobiliare.frequency"] == (5, None)  # dropped out of the list
+    assert prefix + "Auto.frequency" not in dict((n, o) for n, o, _ in frame.changed(threshold=25))
+
+
+def test_speed():
+    random.seed(7)
+    s = store()
+    categories = [f"Categorie {i}" for i in range(150)]
+    started = time.perf_counter()
+    for day in range(500):
+        run = research_run(1, {c: random.randint(0, 100) for c in random.sample(categories, 120)})
+        s.append("market-research", run, taken_at=1_767_225_600 + day * 3600)
+    appended = time.perf_counter() - started
+
+    prefix = "market_trends.High-demand categories.data.Categorie 7"
+    started = time.perf_counter()
+    for _ in range(20):
+        series = s.series("market-research", prefix, last=30)
+    queried = (time.perf_counter() - started) / 20
+    started = time.perf_counter()
+    frame = s.frame("market-research", "market_trends.", last=30)
+    diffs = frame.diff()
+    framed = time.perf_counter() - started
+    metrics = len(snapshots.flatten_metrics(run))
+    print(f"   500 runs x {metrics} metrics appended in {appended * 1000:.0f} ms "
+          f"({appended * 2:.2f} ms/run); last 30 runs of one category in {queried * 1000:.2f} ms; "
+          f"{frame.values.shape} frame + diffs in {framed * 1000:.1f} ms")
+    assert len(series["runs"]) == 30 and diffs.shape == (29, len(frame.names))
+    assert queried < 0.05
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in sorted((n, f) for n, f in globals().items() if n.startswith("test_")):
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Checks the OpenManus text analytics (keyphrases, trends, findings) on the
+saved result pages in scripts/fixtures/openmanus/ and times it on a few
+thousand synthetic snippets.
+
+    python3 scripts/test-openmanus-analytics.py
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openmanus import analytics, extract, fetch
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "openmanus")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def fixture_results():
+    results = extract.merge_results([
+        extract.parse_results_page(fixture("google_basic.html")),
+        extract.parse_results_page(fixture("google_desktop.html")),
+    ])
+    title, text = fetch.extract_main_text(fixture("article.html"))
+    results.append({"title": title, "url": "https://autoblog.example/piata-auto", "snippet": "",
+                    "page": {"text": text}})
+    return results
+
+
+def test_tokenize_folds_romanian_diacritics():
+    assert analytics.tokenize("Mașini ȘI Țară, şi ţeava") == ["masini", "si", "tara", "si", "teava"]
+    assert analytics.tokenize("e-mail-uri second-hand") == ["e-mail-uri", "second-hand"]
+
+
+def test_candidate_phrases():
+    counts = analytics.candidate_phrases("Prețuri de vânzare pentru mașini. Trends 2024 in the market")
+    assert counts["preturi de vanzare"] == 1
+    assert counts["trends 2024"] == 1
+    # Stopwords inside a phrase are fine, at its edges or across punctuation not
+    assert counts["vanzare pentru masini"] == 1 and "masini trends" not in counts
+    assert "pentru masini" not in counts and "market" in counts and "the market" not in counts
+
+
+def test_numpy_and_python_scores_match():
+    if not analytics.NUMPY_AVAILABLE:
+        return
+    docs = [analytics.candidate_phrases(analytics._document_text(r)) for r in fixture_results()]
+    fast = analytics.tfidf_scores(docs)
+    analytics.NUMPY_AVAILABLE = False
+    try:
+        slow = analytics.tfidf_scores(docs)
+    finally:
+        analytics.NUMPY_AVAILABLE = True
+    assert fast[0] == slow[0] and fast[2] == slow[2]
+    assert all(abs(a - b) < 1e-9 for a, b in zip(fast[1], slow[1]))
+
+
+def test_analysis_of_fixture_results():
+    analysis = analytics.analyze_results(fixture_results(), "mașini second hand")
+    phrases = [k["phrase"] for k in analysis["keyphrases"]]
+    # Written with diacritics, topic words on their own left out
+    assert "autoturisme second hand" in phrases and "anunțuri" in phrases
+    assert "second hand" not in phrases and "mașini" not in phrases
+    trends = {t["phrase"]: t for t in analysis["trends"]}
+    assert trends["anunțuri auto"]["sources"] >= 2
+    assert all(t["sources"] > 1 for t in analysis["trends"])
+    findings = analysis["findings"]
+    assert len(findings) == 3 and len({f["url"] for f in findings}) == 3
+    assert all("second hand" in f["text"] for f in findings)
+
+
+def test_empty_results():
+    assert analytics.analyze_results([], "auto")["keyphrases"] == []
+    assert analytics.analyze_results([{"title": "", "snippet": "de la"}], "auto")["documents"] == 0
+
+
+def test_speed():
+    random.seed(7)
+    words = " ".join(r["snippet"] for r in fixture_results()).split()
+    snippets = [{"title": " ".join(random.choices(words, k=8)), "snippet": " ".join(random.choices(words, k=30)),
+                 "url": f"https://example.ro/{i}"} for i in range(3000)]
+    started = time.perf_counter()
+    analysis = analytics.analyze_results(snippets, "auto")
+    elapsed = time.perf_counter() - started
+    print(f"   3000 snippets in {elapsed * 1000:.0f} ms (numpy: {analytics.NUMPY_AVAILABLE})")
+    assert analysis["documents"] == 3000 and len(analysis["keyphrases"]) == 10
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in sorted((n, f) for n, f in globals().items() if n.startswith("test_")):
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
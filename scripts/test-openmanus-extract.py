@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Checks the OpenManus result extraction and ranking against saved result pages
+in scripts/fixtures/openmanus/. Runs every parser backend that is installed.
+
+    python3 scripts/test-openmanus-extract.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openmanus import extract
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "openmanus")
+
+
+def available_backends():
+    backends = ["html.parser"]
+    if extract.LXML_AVAILABLE:
+        backends.append("lxml")
+    if extract.SelectolaxParser is not None:
+        backends.append("selectolax")
+    return backends
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_basic_layout():
+    for backend in available_backends():
+        results = extract.parse_results_page(fixture("google_basic.html"), backend=backend)
+        assert [r["url"] for r in results] == [
+            "https://www.olx.ro/auto-masini-moto-ambarcatiuni/autoturisme/?utm_source=google",
+            "https://www.autovit.ro/autoturisme",
+            "https://piata-ai.ro/categorii/auto",
+            "https://www.mobile.de/ro/",
+        ], backend
+        assert results[0]["title"] == "Autoturisme second hand - OLX.ro"
+        assert results[0]["snippet"].startswith("Peste 80.000 de anunțuri")
+        # Breadcrumbs live inside the result link and are not part of the snippet
+        assert "›" not in results[1]["snippet"]
+        # Related searches and the footer do not leak into snippets
+        assert "Căutări similare" not in results[2]["snippet"]
+        assert "România - Din adresa IP" not in results[3]["snippet"]
+
+
+def test_desktop_layout():
+    for backend in available_backends():
+        results = extract.parse_results_page(fixture("google_desktop.html"), backend=backend)
+        assert [r["title"] for r in results] == [
+            "Mașini second hand și noi de vânzare - Autovit.ro",
+            "Mașini second hand - Publi24",
+            "Piață - Wikipedia",
+        ], backend
+        # Google-internal results (maps) are dropped without stealing snippets
+        assert results[2]["snippet"].endswith("schimb de bunuri.")
+
+
+def test_streaming_matches_whole_document():
+    html = fixture("google_basic.html")
+    parser = extract.ResultPageParser("html.parser")
+    for start in range(0, len(html), 97):
+        parser.feed(html[start:start + 97])
+    assert parser.close() == extract.parse_results_page(html, backend="html.parser")
+
+
+def test_canonical_url():
+    assert extract.canonical_url("http://www.Publi24.ro/anunturi/?utm_source=x&b=2&a=1#top") == \
+        extract.canonical_url("https://publi24.ro/anunturi?a=1&b=2")
+    assert extract.canonical_url("https://olx.ro/auto?page=2") != extract.canonical_url("https://olx.ro/auto?page=3")
+
+
+def test_merge_deduplicates_across_queries():
+    basic = extract.parse_results_page(fixture("google_basic.html"))
+    desktop = extract.parse_results_page(fixture("google_desktop.html"))
+    merged = extract.merge_results([basic, desktop])
+    assert len(merged) == len(basic) + len(desktop) - 1
+    autovit = [r for r in merged if "autovit" in r["url"]]
+    assert len(autovit) == 1 and autovit[0]["hits"] == 2
+    # The longer snippet wins
+    assert "finanțare și garanție" in autovit[0]["snippet"]
+
+
+def test_bm25_ranking():
+    merged = extract.merge_results([
+        extract.parse_results_page(fixture("google_basic.html")),
+        extract.parse_results_page(fixture("google_desktop.html")),
+    ])
+    ranked = extract.bm25_rank(merged, "masini second hand")
+    scores = [r["score"] for r in ranked]
+    assert scores == sorted(scores, reverse=True)
+    # Diacritics are folded: "mașini" in the page matches "masini" in the query
+    assert "wikipedia" in ranked[-1]["url"]
+    assert extract.tokenize("Mașini în Țară") == ["masini", "in", "tara"]
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in sorted((n, f) for n, f in globals().items() if n.startswith("test_")):
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\nBackends: {', '.join(available_backends())}")
+    sys.exit(1 if failed else 0)
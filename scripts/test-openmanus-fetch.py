@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Checks the OpenManus deep-research page fetcher against a local fixture HTTP
+server: main-text extraction, ETag revalidation, size caps, content types and
+per-domain concurrency. Needs httpx.
+
+    python3 scripts/test-openmanus-fetch.py
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openmanus import fetch
+from openmanus.cache import PageCache
+from openmanus.ratelimit import HostRateLimiter
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "openmanus")
+
+with open(os.path.join(FIXTURES, "article.html"), "rb") as f:
+    ARTICLE = f.read()
+
+
+class FixtureServer(BaseHTTPRequestHandler):
+    requests = []
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body, content_type="text/html; charset=utf-8", headers=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        FixtureServer.requests.append(self.path)
+        if self.path == "/article":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_body(ARTICLE, headers={"ETag": '"v1"'})
+        elif self.path == "/big":
+            paragraph = b"<p>" + "Anunțuri auto verificate din toată țara, ".encode("utf-8") * 20 + b"</p>"
+            self.send_body(b"<html><body>" + paragraph * 2000 + b"</body></html>")
+        elif self.path == "/file.pdf":
+            self.send_body(b"%PDF-1.4", content_type="application/pdf")
+        elif self.path.startswith("/slow/"):
+            with FixtureServer.lock:
+                FixtureServer.in_flight += 1
+                FixtureServer.max_in_flight = max(FixtureServer.max_in_flight, FixtureServer.in_flight)
+            time.sleep(0.1)
+            with FixtureServer.lock:
+                FixtureServer.in_flight -= 1
+            self.send_body(ARTICLE)
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_fetcher(**kwargs):
+    limiter = HostRateLimiter(concurrency=kwargs.pop("concurrency", 4), min_interval=0)
+    return fetch.PageFetcher(limiter, PageCache(":memory:"), **kwargs)
+
+
+def test_main_text_drops_boilerplate():
+    title, text = fetch.extract_main_text(ARTICLE.decode("utf-8"))
+    assert title == "Piața auto second hand în 2024 - Ghid complet"
+    assert text.startswith("Piața auto second hand în 2024\n\nPiața mașinilor second hand")
+    assert "Cum verifici o mașină" in text
+    for boilerplate in ("cookie", "Ghiduri de cumpărare", "Reclamă", "Abonează-te", "Vezi și",
+                        "Cele mai citite", "Ion:", "drepturile rezervate"):
+        assert boilerplate not in text, boilerplate
+
+
+async def check_fetch(base):
+    fetcher = make_fetcher()
+    try:
+        first = await fetcher.fetch(f"{base}/article")
+        assert first["status"] == 200 and first["cache"] == "miss"
+        assert first["etag"] == '"v1"'
+        assert "Skoda Octavia" in first["text"]
+
+        # Fresh cache entry: no request at all
+        FixtureServer.requests.clear()
+        again = await fetcher.fetch(f"{base}/article")
+        assert again["cache"] == "fresh" and again["text"] == first["text"]
+        assert FixtureServer.requests == []
+
+        # Expired entry: conditional GET answered with 304
+        fetcher.cache.ttl = -1
+        revalidated = await fetcher.fetch(f"{base}/article")
+        assert revalidated["cache"] == "revalidated" and revalidated["text"] == first["text"]
+        assert FixtureServer.requests == ["/article"]
+        assert fetcher.stats["not_modified"] == 1
+
+        pdf, missing = await fetcher.fetch_many([f"{base}/file.pdf", f"{base}/missing"])
+        assert "content type" in pdf["error"] and pdf["text"] == ""
+        assert missing["status"] == 404
+    finally:
+        await fetcher.aclose()
+
+
+async def check_size_cap(base):
+    fetcher = make_fetcher(max_bytes=64 * 1024, text_limit=1000)
+    try:
+        page = await fetcher.fetch(f"{base}/big")
+        assert page["truncated"] and page["bytes"] == 64 * 1024
+        assert len(page["text"]) <= 1000
+        # Cut mid-character is fine: decoding is incremental and lenient
+        assert page["text"].startswith("Anunțuri auto verificate")
+    finally:
+        await fetcher.aclose()
+
+
+async def check_domain_concurrency(base):
+    fetcher = make_fetcher(concurrency=2)
+    FixtureServer.max_in_flight = 0
+    try:
+        pages = await fetcher.fetch_many([f"{base}/slow/{i}" for i in range(8)])
+        assert all(p["status"] == 200 for p in pages)
+        assert FixtureServer.max_in_flight == 2, FixtureServer.max_in_flight
+    finally:
+        await fetcher.aclose()
+
+
+def test_fetch_against_fixture_server():
+    server, base = start_server()
+    try:
+        asyncio.run(check_fetch(base))
+        asyncio.run(check_size_cap(base))
+        asyncio.run(check_domain_concurrency(base))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    if not fetch.HTTPX_AVAILABLE:
+        print("httpx is not installed; skipping")
+        sys.exit(0)
+    failed = 0
+    for name, test in sorted((n, f) for n, f in globals().items() if n.startswith("test_")):
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,810 @@
+#!/usr/bin/env python3
+"""
+Checks the SQL Lector MCP server (scripts/addon.py) end to end over stdio.
+Most checks need a PostgreSQL database they may create tables in; without
+one only the offline checks run:
+
+    SQL_LECTOR_TEST_DB_URL=postgresql://postgres@localhost:5432/postgres \\
+        python3 scripts/test-sql-lector.py
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+
+SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+DB_URL = os.getenv("SQL_LECTOR_TEST_DB_URL")
+# Caches and the slow query log go to a scratch directory, not ~/.cache
+SCRATCH = tempfile.mkdtemp(prefix="sql-lector-test-")
+sys.path.insert(0, SCRIPTS)
+
+
+def needs_db(test):
+    test.needs_db = True
+    return test
+
+
+class Client:
+    """Minimal MCP client: one addon.py subprocess, requests matched by id."""
+
+    def __init__(self, *args, env=None):
+        self.args = args
+        self.env = env
+        self.next_id = 0
+        self.waiting = {}
+        self.notifications = []
+
+    async def __aenter__(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(SCRIPTS, "addon.py"), "--db-url", DB_URL, *self.args,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            limit=16 * 1024 * 1024, env={**os.environ, "SQL_LECTOR_CACHE_DIR": SCRATCH,
+                                         "SQL_LECTOR_PROFILE_PATH": os.path.join(SCRATCH, "profile.sqlite3"),
+                                         **(self.env or {})},
+        )
+        self.reader = asyncio.create_task(self._read())
+        await self.request("initialize", {"protocolVersion": "2024-11-05", "capabilities": {},
+                                          "clientInfo": {"name": "test", "version": "0"}})
+        self.notify("notifications/initialized")
+        return self
+
+    async def __aexit__(self, *exc):
+        self.proc.stdin.close()
+        await self.proc.wait()
+        self.reader.cancel()
+
+    async def _read(self):
+        while True:
+            line = await self.proc.stdout.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            if "id" not in message:
+                self.notifications.append(message)
+                continue
+            future = self.waiting.pop(message.get("id"), None)
+            if future is not None:
+                future.set_result(message)
+
+    def notify(self, method, params=None):
+        self.proc.stdin.write((json.dumps({"jsonrpc": "2.0", "method": method, "params": params or {}}) + "\n").encode())
+
+    def send(self, method, params=None):
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.next_id] = future
+        self.proc.stdin.write((json.dumps({"jsonrpc": "2.0", "id": self.next_id, "method": method,
+                                           "params": params or {}}) + "\n").encode())
+        return self.next_id, future
+
+    async def request(self, method, params=None, timeout=30):
+        return await asyncio.wait_for(self.send(method, params)[1], timeout)
+
+    async def call_raw(self, tool, **arguments):
+        """The tools/call result as sent: content items and isError."""
+        response = await self.request("tools/call", {"name": tool, "arguments": arguments})
+        assert "result" in response, response
+        return response["result"]
+
+    async def call(self, tool, **arguments):
+        """Tool result decoded from its text content; raises on tool errors."""
+        response = await self.request("tools/call", {"name": tool, "arguments": arguments})
+        assert "result" in response, response
+        text = response["result"]["content"][0]["text"]
+        if response["result"]["isError"]:
+            raise RuntimeError(text)
+        return json.loads(text)
+
+
+async def check_protocol():
+    async with Client() as client:
+        tools = (await client.request("tools/list"))["result"]["tools"]
+        assert {"sql_query", "inspect_schema", "db_health"} <= {t["name"] for t in tools}
+        assert all("inputSchema" in t for t in tools)
+
+        bad = await client.request("tools/call", {"name": "sql_query", "arguments": {}})
+        assert bad["error"]["code"] == -32602
+        assert (await client.request("nope"))["error"]["code"] == -32601
+        try:
+            await client.call("sql_query", query="SELECT * FROM missing_table")
+            raise AssertionError("expected a tool error")
+        except RuntimeError as e:
+            assert "missing_table" in str(e)
+
+
+async def check_concurrency():
+    async with Client("--pool-max", "4") as client:
+        started = time.perf_counter()
+        slow = asyncio.ensure_future(client.call("sql_query", query="SELECT true AS slept FROM pg_sleep(1)"))
+        health = await client.call("db_health")
+        assert health["status"] == "healthy" and time.perf_counter() - started < 0.9
+        assert (await slow) == [{"slept": True}]
+
+        # A cancelled request gets no answer and frees its connection
+        request_id, cancelled = client.send("tools/call", {"name": "sql_query", "arguments": {"query": "SELECT pg_sleep(30)"}})
+        await asyncio.sleep(0.2)
+        client.notify("notifications/cancelled", {"requestId": request_id})
+        results = await asyncio.gather(*(client.call("sql_query", query=f"SELECT {i} AS n") for i in range(200)))
+        assert [r[0]["n"] for r in results] == list(range(200))
+        assert not cancelled.done()
+        pool = (await client.call("db_health"))["pool"]
+        assert pool["size"] <= 4 and pool["connections_opened"] <= 4, pool
+
+
+async def check_writes():
+    async with Client() as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_items")
+        await client.call("sql_query", query="CREATE TABLE lector_test_items (id serial PRIMARY KEY, title text, price numeric)")
+        inserted = await client.call("sql_query", query="INSERT INTO lector_test_items (title, price) VALUES ('Dacia', 4500.50), ('Golf', 7200)")
+        assert inserted[0]["rowcount"] == 2
+        rows = await client.call("sql_query", query="SELECT title, price FROM lector_test_items ORDER BY id")
+        assert rows == [{"title": "Dacia", "price": "4500.50"}, {"title": "Golf", "price": "7200"}]
+        schema = await client.call("inspect_schema")
+        assert any(c["table_name"] == "lector_test_items" and c["column_name"] == "price" for c in schema)
+        await client.call("sql_query", query="DROP TABLE lector_test_items")
+
+
+async def check_stream():
+    async with Client() as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_stream")
+        await client.call("sql_query", query="CREATE TABLE lector_test_stream AS "
+                                             "SELECT g AS id, repeat('x', 100) AS body FROM generate_series(1, 5000) g")
+        query = "SELECT id, body FROM lector_test_stream ORDER BY id"
+
+        page = await client.call("sql_stream", query=query, page_size=1000)
+        ids = [row["id"] for row in page["data"]]
+        pages = 1
+        while page["next_cursor"]:
+            page = await client.call("sql_fetch", cursor=page["next_cursor"])
+            ids += [row["id"] for row in page["data"]]
+            pages += 1
+        assert ids == list(range(1, 5001)) and pages == 5 and not page["truncated"], (len(ids), pages)
+
+        # Row limit: stops early and says so; exactly at the limit is not truncation
+        page = await client.call("sql_stream", query=query, page_size=300, max_rows=500, format="columns")
+        assert page["data"]["id"] == list(range(1, 301)) and page["next_cursor"]
+        page = await client.call("sql_fetch", cursor=page["next_cursor"])
+        assert page["row_count"] == 200 and page["truncated"] and page["next_cursor"] is None
+        page = await client.call("sql_stream", query=query, page_size=5000, max_rows=5000)
+        assert page["row_count"] == 5000 and not page["truncated"]
+
+        # Byte limit: a page stops before max_bytes but still makes progress
+        page = await client.call("sql_stream", query=query, page_size=1000, max_bytes=10_000)
+        assert 0 < page["row_count"] < 100 and page["bytes"] <= 10_000, page["row_count"]
+        token = page["next_cursor"]
+        assert (await client.call("sql_fetch", cursor=token, close=True))["closed"]
+        try:
+            await client.call("sql_fetch", cursor=token)
+            raise AssertionError("expected a closed cursor")
+        except RuntimeError as e:
+            assert "expired" in str(e)
+
+        assert (await client.call("db_health"))["cursors"]["open"] == 0
+        await client.call("sql_query", query="DROP TABLE lector_test_stream")
+
+
+async def check_stream_batches():
+    from addon import AntigravitySQLLector
+
+    lector = AntigravitySQLLector(DB_URL, min_size=1, max_size=2)
+    await lector.connect()
+    try:
+        query = "SELECT g AS id, g * 1.5 AS price FROM generate_series(1, 2500) g"
+        sizes = [len(batch["id"]) async for batch in lector.stream_query(query, itersize=1000, fmt="numpy")]
+        assert sizes == [1000, 1000, 500], sizes
+        batches = [batch async for batch in lector.stream_query(query, itersize=1000, max_rows=1200)]
+        assert [len(b) for b in batches] == [1000, 200] and batches[0][0] == {"id": 1, "price": 1.5}
+    finally:
+        await lector.close()
+
+
+async def check_schema_cache():
+    cache_dir = tempfile.mkdtemp()
+    env = {"SQL_LECTOR_CACHE_DIR": cache_dir, "SQL_LECTOR_SCHEMA_CHECK_INTERVAL": "0", "SQL_LECTOR_SCHEMA_LISTEN": "0"}
+    async with Client(env=env) as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_child, lector_test_parent")
+        await client.call("sql_query", query="CREATE TABLE lector_test_parent (id serial PRIMARY KEY)")
+        await client.call("sql_query", query="CREATE TABLE lector_test_child (id bigserial PRIMARY KEY, "
+                                             "parent_id int REFERENCES lector_test_parent (id), price numeric(10,2))")
+        await client.call("sql_query", query="CREATE INDEX lector_test_child_price ON lector_test_child (price)")
+
+        detail = await client.call("inspect_schema", table="lector_test_child", detail=True)
+        child = detail["tables"][0]
+        assert child["primary_key"] == ["id"]
+        assert {i["name"] for i in child["indexes"]} == {"lector_test_child_pkey", "lector_test_child_price"}
+        assert child["foreign_keys"][0]["ref_table"] == "public.lector_test_parent"
+        assert child["foreign_keys"][0]["columns"] == ["parent_id"]
+
+        # DDL from another client changes the fingerprint, so the next call sees the new column
+        import psycopg
+        async with await psycopg.AsyncConnection.connect(DB_URL, autocommit=True) as conn:
+            await conn.execute("ALTER TABLE lector_test_child ADD COLUMN title text")
+        columns = await client.call("inspect_schema", table="lector_test_child")
+        assert [c["column_name"] for c in columns] == ["id", "parent_id", "price", "title"], columns
+        assert (await client.call("db_health"))["schema_cache"]["changes"] >= 1
+
+    # A cold start answers from the persisted catalog
+    async with Client(env=env) as client:
+        assert (await client.call("db_health"))["schema_cache"]["source"] == "file"
+        columns = await client.call("inspect_schema", table="lector_test_child")
+        assert len(columns) == 4
+        await client.call("sql_query", query="DROP TABLE lector_test_child, lector_test_parent")
+
+
+async def check_schema_events():
+    import psycopg
+    from sql_lector.pool import Database
+    from sql_lector.schema import SchemaCache
+
+    migration = os.path.join(SCRIPTS, "..", "supabase", "migrations", "022_lector_schema_events.sql")
+    db = Database(DB_URL, max_size=2)
+    await db.open()
+    try:
+        async with db.connection() as conn:
+            await conn.execute(open(migration).read())
+    except psycopg.errors.InsufficientPrivilege:
+        await db.close()
+        return  # event triggers need a superuser; the fingerprint path is covered above
+    cache = SchemaCache(db, path="", check_interval=3600, listen=True)
+    try:
+        cache.start()
+        for _ in range(50):
+            if cache.listening:
+                break
+            await asyncio.sleep(0.1)
+        assert cache.listening
+        await cache.get()
+        async with db.connection() as conn:
+            await conn.execute("CREATE TABLE lector_test_events (id int)")
+        for _ in range(50):
+            if cache.dirty:
+                break
+            await asyncio.sleep(0.1)
+        assert "public.lector_test_events" in (await cache.get())["tables"]
+        assert cache.counters["notifications"] >= 1 and cache.counters["checks"] == 0, cache.counters
+    finally:
+        await cache.stop()
+        async with db.connection() as conn:
+            await conn.execute("DROP TABLE IF EXISTS lector_test_events")
+            await conn.execute("DROP EVENT TRIGGER IF EXISTS lector_schema_changed")
+            await conn.execute("DROP FUNCTION IF EXISTS public.lector_notify_schema_change()")
+        await db.close()
+
+
+async def check_result_cache():
+    async with Client() as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_ads, lector_test_categories")
+        await client.call("sql_query", query="CREATE TABLE lector_test_categories (id int PRIMARY KEY, name text)")
+        await client.call("sql_query", query="CREATE TABLE lector_test_ads (id int, category int "
+                                             "REFERENCES lector_test_categories ON DELETE CASCADE) PARTITION BY RANGE (id)")
+        await client.call("sql_query", query="CREATE TABLE lector_test_ads_1 PARTITION OF lector_test_ads FOR VALUES FROM (0) TO (1000)")
+        await client.call("sql_query", query="INSERT INTO lector_test_categories VALUES (1, 'Auto'), (2, 'Imobiliare')")
+        await client.call("sql_query", query="INSERT INTO lector_test_ads SELECT g, 1 + g % 2 FROM generate_series(1, 99) g")
+        await client.call("inspect_schema")  # foreign keys for cascade tracking
+
+        counts = ("SELECT c.name, count(*) AS ads FROM lector_test_ads a "
+                  "JOIN lector_test_categories c ON c.id = a.category GROUP BY c.name ORDER BY c.name")
+        first = await client.call("sql_query", query=counts)
+        # Same query modulo case, whitespace and comments is a hit
+        again = await client.call("sql_query", query=counts.replace("SELECT", "select").replace(" GROUP", " -- x\n  GROUP"))
+        assert first == again == [{"name": "Auto", "ads": 49}, {"name": "Imobiliare", "ads": 50}], again
+        stats = (await client.call("db_health"))["result_cache"]
+        assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_ratio"] == 0.5, stats
+
+        # A write to a partition invalidates reads of its parent
+        await client.call("sql_query", query="INSERT INTO lector_test_ads_1 VALUES (500, 2)")
+        assert (await client.call("sql_query", query=counts))[1]["ads"] == 51
+        # ON DELETE CASCADE reaches the ads table through the foreign key
+        await client.call("sql_query", query="SELECT count(*) FROM lector_test_ads")
+        await client.call("sql_query", query="DELETE FROM lector_test_categories WHERE id = 2")
+        assert (await client.call("sql_query", query="SELECT count(*) FROM lector_test_ads"))[0]["count"] == 49
+
+        # Volatile and bypassed queries are never served from the cache
+        await client.call("sql_query", query="SELECT random() AS r FROM lector_test_categories")
+        await client.call("sql_query", query=counts, cache=False)
+        after = (await client.call("db_health"))["result_cache"]
+        assert after["hits"] == stats["hits"], after
+        await client.call("sql_query", query="DROP TABLE lector_test_ads, lector_test_categories")
+        assert (await client.call("db_health"))["result_cache"]["entries"] == 0
+
+
+async def check_guard():
+    env = {"SQL_LECTOR_MAX_ROWS": "100", "SQL_LECTOR_MAX_COST": "100000", "SQL_LECTOR_MAX_WRITE_ROWS": "500",
+           "SQL_LECTOR_STATEMENT_TIMEOUT_MS": "300", "SQL_LECTOR_SLOW_MS": "0",
+           "SQL_LECTOR_PROFILE_PATH": os.path.join(tempfile.mkdtemp(), "profile.sqlite3")}
+    async with Client(env=env) as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_guard")
+        await client.call("sql_query", query="CREATE TABLE lector_test_guard AS SELECT g AS id, g % 50 AS category, "
+                                             "(g % 1000)::numeric AS price FROM generate_series(1, 20000) g")
+        await client.call("sql_query", query="ANALYZE lector_test_guard")
+        await client.call("inspect_schema", refresh=True)
+
+        # Too many rows: downgraded to the first max_rows, with a note
+        result = await client.call_raw("sql_query", query="SELECT * FROM lector_test_guard ORDER BY id")
+        assert not result["isError"] and len(json.loads(result["content"][0]["text"])) == 100
+        assert "sql_stream" in result["content"][1]["text"]
+
+        # Too expensive, too many rows written, too slow
+        result = await client.call_raw("sql_query", query="SELECT count(*) FROM lector_test_guard a, lector_test_guard b")
+        assert result["isError"] and "estimated cost" in result["content"][0]["text"]
+        result = await client.call_raw("sql_query", query="UPDATE lector_test_guard SET price = 0")
+        assert result["isError"] and "write about" in result["content"][0]["text"]
+        assert (await client.call("sql_query", query="UPDATE lector_test_guard SET price = 0 WHERE id <= 10"))[0]["rowcount"] == 10
+        result = await client.call_raw("sql_query", query="SELECT true FROM pg_sleep(2)")
+        assert result["isError"] and "statement_timeout" in result["content"][0]["text"]
+
+        for category in (3, 4, 5):
+            await client.call("sql_query", query=f"SELECT count(*) FROM lector_test_guard WHERE category = {category} AND price > 100")
+        guard = (await client.call("db_health"))["guard"]
+        assert guard["rejected"] == 2 and guard["downgraded"] == 1 and guard["timeouts"] == 1, guard
+
+        slow = await client.call("slow_queries", order="calls", limit=50)
+        by_shape = {entry["shape"]: entry for entry in slow}
+        entry = by_shape["select count(*) from lector_test_guard where category = ? and price > ?"]
+        assert entry["calls"] == 3
+        suggestion = entry["index_suggestions"][0]
+        assert suggestion["columns"] == ["category", "price"], suggestion
+        assert suggestion["statement"].startswith("CREATE INDEX CONCURRENTLY ON public.lector_test_guard")
+        assert any(e["timeouts"] == 1 for e in slow)
+
+        # With the suggested index in place there is nothing left to suggest
+        await client.call("sql_query", query="CREATE INDEX ON lector_test_guard (category)")
+        slow = await client.call("slow_queries", order="calls", limit=50)
+        assert not [e for e in slow if e["shape"] == entry["shape"]][0]["index_suggestions"]
+        assert (await client.call("slow_queries", reset=True))["cleared"] == len(slow)
+        await client.call("sql_query", query="DROP TABLE lector_test_guard")
+
+
+async def check_asyncpg_backend():
+    env = {"SQL_LECTOR_MAX_ROWS": "100", "SQL_LECTOR_STATEMENT_TIMEOUT_MS": "300"}
+    async with Client("--backend", "asyncpg", env=env) as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_apg")
+        await client.call("sql_query", query="CREATE TABLE lector_test_apg (id serial PRIMARY KEY, title text, "
+                                             "price numeric, meta jsonb)")
+        inserted = await client.call("sql_query", query="INSERT INTO lector_test_apg (title, price, meta) "
+                                                        "SELECT 'ad ' || g, g * 1.5, jsonb_build_object('g', g) "
+                                                        "FROM generate_series(1, 300) g")
+        assert inserted[0]["rowcount"] == 300
+        # Same row shapes as psycopg: numeric as text in JSON, jsonb decoded
+        rows = await client.call("sql_query", query="SELECT title, price, meta FROM lector_test_apg WHERE id = 2")
+        assert rows == [{"title": "ad 2", "price": "3.0", "meta": {"g": 2}}], rows
+        returned = await client.call("sql_query", query="UPDATE lector_test_apg SET price = 0 WHERE id = 1 RETURNING id")
+        assert returned == [{"id": 1}]
+
+        # Guard: downgraded to a capped cursor fetch, and the timeout is enforced per connection
+        result = await client.call_raw("sql_query", query="SELECT * FROM lector_test_apg ORDER BY id")
+        assert len(json.loads(result["content"][0]["text"])) == 100 and len(result["content"]) == 2
+        result = await client.call_raw("sql_query", query="SELECT true FROM pg_sleep(2)")
+        assert result["isError"] and "statement_timeout" in result["content"][0]["text"]
+
+        batch = await client.call("sql_batch", queries=[
+            "SELECT count(*) AS n FROM lector_test_apg",
+            "SELECT * FROM lector_test_missing",
+            "SELECT title FROM lector_test_apg WHERE id = 3",
+        ])
+        assert batch[0]["rows"] == [{"n": 300}] and "lector_test_missing" in batch[1]["error"]
+        assert batch[2]["rows"] == [{"title": "ad 3"}]
+
+        health = await client.call("db_health")
+        assert health["query_pool"]["backend"] == "asyncpg" and health["query_pool"]["prepared_statements"]
+        # One connection limit for both pools: 10 = 2 psycopg + 8 asyncpg
+        assert (health["pool"]["max_size"], health["query_pool"]["max_size"]) == (2, 8), health["query_pool"]
+        assert health["guard"]["timeouts"] == 1 and health["guard"]["downgraded"] == 1, health["guard"]
+        await client.call("sql_query", query="DROP TABLE lector_test_apg")
+
+
+async def check_bulk():
+    bulk_dir = tempfile.mkdtemp(dir=SCRATCH)
+    async with Client(env={"SQL_LECTOR_BULK_DIR": bulk_dir}) as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_bulk, lector_test_bulk_copy")
+        await client.call("sql_query", query="CREATE TABLE lector_test_bulk AS SELECT g AS id, "
+                                             "CASE WHEN g % 5 = 0 THEN NULL ELSE 'ad, \"' || g || E'\"\nline two' END AS title, "
+                                             "g * 1.5 AS price, jsonb_build_object('g', g) AS meta FROM generate_series(1, 1000) g")
+        await client.call("sql_query", query="CREATE TABLE lector_test_bulk_copy (LIKE lector_test_bulk)")
+        same = ("SELECT count(*) AS n FROM (SELECT * FROM lector_test_bulk EXCEPT SELECT * FROM lector_test_bulk_copy) d")
+
+        exported = await client.call("bulk_export", path="ads/ads.csv", table="lector_test_bulk")
+        assert exported["rows"] == 1000 and os.path.exists(os.path.join(bulk_dir, "ads", "ads.csv"))
+        # Quoted newlines must not split records between chunks
+        response = await client.request("tools/call", {"name": "bulk_import", "_meta": {"progressToken": "t1"},
+                                                       "arguments": {"path": "ads/ads.csv", "table": "lector_test_bulk_copy",
+                                                                     "chunk_rows": 300}})
+        imported = json.loads(response["result"]["content"][0]["text"])
+        assert imported["rows"] == 1000 and imported["chunks"] == 4, imported
+        assert imported["columns"] == ["id", "title", "price", "meta"]
+        progress = [n["params"] for n in client.notifications if n["method"] == "notifications/progress"]
+        assert len(progress) == 4 and progress[-1]["progressToken"] == "t1"
+        assert progress[-1]["progress"] == progress[-1]["total"]
+        assert (await client.call("sql_query", query=same, cache=False)) == [{"n": 0}]
+
+        await client.call("sql_query", query="TRUNCATE lector_test_bulk_copy")
+        exported = await client.call("bulk_export", path="ads.bin.gz", query="SELECT * FROM lector_test_bulk ORDER BY id",
+                                     format="binary")
+        assert exported["rows"] == 1000
+        imported = await client.call("bulk_import", path="ads.bin.gz", table="lector_test_bulk_copy", format="binary",
+                                     chunk_rows=256)
+        assert imported["rows"] == 1000 and imported["chunks"] == 4
+        assert (await client.call("sql_query", query=same, cache=False)) == [{"n": 0}]
+
+        # A bad row stops its chunk; earlier chunks stay and skip_rows resumes
+        await client.call("sql_query", query="TRUNCATE lector_test_bulk_copy")
+        path = os.path.join(bulk_dir, "bad.csv")
+        with open(path, "w") as f:
+            f.write("id,price\n" + "".join(f"{i},{'oops' if i == 15 else i}\n" for i in range(1, 26)))
+        result = await client.call_raw("bulk_import", path="bad.csv", table="lector_test_bulk_copy", chunk_rows=10)
+        assert result["isError"] and "skip_rows=10" in result["content"][0]["text"], result
+        assert (await client.call("sql_query", query="SELECT count(*) AS n FROM lector_test_bulk_copy")) == [{"n": 10}]
+        with open(path, "w") as f:
+            f.write("id,price\n" + "".join(f"{i},{i}\n" for i in range(1, 26)))
+        imported = await client.call("bulk_import", path="bad.csv", table="lector_test_bulk_copy", chunk_rows=10, skip_rows=10)
+        assert imported["rows"] == 15
+        assert (await client.call("sql_query", query="SELECT count(*) AS n FROM lector_test_bulk_copy")) == [{"n": 25}]
+
+        result = await client.call_raw("bulk_export", path="../escape.csv", table="lector_test_bulk")
+        assert result["isError"] and "SQL_LECTOR_BULK_DIR" in result["content"][0]["text"]
+        assert (await client.call("db_health"))["bulk"]["failed_chunks"] == 1
+        await client.call("sql_query", query="DROP TABLE lector_test_bulk, lector_test_bulk_copy")
+
+
+async def check_routing():
+    # One server plays every role; application_name tells the targets apart
+    def url(name):
+        return f"{DB_URL}{'&' if '?' in DB_URL else '?'}application_name={name}"
+
+    config = os.path.join(tempfile.mkdtemp(dir=SCRATCH), "databases.json")
+    with open(config, "w") as f:
+        json.dump({"sources": [
+            {"id": "main", "connectionString": url("lector_primary"), "default": True},
+            {"id": "main_replica", "connectionString": url("lector_replica"), "replicaOf": "main"},
+            {"id": "main_lagging", "connectionString": url("lector_lagging"), "replicaOf": "main", "maxLagSeconds": -1},
+            {"id": "main_dead", "connectionString": "postgresql://postgres@127.0.0.1:1/postgres?connect_timeout=1",
+             "replicaOf": "main"},
+            {"id": "analytics", "connectionString": url("lector_analytics"), "maxConnections": 2},
+        ]}, f)
+    env = {"SQL_LECTOR_READ_AFTER_WRITE": "1", "SQL_LECTOR_REPLICA_CHECK_INTERVAL": "0.2"}
+    app = "SELECT current_setting('application_name') AS app"
+    async with Client("--config", config, env=env) as client:
+        deadline = time.monotonic() + 10
+        while True:
+            targets = (await client.call("db_health"))["databases"]["clusters"]["main"]["targets"]
+            if targets["main_replica"]["lag_seconds"] is not None and targets["main_dead"]["last_error"]:
+                break
+            assert time.monotonic() < deadline, targets
+            await asyncio.sleep(0.1)
+        assert targets["main_replica"]["healthy"] and not targets["main_dead"]["healthy"]
+        assert targets["main_lagging"]["healthy"] and targets["main_lagging"]["lag_seconds"] == 0
+
+        assert await client.call("sql_query", query=app, cache=False) == [{"app": "lector_replica"}]
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_routing")
+        await client.call("sql_query", query="CREATE TABLE lector_test_routing (id int, app text)")
+        written = await client.call("sql_query", query="INSERT INTO lector_test_routing "
+                                                       "VALUES (1, current_setting('application_name')) RETURNING app")
+        assert written == [{"app": "lector_primary"}]
+        # Read-your-writes: the primary serves reads until the window passes
+        assert await client.call("sql_query", query=app, cache=False) == [{"app": "lector_primary"}]
+        assert await client.call("sql_query", query=app + " FOR UPDATE", cache=False) == [{"app": "lector_primary"}]
+        await asyncio.sleep(1.1)
+        assert await client.call("sql_query", query=app, cache=False) == [{"app": "lector_replica"}]
+
+        assert await client.call("sql_query", query=app, database="main_replica") == [{"app": "lector_replica"}]
+        result = await client.call_raw("sql_query", query="DELETE FROM lector_test_routing", database="main_replica")
+        assert result["isError"] and "read replica" in result["content"][0]["text"]
+        assert await client.call("sql_query", query=app, database="analytics") == [{"app": "lector_analytics"}]
+        result = await client.call_raw("sql_query", query=app, database="nowhere")
+        assert result["isError"] and "main_replica" in result["content"][0]["text"]
+
+        page = await client.call("sql_stream", query=app)
+        assert page["data"] == [{"app": "lector_replica"}], page
+        health = await client.call("db_health", database="analytics")
+        clusters = health["databases"]["clusters"]
+        assert clusters["analytics"]["targets"]["analytics"]["pool"]["max_size"] == 2
+        assert clusters["main"]["targets"]["main_dead"]["queries"] == 0
+        assert clusters["main"]["targets"]["main_lagging"]["queries"] == 0
+        assert clusters["main"]["replica_reads"] >= 3 and clusters["main"]["writes"] >= 3, clusters["main"]
+        await client.call("sql_query", query="DROP TABLE lector_test_routing")
+
+
+async def check_declared():
+    config = os.path.join(tempfile.mkdtemp(dir=SCRATCH), "tools.json")
+    with open(config, "w") as f:
+        json.dump({"sources": [{"id": "main", "connectionString": DB_URL, "maxConnections": 1}], "tools": [
+            {"id": "find_ads", "sourceId": "main", "description": "Ads by title",
+             "sql": "SELECT id, title FROM lector_test_declared WHERE title ILIKE '%{{q}}%' ORDER BY id LIMIT {{limit}};",
+             "parameters": [{"name": "q", "type": "string", "required": True},
+                            {"name": "limit", "type": "number", "required": True}]},
+            {"id": "broken", "sourceId": "main", "sql": "SELECT * FROM lector_test_missing", "parameters": []},
+        ]}, f)
+    async with Client() as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_declared")
+        await client.call("sql_query", query="CREATE TABLE lector_test_declared AS "
+                                             "SELECT g AS id, 'ad ' || g || CASE WHEN g % 2 = 0 THEN ' 50%' ELSE '' END "
+                                             "AS title FROM generate_series(1, 20) g")
+    async with Client("--config", config) as client:
+        tools = {t["name"]: t for t in (await client.request("tools/list"))["result"]["tools"]}
+        assert tools["find_ads"]["inputSchema"]["required"] == ["q", "limit"]
+        assert tools["find_ads"]["inputSchema"]["properties"]["limit"]["type"] == "number"
+
+        rows = await client.call("find_ads", q="50%", limit=3)
+        assert rows == [{"id": 2, "title": "ad 2 50%"}, {"id": 4, "title": "ad 4 50%"}, {"id": 6, "title": "ad 6 50%"}]
+        # Checked against the generic plan estimated at startup, not EXPLAINed per call
+        explained = (await client.call("db_health"))["guard"]["explained"]
+        for _ in range(3):
+            assert len(await client.call("find_ads", q="ad 1", limit=100, cache=False)) == 11
+        # db_health's own SELECT 1 is the one EXPLAIN in between
+        assert (await client.call("db_health"))["guard"]["explained"] == explained + 1
+        # Values are bound, never pasted into the SQL
+        assert await client.call("find_ads", q="x' OR '1'='1", limit=5) == []
+        result = await client.call_raw("find_ads", q="ad", limit="5; DROP TABLE lector_test_declared")
+        assert result["isError"] and "limit must be a number" in result["content"][0]["text"]
+
+        # One pooled connection: the statement was prepared there on its first run
+        prepared = await client.call("sql_query", cache=False, query="SELECT count(*) AS n FROM pg_prepared_statements "
+                                                                     "WHERE statement LIKE '%lector_test_declared%'")
+        assert prepared[0]["n"] >= 1, prepared
+        health = await client.call("db_health")
+        declared = health["declared_tools"]
+        assert declared["find_ads"]["prepared"] and declared["find_ads"]["calls"] == 5, declared
+        assert declared["find_ads"]["estimate"]["node"] == "Limit", declared
+        assert declared["broken"]["prepared"] is False and "lector_test_missing" in declared["broken"]["error"]
+        assert health["pool"]["max_size"] == 1
+        await client.call("sql_query", query="DROP TABLE lector_test_declared")
+
+
+async def check_search():
+    # The migration's romanian_unaccent needs the unaccent extension; plain romanian has the same shape
+    env = {"SQL_LECTOR_SEARCH_TABLE": "lector_test_search", "SQL_LECTOR_SEARCH_CONFIG": "romanian"}
+    async with Client(env=env) as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_search")
+        await client.call("sql_query", query="""
+            CREATE TABLE lector_test_search (
+                id serial PRIMARY KEY, title text, description text, location text, category_id int,
+                price numeric, status text DEFAULT 'active', created_at timestamp,
+                search_vector tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('romanian', coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('romanian', coalesce(description, '')), 'B') ||
+                    setweight(to_tsvector('romanian', coalesce(location, '')), 'C')) STORED)""")
+        await client.call("sql_query", query="""
+            INSERT INTO lector_test_search (title, description, location, category_id, price, status, created_at)
+            SELECT CASE WHEN g % 3 = 0 THEN 'Dacia Logan ' || g ELSE 'Apartament ' || g END,
+                   CASE WHEN g % 5 = 0 THEN 'dacia in stare buna' ELSE 'descriere' END,
+                   CASE WHEN g % 2 = 0 THEN 'Cluj-Napoca' ELSE 'Iasi' END, g % 4, g * 100,
+                   CASE WHEN g = 30 THEN 'sold' ELSE 'active' END, timestamp '2026-01-01' + g * interval '1 hour'
+            FROM generate_series(1, 60) g""")
+        await client.call("sql_query", query="CREATE INDEX ON lector_test_search USING gin (search_vector)")
+
+        # Stemmed: "apartamentele" finds every Apartament; title matches (weight A) rank above description ones
+        assert len((await client.call("search_listings", query="apartamentele", limit=100))["results"]) == 40
+        page = await client.call("search_listings", query="dacia", limit=7)
+        assert page["mode"] == "fulltext" and len(page["results"]) == 7, page
+        first = page["results"][0]
+        assert "Dacia" in first["title"] and first["rank"] >= page["results"][-1]["rank"]
+        found, pages = [r["id"] for r in page["results"]], 1
+        while page["next_cursor"]:
+            page = await client.call("search_listings", query="dacia", limit=7, cursor=page["next_cursor"])
+            found += [r["id"] for r in page["results"]]
+            pages += 1
+        expected = {g for g in range(1, 61) if (g % 3 == 0 or g % 5 == 0) and g != 30}
+        assert sorted(found) == sorted(expected) and len(found) == len(expected) and pages == 4, (found, pages)
+        assert [r["id"] for r in (await client.call("search_listings", query="dacia", limit=50))["results"]][-4:] \
+            == [25, 20, 10, 5]  # description-only matches last, ties by id
+
+        page = await client.call("search_listings", query="dacia", order="newest", limit=3, category_id=0,
+                                 location="cluj", min_price=1000)
+        assert [r["id"] for r in page["results"]] == [60, 48, 40], page
+        page = await client.call("search_listings", query="dacia", order="newest", limit=3, category_id=0,
+                                 location="cluj", min_price=1000, cursor=page["next_cursor"])
+        assert [r["id"] for r in page["results"]] == [36, 24, 20] and page["next_cursor"], page
+        page = await client.call("search_listings", query="dacia", order="newest", limit=3, category_id=0,
+                                 location="cluj", min_price=1000, cursor=page["next_cursor"])
+        assert [r["id"] for r in page["results"]] == [12] and page["next_cursor"] is None, page
+        assert (await client.call("search_listings", query="apartament -iasi"))["results"][0]["location"] == "Cluj-Napoca"
+
+        other = (await client.call("search_listings", query="dacia", limit=1))["next_cursor"]
+        result = await client.call_raw("search_listings", query="apartament", cursor=other)
+        assert result["isError"] and "different search" in result["content"][0]["text"]
+        # No trigram extension here: nothing found stays nothing found
+        assert (await client.call("search_listings", query="zzyzx"))["results"] == []
+        assert (await client.call("db_health"))["search"]["searches"] >= 5
+        await client.call("sql_query", query="DROP TABLE lector_test_search")
+
+
+async def check_price_stats():
+    env = {"SQL_LECTOR_PRICE_STATS_VIEW": "lector_test_price_stats"}
+    async with Client(env=env) as client:
+        await client.call("sql_query", query="DROP TABLE IF EXISTS lector_test_prices CASCADE")
+        result = await client.call_raw("price_stats")
+        assert result["isError"] and "024_listing_price_stats.sql" in result["content"][0]["text"], result
+
+        await client.call("sql_query", query="""
+            CREATE TABLE lector_test_prices (
+                id serial PRIMARY KEY, category_id int, subcategory_id int, price numeric, location text,
+                status text DEFAULT 'active', created_at timestamptz DEFAULT now())""")
+        await client.call("sql_query", query="""
+            INSERT INTO lector_test_prices (category_id, subcategory_id, price, location, status)
+            SELECT g % 3, g % 6, CASE WHEN g % 10 = 0 THEN 0 ELSE g END,
+                   CASE WHEN g % 2 = 0 THEN 'Cluj-Napoca, Cluj' ELSE 'iași' END,
+                   CASE WHEN g = 1 THEN 'sold' ELSE 'active' END
+            FROM generate_series(1, 300) g""")
+        # The migration's own view and index, over the test table
+        with open(os.path.join(SCRIPTS, "..", "supabase", "migrations", "024_listing_price_stats.sql")) as f:
+            migration = f.read().split("REVOKE")[0]
+        migration = migration.replace("public.anunturi", "lector_test_prices")
+        for statement in migration.replace("public.listing_price_stats", "lector_test_price_stats").split(";\n"):
+            if statement.strip():
+                await client.call("sql_query", query=statement)
+        # Without pg_cron (as here) the schedule is skipped instead of failing the migration
+        with open(os.path.join(SCRIPTS, "..", "supabase", "migrations", "024_listing_price_stats.sql")) as f:
+            schedule = "DO $$" + f.read().split("DO $$", 1)[1]
+        await client.call("sql_query", query=schedule)
+
+        stats = await client.call("price_stats")
+        assert stats["grain"] == "category" and stats["refreshed_at"], stats
+        assert [r["category_id"] for r in stats["stats"]] == [0, 2, 1]  # 100, 100 and 99 active, then by id
+        (expected,) = (await client.call("sql_query", query="""
+            SELECT count(*) AS listings, count(*) FILTER (WHERE price > 0) AS priced,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY price) FILTER (WHERE price > 0) AS median
+            FROM lector_test_prices WHERE status = 'active' AND category_id = 1"""))
+        row = (await client.call("price_stats", category_id=1))["stats"][0]
+        assert (row["listings"], row["priced"]) == (expected["listings"], expected["priced"]) == (99, 89), row
+        assert float(row["median_price"]) == expected["median"] and float(row["min_price"]) == 4, row
+
+        cities = (await client.call("price_stats", grain="city", category_id=1, city="Cluj-Napoca"))["stats"]
+        assert [(r["city"], r["listings"]) for r in cities] == [("cluj-napoca", 50)], cities
+        assert len((await client.call("price_stats", grain="subcategory"))["stats"]) == 6
+        result = await client.call_raw("price_stats", grain="region")
+        assert result["isError"]
+
+        # Figures stay as of the last refresh until a refresh, which also drops the cached reads
+        await client.call("sql_query", query="INSERT INTO lector_test_prices (category_id, price) VALUES (1, 5)")
+        assert (await client.call("price_stats", category_id=1))["stats"][0]["listings"] == 99
+        fresh = await client.call("price_stats", category_id=1, refresh=True)
+        assert fresh["stats"][0]["listings"] == 100 and fresh["refreshed_at"] > stats["refreshed_at"], fresh
+        assert (await client.call("db_health"))["price_stats"]["refreshes"] == 1
+        await client.call("sql_query", query="DROP TABLE lector_test_prices CASCADE")
+
+
+def test_sql_text():
+    from sql_lector.results import SqlText
+
+    a = SqlText("SELECT *  FROM Listings -- newest\n WHERE title = 'Dacia  Logan';")
+    b = SqlText("select * from listings where title = 'Dacia  Logan'")
+    assert a.normalized == b.normalized and a.cacheable
+    assert SqlText("SELECT * FROM t WHERE x = 'A'").normalized != SqlText("SELECT * FROM t WHERE x = 'a'").normalized
+    assert not SqlText("SELECT * FROM ads FOR UPDATE").cacheable
+    assert not SqlText("WITH d AS (DELETE FROM ads RETURNING *) SELECT * FROM d").cacheable
+    assert SqlText("WITH d AS (DELETE FROM ads RETURNING *) SELECT * FROM d").written_tables() == {"public.ads"}
+    assert SqlText('UPDATE ONLY "Ads" SET x = 1').written_tables() == {"public.Ads"}
+    assert SqlText("TRUNCATE a, ONLY market.b").written_tables() == {"public.a", "market.b"}
+    assert SqlText("COPY ads TO STDOUT").written_tables() == set()
+    assert SqlText("SELECT 'delete from ads'").written_tables() == set()
+    assert SqlText("ALTER TABLE ads ADD COLUMN x int").written_tables() is None
+    assert SqlText("SELECT 1; DELETE FROM ads").written_tables() is None
+    assert SqlText("SELECT * FROM ads").read_only and SqlText("EXPLAIN UPDATE ads SET x = 1").read_only
+    assert not SqlText("SELECT nextval('ads_id_seq')").read_only
+    assert not SqlText("SELECT * FROM ads FOR UPDATE").read_only
+    assert not SqlText("SELECT * INTO ads_copy FROM ads").read_only
+    assert not SqlText("EXPLAIN ANALYZE DELETE FROM ads").read_only
+
+
+def test_compile_template():
+    from sql_lector.declared import compile_template
+
+    types = {"q": "string", "limit": "number", "flag": "boolean"}
+    assert compile_template("SELECT * FROM u WHERE email ILIKE '%{{q}}%' LIMIT {{limit}};", types) == \
+        "SELECT * FROM u WHERE email ILIKE ('%%' || %(q)s::text || '%%') LIMIT %(limit)s::numeric"
+    assert compile_template("SELECT '{{q}}', x % 2 WHERE {{flag}}", types) == \
+        "SELECT %(q)s::text, x %% 2 WHERE %(flag)s::boolean"
+    for bad in ("SELECT {{nope}}", 'SELECT "{{q}}"', "SELECT 1 -- {{q}}"):
+        try:
+            compile_template(bad, types)
+            raise AssertionError(f"expected {bad!r} to be rejected")
+        except ValueError:
+            pass
+
+
+def test_dollar_params():
+    from sql_lector.apg import to_dollar_params
+
+    assert to_dollar_params("SELECT %s, '%s', %s %% 2", (1, 2)) == ("SELECT $1, '%s', $2 % 2", [1, 2])
+    assert to_dollar_params("SELECT %(a)s + %(b)s * %(a)s", {"a": 1, "b": 2}) == ("SELECT $1 + $2 * $1", [1, 2])
+    assert to_dollar_params("SELECT '100%'") == ("SELECT '100%'", ())
+    assert to_dollar_params("SELECT '100%%', %s", (1,)) == ("SELECT '100%', $1", [1])
+    try:
+        to_dollar_params("SELECT %s", (1, 2))
+        raise AssertionError("expected a parameter count error")
+    except Exception as e:
+        assert "2 given" in str(e)
+
+
+@needs_db
+def test_protocol():
+    asyncio.run(check_protocol())
+
+
+@needs_db
+def test_concurrency():
+    asyncio.run(check_concurrency())
+
+
+@needs_db
+def test_writes():
+    asyncio.run(check_writes())
+
+
+@needs_db
+def test_schema_cache():
+    asyncio.run(check_schema_cache())
+
+
+@needs_db
+def test_schema_events():
+    asyncio.run(check_schema_events())
+
+
+@needs_db
+def test_result_cache():
+    asyncio.run(check_result_cache())
+
+
+@needs_db
+def test_guard():
+    asyncio.run(check_guard())
+
+
+@needs_db
+def test_asyncpg_backend():
+    asyncio.run(check_asyncpg_backend())
+
+
+@needs_db
+def test_bulk():
+    asyncio.run(check_bulk())
+
+
+@needs_db
+def test_routing():
+    asyncio.run(check_routing())
+
+
+@needs_db
+def test_declared():
+    asyncio.run(check_declared())
+
+
+@needs_db
+def test_search():
+    asyncio.run(check_search())
+
+
+@needs_db
+def test_price_stats():
+    asyncio.run(check_price_stats())
+
+
+@needs_db
+def test_stream():
+    asyncio.run(check_stream())
+
+
+@needs_db
+def test_stream_batches():
+    asyncio.run(check_stream_batches())
+
+
+if __name__ == "__main__":
+    if not DB_URL:
+        print("SQL_LECTOR_TEST_DB_URL is not set; running offline checks only")
+    failed = 0
+    for name, test in [(n, f) for n, f in globals().items() if n.startswith("test_")]:
+        if getattr(test, "needs_db", False) and not DB_URL:
+            continue
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Checks the todo command's stores (gemini/commands/todo_store.py): migration
+from todos.json, bulk status changes, and concurrent writers.
+
+    python3 scripts/test-todo-store.py
+"""
+
+import os
+import sys
+import json
+import tempfile
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gemini.commands.todo_store import JsonTodoStore, SqliteTodoStore, open_store
+
+
+def paths():
+    tmp = tempfile.mkdtemp()
+    return os.path.join(tmp, "todos.sqlite3"), os.path.join(tmp, "todos.json")
+
+
+def test_migrates_json_once():
+    db, json_path = paths()
+    legacy = JsonTodoStore(json_path)
+    for description in ("Draft listing", "Call buyer", "Renew ad"):
+        legacy.add(description)
+    legacy.set_status([2], "completed")
+
+    store = SqliteTodoStore(db, json_path=json_path)
+    assert store.all() == [{"id": 1, "description": "Draft listing", "status": "pending"},
+                           {"id": 2, "description": "Call buyer", "status": "completed"},
+                           {"id": 3, "description": "Renew ad", "status": "pending"}]
+    assert not os.path.exists(json_path) and os.path.exists(json_path + ".migrated")
+    assert store.add("Reply to message") == 4  # ids continue after the imported ones
+    store.close()
+    assert len(SqliteTodoStore(db, json_path=json_path).all()) == 4
+
+
+def test_migration_never_overwrites():
+    db, json_path = paths()
+    legacy = JsonTodoStore(json_path)
+    legacy.add("a")
+    legacy.add("b")
+    store = SqliteTodoStore(db, json_path=json_path)
+    store.add("c")
+    store.close()
+    # Once migrated, the JSON store would restart at id 1
+    try:
+        JsonTodoStore(json_path)
+        assert False, "JSON store opened after migration"
+    except RuntimeError:
+        pass
+
+    # A todos.json that comes back anyway: 1 is the same todo, 2 and 5 are new ones
+    with open(json_path, "w") as f:
+        json.dump([{"id": 1, "description": "a", "status": "completed"},
+                   {"id": 2, "description": "from json", "status": "pending"},
+                   {"id": 5, "description": "e", "status": "pending"}], f)
+    store = SqliteTodoStore(db, json_path=json_path)
+    assert store.renumbered == [(2, 6)]
+    assert [(t["id"], t["description"]) for t in store.all()] == [
+        (1, "a"), (2, "b"), (3, "c"), (5, "e"), (6, "from json")]
+    assert store.get(1)["status"] == "pending"  # the existing todo is left alone
+
+
+def test_status_and_bulk():
+    db, _ = paths()
+    store = SqliteTodoStore(db, json_path=None)
+    assert store.add_many([f"Task {i}" for i in range(1, 1201)]) == list(range(1, 1201))
+    updated = store.set_status(list(range(1, 1101)) + [5000], "completed")  # more than one statement's worth
+    assert updated == list(range(1, 1101))
+    assert len(store.all("completed")) == 1100 and len(store.all("pending")) == 100
+    assert store.get(1150)["status"] == "pending" and store.get(5000) is None
+    assert store.set_status([], "cancelled") == []
+
+
+def test_failed_write_rolls_back():
+    db, _ = paths()
+    store = SqliteTodoStore(db, json_path=None)
+    store.add("Keep me")
+    try:
+        store.add(None)  # description is NOT NULL
+    except Exception:
+        pass
+    assert [t["description"] for t in store.all()] == ["Keep me"] and store.add("Next") == 2
+
+
+def _add_many_times(db, worker, count):
+    store = SqliteTodoStore(db, json_path=None)
+    for i in range(count):
+        store.add(f"worker {worker} task {i}")
+    store.close()
+
+
+def test_concurrent_writers_lose_nothing():
+    db, _ = paths()
+    SqliteTodoStore(db, json_path=None).close()
+    workers = [multiprocessing.Process(target=_add_many_times, args=(db, w, 200)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    todos = SqliteTodoStore(db, json_path=None).all()
+    assert len(todos) == 800 and [t["id"] for t in todos] == list(range(1, 801))
+
+
+def test_open_store_backends():
+    assert isinstance(open_store("json"), JsonTodoStore)
+    try:
+        open_store("redis")
+        assert False, "unknown backend accepted"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, test in sorted((n, f) for n, f in globals().items() if n.startswith("test_")):
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    sys.exit(1 if failed else 0)
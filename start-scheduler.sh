@@ -16,4 +16,5 @@ docker-compose up -d --build redis celery_worker celery_beat
 echo ""
 echo "✅ Scheduler is running in background!"
 echo "📝 Logs: docker-compose logs -f celery_worker"
+echo "📊 Stats: docker-compose exec celery_worker python cli.py stats"
 echo "🛑 Stop: docker-compose stop celery_worker celery_beat"
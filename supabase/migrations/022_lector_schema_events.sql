@@ -0,0 +1,19 @@
+-- Notify the SQL Lector when DDL changes the schema
+-- The Lector LISTENs on lector_schema_changed and reloads its cached catalog
+-- (scripts/sql_lector/schema.py). Without this trigger it falls back to a
+-- periodic DDL fingerprint check, so the migration is optional.
+
+CREATE OR REPLACE FUNCTION public.lector_notify_schema_change()
+RETURNS event_trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_notify('lector_schema_changed', tg_tag);
+END;
+$$;
+
+DROP EVENT TRIGGER IF EXISTS lector_schema_changed;
+
+CREATE EVENT TRIGGER lector_schema_changed
+  ON ddl_command_end
+  EXECUTE FUNCTION public.lector_notify_schema_change();
@@ -0,0 +1,54 @@
+-- Full-text and trigram search over listings (anunturi)
+-- search_vector holds title (weight A), description (B) and location (C)
+-- under a Romanian configuration that also strips diacritics, so "masina"
+-- finds "mașină". Its GIN index answers @@ queries without reading the table.
+-- The trigram index on the unaccented, lowercased title serves typo-tolerant
+-- word_similarity lookups and ILIKE '%...%' on that same expression.
+-- The SQL Lector's search_listings tool (scripts/sql_lector/search.py) uses both.
+--
+-- Adding a stored generated column rewrites anunturi once, under an
+-- ACCESS EXCLUSIVE lock: apply this off-peak on a large table.
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Romanian stemming after unaccent: ă â î ș ț (and the cedilla ş ţ) fold to ASCII
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_ts_config
+    WHERE cfgname = 'romanian_unaccent' AND cfgnamespace = 'public'::regnamespace
+  ) THEN
+    CREATE TEXT SEARCH CONFIGURATION public.romanian_unaccent (COPY = pg_catalog.romanian);
+    ALTER TEXT SEARCH CONFIGURATION public.romanian_unaccent
+      ALTER MAPPING FOR hword, hword_part, word WITH unaccent, romanian_stem;
+  END IF;
+END;
+$$;
+
+-- unaccent() is only STABLE (its dictionary could change); index expressions
+-- need IMMUTABLE. search_path covers Supabase's extensions schema.
+CREATE OR REPLACE FUNCTION public.f_unaccent(text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE PARALLEL SAFE STRICT
+SET search_path = public, extensions, pg_temp
+AS $$
+  SELECT unaccent('unaccent'::regdictionary, $1);
+$$;
+
+ALTER TABLE public.anunturi
+  ADD COLUMN IF NOT EXISTS search_vector tsvector
+  GENERATED ALWAYS AS (
+    setweight(to_tsvector('public.romanian_unaccent'::regconfig, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('public.romanian_unaccent'::regconfig, coalesce(description, '')), 'B') ||
+    setweight(to_tsvector('public.romanian_unaccent'::regconfig, coalesce(location, '')), 'C')
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_anunturi_search_vector
+  ON public.anunturi USING gin (search_vector);
+
+CREATE INDEX IF NOT EXISTS idx_anunturi_title_unaccent_trgm
+  ON public.anunturi USING gin (public.f_unaccent(lower(title)) gin_trgm_ops);
+
+ANALYZE public.anunturi;
@@ -0,0 +1,81 @@
+-- Precomputed price statistics of active listings (anunturi)
+-- One row per category, per (category, subcategory) and per (category, city):
+-- listing count, priced count, min/max, mean and the 25th/50th/75th/90th
+-- percentiles of price. Price figures count only listings with a price above
+-- zero, so free and "price on request" listings do not drag them down.
+-- The category_price_stats tool (universal-db-config.json) and the SQL
+-- Lector's price_stats tool (scripts/sql_lector/analytics.py) read this view,
+-- so they scan a few hundred rows instead of every listing.
+--
+-- Requires PostgreSQL 15 or later: the unique index uses NULLS NOT DISTINCT.
+--
+-- pg_cron refreshes it CONCURRENTLY every 15 minutes. Readers are never
+-- blocked, and refreshed_at says how old the figures are. A concurrent
+-- refresh needs the unique index below. Without pg_cron the job is not
+-- scheduled; refresh the view yourself (or with price_stats refresh=true).
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.listing_price_stats AS
+SELECT
+  grain,
+  category_id,
+  subcategory_id,
+  city,
+  listings,
+  priced,
+  min_price,
+  round(quartiles[1]::numeric, 2) AS p25_price,
+  round(quartiles[2]::numeric, 2) AS median_price,
+  round(quartiles[3]::numeric, 2) AS p75_price,
+  round(quartiles[4]::numeric, 2) AS p90_price,
+  max_price,
+  round(avg_price, 2) AS avg_price,
+  newest_listing_at,
+  now() AS refreshed_at
+FROM (
+  SELECT
+    category_id,
+    subcategory_id,
+    city,
+    CASE GROUPING(subcategory_id, city)
+      WHEN 3 THEN 'category'
+      WHEN 1 THEN 'subcategory'
+      ELSE 'city'
+    END AS grain,
+    count(*) AS listings,
+    count(*) FILTER (WHERE price > 0) AS priced,
+    min(price) FILTER (WHERE price > 0) AS min_price,
+    max(price) FILTER (WHERE price > 0) AS max_price,
+    avg(price) FILTER (WHERE price > 0) AS avg_price,
+    -- One sort per group for all four percentiles
+    percentile_cont(ARRAY[0.25, 0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY price)
+      FILTER (WHERE price > 0) AS quartiles,
+    max(created_at) AS newest_listing_at
+  FROM (
+    SELECT category_id, subcategory_id, price, created_at,
+           -- "Cluj-Napoca, Cluj" and "cluj-napoca" are the same city, keyed "cluj-napoca"
+           nullif(lower(btrim(split_part(location, ',', 1))), '') AS city
+    FROM public.anunturi
+    WHERE status = 'active'
+  ) active
+  GROUP BY GROUPING SETS ((category_id), (category_id, subcategory_id), (category_id, city))
+) grouped;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_listing_price_stats_key
+  ON public.listing_price_stats (grain, category_id, subcategory_id, city) NULLS NOT DISTINCT;
+
+-- The service role reads it; it is not part of the public API
+REVOKE ALL ON public.listing_price_stats FROM anon, authenticated;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.schedule(
+      'listing-price-stats-15min',
+      '*/15 * * * *',
+      $cron$REFRESH MATERIALIZED VIEW CONCURRENTLY public.listing_price_stats$cron$
+    );
+  ELSE
+    RAISE NOTICE 'pg_cron is not installed; listing_price_stats will not refresh on its own';
+  END IF;
+END
+$$;